@@ -3,3 +3,5 @@
 pip install -r requirements.txt
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py createcachetable
+python manage.py rebuild_listings
@@ -3,6 +3,17 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it under gunicorn with uvicorn workers so the async views in
+``products.async_views`` (``/api/async/...``) execute natively:
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker --workers 2
+
+Every middleware in ``MIDDLEWARE`` is async-capable (WhiteNoise through
+``config.static``), so no part of the chain is adapted into a thread; a new
+sync-only middleware would undo that.
+
+``python manage.py benchmark_asgi`` compares this against the WSGI path.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -14,3 +25,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+from config.warmup import warm_up  # noqa: E402  (needs settings configured)
+
+warm_up()
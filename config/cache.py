@@ -0,0 +1,280 @@
+"""
+Two-tier cache: a bounded in-process LRU in front of the shared cache.
+
+``TieredCache`` is the ``default`` cache. Reads are served from this
+worker's LRU when they can be (at most ``LOCAL_MAX_ENTRIES`` entries, each
+kept for at most ``LOCAL_TIMEOUT`` seconds), otherwise from the shared
+backend (the ``shared`` alias: Redis when ``REDIS_URL`` is set, the
+database cache table otherwise) and copied into the LRU. Writes go to both.
+Values in the LRU are shared, not copied: treat cached values as read-only.
+
+On top of it:
+
+* versioned namespaces (``CACHE_NAMESPACES``: products, categories,
+  quotes) - ``namespaced_key()`` embeds the current version of each
+  namespace a value depends on and ``bump_namespace()`` replaces it, which
+  orphans every such entry at once. Versions are always read from the
+  shared tier, so a bump is seen by every worker on their next read;
+* ``get_or_compute()`` - stampede protection: entries are recomputed a
+  little before they expire, with a probability that grows as expiry
+  approaches (XFetch), and only by the worker holding the key's lock. The
+  others keep serving the old value, or wait for the new one on a cold key
+  (locks need Redis, see ``CACHE_LOCKS``; without them each worker
+  recomputes for itself);
+* hit/miss counters per worker (``metrics``, see ``/api/health/cache/``).
+"""
+
+import math
+import random
+import secrets
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import transaction
+
+
+metrics = Counter()
+
+_MISSING = object()
+
+
+# ----- Backend --------------------------------------------------------------
+
+class TieredCache(BaseCache):
+    """``LOCATION`` is the alias of the shared cache this one fronts"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 500))
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self._local = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    # -- local tier
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= time.monotonic():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def _local_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        seconds = self.local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            seconds = min(seconds, timeout)
+        with self._lock:
+            if seconds <= 0:
+                self._local.pop(key, None)
+                return
+            self._local[key] = (time.monotonic() + seconds, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def local_size(self):
+        return len(self._local)
+
+    # -- cache API
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        value = self._local_get(local_key)
+        if value is not _MISSING:
+            metrics['local_hits'] += 1
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            metrics['misses'] += 1
+            return default
+        metrics['shared_hits'] += 1
+        self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, remote = {}, []
+        for key in keys:
+            value = self._local_get(self.make_and_validate_key(key, version))
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        metrics['local_hits'] += len(found)
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            metrics['shared_hits'] += len(fetched)
+            metrics['misses'] += len(remote) - len(fetched)
+            for key, value in fetched.items():
+                self._local_set(self.make_and_validate_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(self.make_and_validate_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_set(self.make_and_validate_key(key, version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_and_validate_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._local_delete(self.make_and_validate_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(self.make_and_validate_key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # Counters live in the shared tier only, a local copy would drift
+        self._local_delete(self.make_and_validate_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+def shared_cache():
+    """The tier every worker sees (the default cache itself when it isn't tiered)"""
+    return getattr(cache, 'shared', cache)
+
+
+# ----- Namespaces -----------------------------------------------------------
+
+def _version_key(namespace):
+    return f'namespace:{namespace}'
+
+
+def _new_version():
+    # Random rather than a counter, so a flushed or rolled back shared cache
+    # can never bring back a version some worker still has entries for
+    return secrets.token_hex(4)
+
+
+def namespace_versions(namespaces):
+    """Current version of each namespace, from the shared tier"""
+    store = shared_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = store.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            store.add(key, _new_version(), timeout=None)
+            versions[key] = store.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_namespace(*namespaces):
+    """
+    Orphan every entry keyed under ``namespaces`` (they expire on their own)
+    once the current transaction commits. Bumping earlier would let another
+    worker cache pre-commit data under the new version.
+    """
+    unknown = set(namespaces) - set(settings.CACHE_NAMESPACES)
+    if unknown:
+        raise ValueError(f'Unknown cache namespaces: {", ".join(sorted(unknown))}')
+    transaction.on_commit(lambda: shared_cache().set_many(
+        {_version_key(namespace): _new_version() for namespace in namespaces}, timeout=None,
+    ))
+
+
+def namespaced_key(namespaces, key):
+    """``key`` under the current versions of ``namespaces``"""
+    versions = namespace_versions(namespaces)
+    return ':'.join([*(f'{namespace}.{version}' for namespace, version in zip(namespaces, versions)), key])
+
+
+# ----- Stampede protection --------------------------------------------------
+
+def _acquire(key):
+    if not settings.CACHE_LOCKS:
+        return True  # every worker that needs a value computes it
+    return cache.add(f'{key}:lock', 1, timeout=settings.CACHE_LOCK_SECONDS)
+
+
+def _release(key):
+    if settings.CACHE_LOCKS:
+        cache.delete(f'{key}:lock')
+
+
+def _store(key, compute, timeout):
+    started = time.monotonic()
+    try:
+        value = compute()
+        if value is not None:
+            delta = time.monotonic() - started
+            cache.set(key, (value, delta, time.time() + timeout), timeout)
+    finally:
+        _release(key)
+    metrics['recomputes'] += 1
+    return value
+
+
+def get_or_compute(key, compute, timeout):
+    """
+    The cached value of ``key``, else ``compute()`` stored for ``timeout``
+    seconds (``None`` results are returned but not stored).
+
+    Each entry records how long it took to compute; a reader recomputes it
+    early when ``now - delta * beta * log(rand) >= expiry`` (beta is
+    ``CACHE_EARLY_RECOMPUTE_BETA``), so expensive entries are refreshed
+    sooner and a hot key doesn't expire under every worker at once.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires_at = entry
+        jitter = -delta * settings.CACHE_EARLY_RECOMPUTE_BETA * math.log(1.0 - random.random())
+        if time.time() + jitter < expires_at:
+            return value
+        if not _acquire(key):
+            metrics['stale_served'] += 1  # another worker is already refreshing it
+            return value
+        metrics['early_recomputes'] += 1
+        return _store(key, compute, timeout)
+
+    if _acquire(key):
+        return _store(key, compute, timeout)
+
+    # Cold key and someone else is computing it: wait for their result
+    metrics['lock_waits'] += 1
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    metrics['lock_timeouts'] += 1
+    return compute()
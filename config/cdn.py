@@ -0,0 +1,155 @@
+"""
+CDN caching with surrogate keys and debounced purges.
+
+Cacheable API responses are tagged with the surrogate keys of everything
+they show (``tag_response``; the keys themselves are chosen by the views,
+see ``products/surrogate_keys.py``) and get
+``Cache-Control: public, max-age=CDN_MAX_AGE, s-maxage=CDN_S_MAXAGE``.
+Writes call ``purge(keys)``. Keys are collected after the transaction
+commits and flushed to the purge backend at most once per
+``CDN_PURGE_DELAY`` seconds, so a bulk update sends a handful of batched
+purge requests, not one per row.
+
+The long ``s-maxage`` is only sent when a purge backend is configured
+(``CDN_PURGE_BACKEND``); without one the CDN keeps responses for
+``CDN_MAX_AGE`` like browsers do. Backends:
+
+* ``HTTPPurgeBackend`` - POSTs ``{"surrogate_keys": [...]}`` to
+  ``CDN_PURGE_URL`` with ``CDN_PURGE_TOKEN`` (Fastly's batch purge API);
+* ``RecordingPurgeBackend`` - keeps the purged batches in memory (tests).
+"""
+
+import atexit
+import json
+import logging
+import threading
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+# ----- Backends -----------------------------------------------------------
+
+class BasePurgeBackend:
+
+    def purge(self, keys):
+        raise NotImplementedError
+
+
+class HTTPPurgeBackend(BasePurgeBackend):
+
+    def __init__(self):
+        self.url = settings.CDN_PURGE_URL
+        self.headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if settings.CDN_PURGE_TOKEN:
+            self.headers[settings.CDN_PURGE_TOKEN_HEADER] = settings.CDN_PURGE_TOKEN
+
+    def purge(self, keys):
+        body = json.dumps({'surrogate_keys': list(keys)}).encode()
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=settings.CDN_PURGE_TIMEOUT) as response:
+            response.read()
+
+
+class RecordingPurgeBackend(BasePurgeBackend):
+    """Stand-in that records every purged batch in ``RecordingPurgeBackend.purged``"""
+    purged = []
+
+    def purge(self, keys):
+        self.purged.append(sorted(keys))
+
+    @classmethod
+    def keys(cls):
+        return {key for batch in cls.purged for key in batch}
+
+    @classmethod
+    def reset(cls):
+        cls.purged.clear()
+
+
+_backends = {}
+
+
+def get_purge_backend():
+    """The configured backend instance, or None when purging is off"""
+    path = settings.CDN_PURGE_BACKEND
+    if not path:
+        return None
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+# ----- Debounced purge queue ----------------------------------------------
+
+class PurgeQueue:
+    """Pending keys, flushed in batches ``CDN_PURGE_DELAY`` seconds after the first one"""
+
+    def __init__(self):
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, keys):
+        with self.lock:
+            self.pending.update(keys)
+            if settings.CDN_PURGE_DELAY <= 0:
+                flush_now = True
+            else:
+                flush_now = False
+                if self.timer is None:
+                    self.timer = threading.Timer(settings.CDN_PURGE_DELAY, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            keys, self.pending = sorted(self.pending), set()
+            if self.timer is not None:
+                self.timer.cancel()  # no-op when the timer itself is flushing
+            self.timer = None
+        backend = get_purge_backend()
+        if not keys or backend is None:
+            return
+        size = settings.CDN_PURGE_BATCH_SIZE
+        for start in range(0, len(keys), size):
+            batch = keys[start:start + size]
+            try:
+                backend.purge(batch)
+            except Exception:
+                # A failed purge must never fail the write; the TTL still applies
+                logger.exception('CDN purge of %d keys failed', len(batch))
+
+
+purge_queue = PurgeQueue()
+atexit.register(purge_queue.flush)  # management commands exit before the timer fires
+
+
+def purge(keys):
+    """Purge ``keys`` from the CDN once the current transaction commits"""
+    keys = set(keys)
+    if keys and settings.CDN_PURGE_BACKEND:
+        transaction.on_commit(lambda: purge_queue.add(keys))
+
+
+# ----- Response headers ---------------------------------------------------
+
+def tag_response(response, keys, s_maxage=None):
+    """Mark ``response`` cacheable by the CDN under surrogate ``keys``"""
+    header = settings.CDN_SURROGATE_KEY_HEADER
+    response[header] = ' '.join(sorted(set(keys) | set(response.get(header, '').split())))
+    if s_maxage is None:
+        s_maxage = settings.CDN_S_MAXAGE if settings.CDN_PURGE_BACKEND else settings.CDN_MAX_AGE
+    patch_cache_control(
+        response, public=True,
+        max_age=min(settings.CDN_MAX_AGE, s_maxage), s_maxage=s_maxage,
+    )
+    return response
@@ -0,0 +1,126 @@
+"""
+Brotli/gzip compression of API responses.
+
+``CompressionMiddleware`` negotiates ``Accept-Encoding`` (brotli preferred,
+then gzip) for responses under ``COMPRESSION_PATHS``. Bodies smaller than
+``COMPRESSION_MIN_SIZE`` go out as they are, since the headers would cost
+more than they save. Levels are ``COMPRESSION_GZIP_LEVEL`` and
+``COMPRESSION_BROTLI_QUALITY``.
+
+A response that already carries its compressed bodies in
+``response.precompressed`` (``{'br': ..., 'gzip': ...}``, see
+``config/response_cache.py``) is served from those instead of being
+compressed again, so cached responses are compressed once per encoding,
+not once per request.
+
+Only the API is compressed: admin pages reflect CSRF tokens, which makes
+compressing them a BREACH risk. Brotli needs the optional ``brotli``
+package; without it only gzip is offered.
+"""
+
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/msgpack', 'text/')
+
+
+def available_encodings():
+    """Supported encodings, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output (and any ETag derived from it) deterministic
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def precompress(body):
+    """``{encoding: compressed body}`` worth storing for ``body`` (empty if too small)"""
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    encoded = {encoding: compress(body, encoding) for encoding in available_encodings()}
+    return {encoding: data for encoding, data in encoded.items() if len(data) < len(body)}
+
+
+def negotiate(accept_encoding):
+    """The best of our encodings that ``Accept-Encoding`` allows, or None"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name.strip().lower()] = quality
+
+    wildcard = weights.get('*', 0.0)
+    for encoding in available_encodings():
+        if weights.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(response):
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    return response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not request.path.startswith(tuple(settings.COMPRESSION_PATHS)) or not is_compressible(response):
+            return response
+
+        # The body depends on Accept-Encoding whenever it could be compressed
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        precompressed = getattr(response, 'precompressed', None) or {}
+        body = precompressed.get(encoding) or compress(response.content, encoding)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag  # the bytes differ from the identity body
+        return response
@@ -0,0 +1,178 @@
+"""
+Primary/replica routing for the read-only catalogue.
+
+Reads of ``REPLICA_ROUTED_APPS`` models go to the ``replica`` alias only when
+all of these hold:
+
+* the request is a safe method (GET/HEAD/OPTIONS) and did not write to the
+  catalogue yet - the first such write pins the rest of the request to the primary;
+* the client is not pinned by the ``REPLICA_PIN_COOKIE`` set after a write,
+  so a user sees their own changes for ``REPLICA_PIN_SECONDS``;
+* no transaction is open on the primary;
+* the replica's replay lag is within ``REPLICA_MAX_LAG_SECONDS``.
+
+Views that accept POST only to carry a large read (the batch product lookup)
+call ``mark_read_only()`` so they are routed and pinned like a GET.
+
+Outside a request (shell, management commands, migrations) everything uses
+the primary. Without a ``replica`` alias configured the router is a no-op.
+"""
+
+import contextvars
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+REPLICA_DB_ALIAS = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Postgres standby: 0 while fully caught up, else seconds since last replay
+LAG_SQL = '''
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+'''
+
+_request_state = contextvars.ContextVar('replica_routing', default=None)
+
+
+class ReplicaLagMonitor:
+    """Per-process replica lag check, re-measured at most every few seconds"""
+
+    def __init__(self):
+        self._checked_at = None
+        self._healthy = False
+
+    def reset(self):
+        self._checked_at = None
+
+    def measure(self):
+        connection = connections[REPLICA_DB_ALIAS]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0] or 0)
+
+    def is_healthy(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            self._checked_at = now
+            try:
+                lag = self.measure()
+            except DatabaseError:
+                lag = None
+            self._healthy = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+        return self._healthy
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+def replica_available():
+    return REPLICA_DB_ALIAS in connections.settings
+
+
+class ReplicaRoutingMiddleware:
+    """Opens the per-request routing scope and sets the read-your-writes pin"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.open_scope(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        # The ORM's sync_to_async threads run in a copy of this context
+        state = self.open_scope(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.pin(state, response)
+
+    def open_scope(self, request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        return {
+            'pinned': pinned,
+            'read_only': request.method in SAFE_METHODS,
+            'replica_allowed': request.method in SAFE_METHODS and not pinned,
+            'wrote': False,
+        }
+
+    def pin(self, state, response):
+        if replica_available() and (state['wrote'] or not state['read_only']):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+def mark_read_only():
+    """Route the current non-GET request like a safe read (no pin afterwards)"""
+    state = _request_state.get()
+    if state is not None:
+        state['read_only'] = True
+        state['replica_allowed'] = not state['pinned']
+
+
+def is_pinned():
+    """True while the current request's client is reading its own writes from the primary"""
+    state = _request_state.get()
+    return state is not None and state['pinned']
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in settings.REPLICA_ROUTED_APPS:
+            return None
+        state = _request_state.get()
+        if (
+            state is None
+            or not state['replica_allowed']
+            or state['wrote']
+            or not replica_available()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or not lag_monitor.is_healthy()
+        ):
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        # Only catalogue writes pin; filling the database cache table must not
+        if state is not None and model._meta.app_label in settings.REPLICA_ROUTED_APPS:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A real replica gets its schema by replicating the primary; only the
+        # stand-in database used by the tests is migrated on its own
+        if db == REPLICA_DB_ALIAS:
+            return settings.TESTING
+        return None
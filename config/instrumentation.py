@@ -0,0 +1,153 @@
+"""
+Per-request SQL instrumentation.
+
+For a sampled fraction of requests (``SQL_INSTRUMENTATION_SAMPLE_RATE``) every
+query on every database alias is timed through ``connection.execute_wrapper``.
+The request then gets:
+
+* a ``Server-Timing`` header - ``db`` (count and total time) and ``dbdup``
+  (statements executed more than once, the usual N+1 signature);
+* one JSON log line on the ``config.instrumentation`` logger;
+* ``EXPLAIN`` output logged for queries slower than ``SQL_SLOW_QUERY_MS``.
+
+Unsampled requests pay for a single ``random()`` call.
+"""
+
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that records (alias, sql, params, seconds) per query"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((
+                context['connection'].alias, sql, params, many,
+                time.perf_counter() - started,
+            ))
+
+    @property
+    def total_time(self):
+        return sum(query[-1] for query in self.queries)
+
+    def duplicates(self):
+        """``{sql: times}`` for statements run more than once (params ignored)"""
+        counts = Counter(sql for _, sql, _, _, _ in self.queries)
+        return {sql: count for sql, count in counts.items() if count > 1}
+
+    def slow_selects(self, threshold):
+        """Single SELECTs (the statements EXPLAIN can take) that ran for ``threshold`` seconds or more"""
+        return [
+            query for query in self.queries
+            if query[-1] >= threshold and not query[3] and query[1].lstrip().upper().startswith('SELECT')
+        ]
+
+
+def explain(alias, sql, params):
+    connection = connections[alias]
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+
+
+def recording(recorder):
+    """Context manager installing ``recorder`` on every database alias"""
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(recorder))
+    return stack
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.SQL_INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        return self.report(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.SQL_INSTRUMENTATION_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        # Connections are per thread: install the wrappers on the thread the
+        # request's sync_to_async ORM calls run on (thread-sensitive, so one)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = await sync_to_async(recording)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        elapsed = time.perf_counter() - started
+        return await sync_to_async(self.report)(request, response, recorder, elapsed)  # may EXPLAIN
+
+    def report(self, request, response, recorder, elapsed):
+        """Server-Timing header, log line and slow-query plans for a sampled request"""
+        db_ms = recorder.total_time * 1000
+        duplicates = recorder.duplicates()
+        duplicated = sum(duplicates.values()) - len(duplicates)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.2f};desc="{len(recorder.queries)} queries"',
+            f'dbdup;desc="{duplicated} duplicated"',
+            f'app;dur={elapsed * 1000:.2f}',
+        ])
+
+        logger.info(json.dumps({
+            'event': 'request_sql',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': len(recorder.queries),
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(elapsed * 1000, 2),
+            'duplicated': duplicated,
+            'top_duplicate': max(duplicates, key=duplicates.get)[:300] if duplicates else None,
+        }))
+
+        slow = recorder.slow_selects(settings.SQL_SLOW_QUERY_MS / 1000)
+        for alias, sql, params, many, seconds in slow[:settings.SQL_EXPLAIN_MAX_PER_REQUEST]:
+            logger.warning(json.dumps({
+                'event': 'slow_query',
+                'path': request.path,
+                'database': alias,
+                'ms': round(seconds * 1000, 2),
+                'sql': sql,
+                'plan': explain(alias, sql, params),
+            }))
+        return response
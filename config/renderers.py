@@ -0,0 +1,66 @@
+"""
+Faster API renderers.
+
+``ORJSONRenderer`` is a drop-in replacement for DRF's ``JSONRenderer``: same
+media type and, for what our serializers produce, the same bytes (compact,
+UTF-8, U+2028/U+2029 escaped), but the encoding runs in orjson. Values orjson has no native form for, or
+that DRF formats its own way (Decimal, datetime, lazy strings, ...), go
+through DRF's encoder, so switching renderers does not change responses. Without orjson
+installed, or for ``; indent=`` requests, it simply is ``JSONRenderer``.
+
+``ColumnarJSONRenderer`` is the same JSON selected with ``?format=columns``;
+views that offer it add it to their renderers and reshape the data first
+(see products/columns.py).
+
+``MessagePackRenderer`` answers ``Accept: application/msgpack`` (or
+``?format=msgpack``) for internal consumers. settings.py only lists it when
+the msgpack package is installed.
+
+Compare them with ``python manage.py benchmark_renderers``.
+"""
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+_drf_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=_drf_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        # Same as JSONRenderer: keep the output valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    format = 'columns'
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_drf_default, use_bin_type=True, datetime=False)
@@ -0,0 +1,86 @@
+"""
+Cache for hot, public API responses (collections, navbar, details).
+
+``@cached_response()`` on a viewset action stores the rendered body together
+with its brotli/gzip encodings (``config.compression.precompress``), so a
+hit is served without touching the view, the serializer, the renderer or
+the compressor: ``CompressionMiddleware`` picks the stored encoding.
+
+Entries live in the two-tier cache (``config/cache.py``), keyed by full
+path and negotiated media type under the versions of the namespaces they
+depend on (``RESPONSE_CACHE_NAMESPACES`` by default).
+``invalidate_responses(namespace)`` bumps a version on catalogue writes
+(see ``products/signals.py``), which every worker sees on its next request.
+A hot entry is re-rendered by one worker shortly before it expires
+while the others keep serving it. Clients pinned to the primary after a
+write (``config.db_routing``) bypass the cache.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .cache import bump_namespace, get_or_compute, namespaced_key
+from .compression import precompress
+from .db_routing import is_pinned
+
+
+def invalidate_responses(*namespaces):
+    """Orphan the cached responses that depend on ``namespaces`` (default: all of them)"""
+    bump_namespace(*(namespaces or settings.RESPONSE_CACHE_NAMESPACES))
+
+
+def response_cache_key(request, namespaces, *extra):
+    parts = [request.get_full_path(), request.accepted_media_type, *map(str, extra)]
+    digest = hashlib.md5('\n'.join(parts).encode(), usedforsecurity=False).hexdigest()
+    return namespaced_key(namespaces, f'response-cache:{digest}')
+
+
+def cached_response(vary_on=None, timeout=None, namespaces=None):
+    """
+    Cache a viewset action's 200 responses. ``vary_on(request)`` adds to the
+    key whatever else the response depends on (e.g. a time bucket).
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not settings.RESPONSE_CACHE_SECONDS or is_pinned():
+                # Clients pinned to the primary read their own writes, not the cache
+                return method(view, request, *args, **kwargs)
+            key = response_cache_key(
+                request, namespaces or settings.RESPONSE_CACHE_NAMESPACES,
+                *([vary_on(request)] if vary_on else []),
+            )
+            rendered = None
+
+            def render():
+                nonlocal rendered
+                response = rendered = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return None
+                response = rendered = view.finalize_response(request, response, *args, **kwargs)
+                response.render()
+                response.precompressed = precompress(response.content)
+                return {
+                    'body': response.content,
+                    'content_type': response['Content-Type'],
+                    # Cache-Control, surrogate keys, ... as set by the view
+                    'headers': {
+                        header: value for header, value in response.items()
+                        if header not in ('Content-Type', 'Content-Length')
+                    },
+                    'encodings': response.precompressed,
+                }
+
+            entry = get_or_compute(key, render, timeout or settings.RESPONSE_CACHE_SECONDS)
+            if rendered is not None:
+                return rendered
+            response = HttpResponse(entry['body'], content_type=entry['content_type'])
+            for header, value in entry['headers'].items():
+                response[header] = value
+            response.precompressed = entry['encodings']
+            return response
+        return wrapper
+    return decorator
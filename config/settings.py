@@ -2,14 +2,17 @@
 Django settings for config project.
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 import os
+import sys
 import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-b)%c!k0d4w902hwi_k0rdy-2ns-kad88&3dse9y3hmxkp8mfh&')
 DEBUG = os.environ.get('DEBUG', 'False') == 'True'
+TESTING = sys.argv[1:2] == ['test']
 ALLOWED_HOSTS = ['*']
 
 INSTALLED_APPS = [
@@ -19,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'django_filters',
@@ -30,8 +34,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'config.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'config.compression.CompressionMiddleware',
+    'config.db_routing.ReplicaRoutingMiddleware',
+    'config.static.StaticFilesMiddleware',   # ⭐ WhiteNoise, async-capable (see config/static.py)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,12 +65,158 @@ TEMPLATES = [
     },
 ]
 
+# Connection pooling (psycopg 3 pool, PostgreSQL only). Each worker keeps
+# DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections open and checks one is alive
+# before lending it out, so short requests skip the TLS handshake entirely.
+DATABASE_URL = os.environ.get('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=os.environ.get('DATABASE_URL'),
-        conn_max_age=60,
-        ssl_require=True,
+    'default': dj_database_url.parse(
+        DATABASE_URL,
+        # Persistent connections and a pool are mutually exclusive in Django
+        conn_max_age=0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        conn_health_checks=True,
+        ssl_require=DATABASE_URL.startswith('postgres'),
+    )
+}
+
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+        'check': ConnectionPool.check_connection,
+    }
+
+# Optional read replica for the catalogue (see config/db_routing.py)
+if os.environ.get('REPLICA_DATABASE_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ['REPLICA_DATABASE_URL'],
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        conn_health_checks=True,
+        ssl_require=os.environ['REPLICA_DATABASE_URL'].startswith('postgres'),
     )
+elif TESTING:
+    # A second, separate database stands in for the replica during tests
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {
+            'NAME': None if DATABASES['default']['ENGINE'].endswith('sqlite3')
+            else f"test_{DATABASES['default']['NAME']}_replica",
+        },
+    }
+
+DATABASE_ROUTERS = ['config.db_routing.PrimaryReplicaRouter']
+REPLICA_ROUTED_APPS = ['products']
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 5))
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 15))
+REPLICA_PIN_COOKIE = 'db_pin'
+
+# Sampled per-request SQL timing (see config/instrumentation.py)
+SQL_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get(
+    # Off in tests: sampled log lines would make their output nondeterministic
+    'SQL_INSTRUMENTATION_SAMPLE_RATE', '0' if TESTING else '1.0' if DEBUG else '0.05'
+))
+SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+SQL_EXPLAIN_MAX_PER_REQUEST = 3
+
+# Product admin switches to estimated counts and input filters past this many
+# rows (see products/counts.py); filtered changelists count at most ADMIN_COUNT_LIMIT
+ADMIN_LARGE_CATALOG_ROWS = int(os.environ.get('ADMIN_LARGE_CATALOG_ROWS', 20000))
+ADMIN_COUNT_LIMIT = int(os.environ.get('ADMIN_COUNT_LIMIT', 10000))
+
+# Paginated API counts: exact up to API_COUNT_EXACT_LIMIT rows, the planner's
+# estimate beyond; cached per filter combination (see products/counts.py)
+API_COUNT_EXACT_LIMIT = int(os.environ.get('API_COUNT_EXACT_LIMIT', 10000))
+API_COUNT_CACHE_SECONDS = int(os.environ.get('API_COUNT_CACHE_SECONDS', 300))
+
+# `manage.py stock_alerts` emails its report here (comma-separated; empty: print only)
+STOCK_ALERT_RECIPIENTS = [
+    address.strip() for address in os.environ.get('STOCK_ALERT_RECIPIENTS', '').split(',') if address.strip()
+]
+
+# Featured products rotate to a new window this often (see products/featured.py)
+FEATURED_ROTATION_SECONDS = int(os.environ.get('FEATURED_ROTATION_SECONDS', 300))
+
+# Serve plain /api/products/ pages from the prerendered listing projection
+# (see products/listings.py; build it with `manage.py rebuild_listings`)
+PRODUCT_LISTING_PROJECTION = os.environ.get('PRODUCT_LISTING_PROJECTION', 'True') == 'True'
+
+# API response compression (see config/compression.py): bodies under
+# COMPRESSION_MIN_SIZE bytes are sent uncompressed
+COMPRESSION_PATHS = ['/api/']
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Two-tier cache (see config/cache.py): a per-worker LRU in front of Redis
+# (REDIS_URL) or, without one, the database cache table (`createcachetable`)
+if os.environ.get('REDIS_URL'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'config.cache.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'LOCAL_MAX_ENTRIES': int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 500)),
+            'LOCAL_TIMEOUT': float(os.environ.get('CACHE_LOCAL_TIMEOUT', 5)),
+        },
+    },
+    'shared': {**SHARED_CACHE, 'KEY_PREFIX': 'khaizen'},
+}
+CACHE_NAMESPACES = ['products', 'categories', 'quotes']
+CACHE_EARLY_RECOMPUTE_BETA = float(os.environ.get('CACHE_EARLY_RECOMPUTE_BETA', 1.0))
+# Stampede locks cost an add and a delete per recompute: cheap on Redis, but
+# on the database cache each is several queries (including a COUNT(*) for
+# culling), more than most recomputes they would save
+CACHE_LOCKS = bool(os.environ.get('REDIS_URL'))
+CACHE_LOCK_SECONDS = 10   # a crashed recompute releases its key after this long
+CACHE_LOCK_WAIT = 2       # how long a cold read waits for another worker's recompute
+
+# Collections, navbar and detail responses are cached precompressed for this
+# long (see config/response_cache.py); 0 disables the cache
+RESPONSE_CACHE_SECONDS = int(os.environ.get('RESPONSE_CACHE_SECONDS', 60))
+RESPONSE_CACHE_NAMESPACES = ['products', 'categories']
+
+# CDN: cacheable API responses carry surrogate keys and writes purge them
+# (see config/cdn.py). The long s-maxage is only sent once a purge backend is
+# set, e.g. CDN_PURGE_BACKEND=config.cdn.HTTPPurgeBackend with
+# CDN_PURGE_URL=https://api.fastly.com/service/<id>/purge
+CDN_SURROGATE_KEY_HEADER = os.environ.get('CDN_SURROGATE_KEY_HEADER', 'Surrogate-Key')
+CDN_MAX_AGE = int(os.environ.get('CDN_MAX_AGE', 60))
+CDN_S_MAXAGE = int(os.environ.get('CDN_S_MAXAGE', 86400))
+CDN_PURGE_BACKEND = os.environ.get('CDN_PURGE_BACKEND', '')
+CDN_PURGE_URL = os.environ.get('CDN_PURGE_URL', '')
+CDN_PURGE_TOKEN = os.environ.get('CDN_PURGE_TOKEN', '')
+CDN_PURGE_TOKEN_HEADER = os.environ.get('CDN_PURGE_TOKEN_HEADER', 'Fastly-Key')
+CDN_PURGE_TIMEOUT = float(os.environ.get('CDN_PURGE_TIMEOUT', 5))
+CDN_PURGE_DELAY = float(os.environ.get('CDN_PURGE_DELAY', 2))
+CDN_PURGE_BATCH_SIZE = 256   # Fastly's limit per batch purge request
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'config.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -94,31 +247,33 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    # ⭐ orjson-backed JSON (plain JSONRenderer output when orjson is missing),
+    # MessagePack for internal consumers sending Accept: application/msgpack
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-    ],
+        'config.renderers.ORJSONRenderer',
+    ] + (['config.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
 }
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME', 'dfou5jsq4'),
     'API_KEY': os.environ.get('CLOUDINARY_API_KEY', ''),
     'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET', ''),
 }
 
-cloudinary.config(
-    cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME', 'dfou5jsq4'),
-    api_key=os.environ.get('CLOUDINARY_API_KEY', ''),
-    api_secret=os.environ.get('CLOUDINARY_API_SECRET', ''),
-    secure=True
-)
+# Applied in ProductsConfig.ready() so loading settings never imports the SDK.
+# django.setup() still does: CloudinaryField (products.models) needs
+# cloudinary.models, which loads cloudinary, cloudinary.uploader and
+# cloudinary.utils (with urllib3 and certifi). Only the config() call is deferred.
+CLOUDINARY = {
+    'cloud_name': CLOUDINARY_STORAGE['CLOUD_NAME'],
+    'api_key': CLOUDINARY_STORAGE['API_KEY'],
+    'api_secret': CLOUDINARY_STORAGE['API_SECRET'],
+    'secure': True,
+}
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 MEDIA_URL = '/media/'
@@ -0,0 +1,36 @@
+"""
+WhiteNoise for both WSGI and ASGI.
+
+WhiteNoise 6's middleware is sync-only, and one sync-only middleware makes
+Django run the whole chain above it in a thread under ASGI, undoing the
+async views beneath it. ``StaticFilesMiddleware`` adds the async branch:
+non-static requests pass straight through to the async handler, and only
+static files (opened from disk) are served through ``sync_to_async``.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)  # stats the disk
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
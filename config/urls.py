@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .views import CacheHealthView, DatabaseHealthView
 
 
 
@@ -13,6 +14,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('products.urls')),
     path('api/', include('quotes.urls')),
+    path('api/health/db/', DatabaseHealthView.as_view(), name='health-db'),
+    path('api/health/cache/', CacheHealthView.as_view(), name='health-cache'),
 ]
 
 # Serve media files in development
@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .cache import metrics, namespace_versions, shared_cache
+
+
+class DatabaseHealthView(APIView):
+    """
+    GET /api/health/db/ - staff only
+
+    Round-trip time of a trivial query on each configured database, plus this
+    worker's connection pool statistics when pooling is enabled.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        databases = {}
+        healthy = True
+        for alias in connections:
+            connection = connections[alias]
+            entry = {'vendor': connection.vendor, 'pool': None}
+            started = time.perf_counter()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                entry['ok'] = True
+            except Exception as exc:
+                entry['ok'] = False
+                entry['error'] = str(exc)
+                healthy = False
+            entry['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+            pool = getattr(connection, 'pool', None)
+            if pool is not None:
+                entry['pool'] = {
+                    'name': pool.name,
+                    'min_size': pool.min_size,
+                    'max_size': pool.max_size,
+                    **pool.get_stats(),
+                }
+            databases[alias] = entry
+
+        return Response({'ok': healthy, 'databases': databases}, status=200 if healthy else 503)
+
+
+class CacheHealthView(APIView):
+    """
+    GET /api/health/cache/ - staff only
+
+    Round-trip time of the shared cache, the namespace versions, and this
+    worker's local tier size and hit/miss counters.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        store = shared_cache()
+        started = time.perf_counter()
+        try:
+            store.get('health-check')
+            error = None
+        except Exception as exc:
+            error = str(exc)
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        lookups = metrics['local_hits'] + metrics['shared_hits'] + metrics['misses']
+        data = {
+            'ok': error is None,
+            'shared': {
+                'backend': type(store).__name__,
+                'latency_ms': latency_ms,
+                **({'error': error} if error else {}),
+            },
+            'local_entries': cache.local_size() if hasattr(cache, 'local_size') else None,
+            'hit_ratio': round((metrics['local_hits'] + metrics['shared_hits']) / lookups, 3) if lookups else None,
+            'metrics': dict(metrics),
+        }
+        if error is None:
+            data['namespaces'] = dict(zip(settings.CACHE_NAMESPACES, namespace_versions(settings.CACHE_NAMESPACES)))
+        return Response(data, status=200 if error is None else 503)
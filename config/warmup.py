@@ -0,0 +1,35 @@
+"""
+Import-time warm-up for application servers.
+
+Django resolves the URLconf (and with it every view, serializer, DRF and
+django-filter module) on the first request. Doing it at boot instead takes
+that cost off the first request, and with ``preload_app`` it happens once in
+the gunicorn master so forked workers share the pages copy-on-write.
+
+Nothing here may open a database connection: it would be shared by every
+forked worker.
+"""
+
+from importlib import import_module
+
+from django.urls import get_resolver
+
+
+WARM_MODULES = [
+    'rest_framework.renderers',
+    'rest_framework.parsers',
+    'rest_framework.negotiation',
+    'rest_framework.pagination',
+    'rest_framework.metadata',
+    'django_filters.rest_framework',
+    'django.contrib.admin.views.main',
+    'django.contrib.auth.views',
+]
+
+
+def warm_up():
+    resolver = get_resolver()
+    resolver.url_patterns   # imports every urls.py and, through them, the views
+    resolver._populate()    # builds the reverse lookup tables
+    for module in WARM_MODULES:
+        import_module(module)
@@ -2,6 +2,8 @@
 WSGI config for config project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+URLconf/view imports are done here rather than on the first request; see
+``config.warmup`` and ``gunicorn.conf.py``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
@@ -14,3 +16,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from config.warmup import warm_up  # noqa: E402  (needs settings configured)
+
+warm_up()
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings, read automatically from the working directory.
+
+With ``preload_app`` the master imports Django (see ``config.warmup``) once
+before forking. The GC is kept off while that happens and everything it
+allocated is moved into the permanent generation with ``gc.freeze()``, so the
+workers' collections never write to those pages and they stay shared
+copy-on-write instead of being duplicated in every worker.
+
+    GUNICORN_PRELOAD=False  load the app separately in each worker instead
+    WEB_CONCURRENCY         number of workers (default 2)
+"""
+
+import gc
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+if preload_app:
+    # This file is read before the app is preloaded, so this covers all of it
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        gc.freeze()
+        gc.enable()
+        server.log.info('gc.freeze(): %d objects moved to the permanent generation', gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    gc.enable()
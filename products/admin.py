@@ -1,8 +1,21 @@
-from django.contrib import admin
+import csv
+
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
-from django.db.models import Count
+from django.db.models import Count, Q
+from django.utils import timezone
+from . import bulk, stock
+from .admin_filters import BrandFilter, SubcategoryFilter, SubcategoryChoicesFilter
+from .changes import products_changed
+from .counts import EstimatedCountPaginator, is_large_table
+from .featured import reshuffle_featured
 from .models import Category, Subcategory, Product, ProductImage
-from .forms import ProductAdminForm
+from .forms import ProductAdminForm, BulkPriceStockForm, BulkCSVForm
 
 
 class ProductImageInline(admin.TabularInline):
@@ -68,6 +81,18 @@ class SubcategoryAdmin(admin.ModelAdmin):
     )
 
 
+def is_autocomplete_request(request):
+    """True for the admin's autocomplete view (the pickers of autocomplete_fields)"""
+    match = request.resolver_match
+    return (
+        match is not None and match.url_name == 'autocomplete'
+        and {'app_label', 'model_name', 'field_name'} <= request.GET.keys()
+    )
+
+
+LOW_STOCK_REPORT_ROWS = 1000   # ⭐ The CSV export has every row
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     form = ProductAdminForm
@@ -79,14 +104,17 @@ class ProductAdmin(admin.ModelAdmin):
         'price',
         'stock_count',
         'in_stock',
-        'is_active'
+        'is_active',
+        'subcategory'
     )
+    list_select_related = ('subcategory', 'subcategory__category')  # ⭐ Subcategory __str__ needs its category
     list_filter = (
         'product_type',
         'subcategory__category',
-        'subcategory',
+        ('subcategory', SubcategoryChoicesFilter),
         'brand',
         'in_stock',
+        'stock_level',
         'is_active',
         'is_featured',
         'created_at'
@@ -103,6 +131,21 @@ class ProductAdmin(admin.ModelAdmin):
     inlines = [ProductImageInline]
     list_per_page = 25
 
+    # ⭐ Large-catalog mode (ADMIN_LARGE_CATALOG_ROWS+ products): estimated counts,
+    # input filters instead of DISTINCT value lists, search on indexed columns only
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False       # Skips the second, unfiltered COUNT(*)
+    large_catalog_list_filter = (
+        'product_type',
+        'subcategory__category',
+        SubcategoryFilter,
+        BrandFilter,
+        'in_stock',
+        'stock_level',
+        'is_active',
+        'is_featured',
+    )
+
     # Radio buttons for product type
     radio_fields = {'product_type': admin.HORIZONTAL}
 
@@ -166,45 +209,192 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_list_filter(self, request):
+        if is_large_table(Product):
+            return self.large_catalog_list_filter
+        return super().get_list_filter(request)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term and is_autocomplete_request(request):
+            # Product pickers (autocomplete_fields): SKU/name only, both trigram-indexed
+            return queryset.filter(Q(sku__trgm_icontains=term) | Q(name__trgm_icontains=term)), False
+        if not term or not is_large_table(Product):
+            return super().get_search_results(request, queryset, search_term)
+        # name/sku/brand have trigram GIN indexes on PostgreSQL (migration 0005),
+        # which serve ILIKE but not icontains (see lookups.py);
+        # subcategory/category matches come from the small subcategory table
+        # instead of joining it for every product row
+        subcategories = Subcategory.objects.filter(
+            Q(name__icontains=term) | Q(category__name__icontains=term)
+        )
+        queryset = queryset.filter(
+            Q(name__trgm_icontains=term)
+            | Q(sku__trgm_icontains=term)
+            | Q(brand__trgm_icontains=term)
+            | Q(subcategory__in=subcategories)
+        )
+        return queryset, False
+
     # Custom actions
     actions = [
         'mark_as_new',
         'mark_as_refurbished',
         'mark_as_rental',
         'mark_as_active',
-        'mark_as_inactive'
+        'mark_as_inactive',
+        'bulk_price_stock'
     ]
 
+    def _update(self, queryset, **values):
+        """``queryset.update()`` plus what its skipped signals would do (see changes.py)"""
+        ids = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(updated_at=timezone.now(), **values)
+        products_changed(ids)
+        return updated
+
     def mark_as_new(self, request, queryset):
-        updated = queryset.update(product_type='new')
+        updated = self._update(queryset, product_type='new')
         self.message_user(request, f'{updated} product(s) marked as New Products')
 
     mark_as_new.short_description = '🆕 Mark as New Products'
 
     def mark_as_refurbished(self, request, queryset):
-        updated = queryset.update(product_type='refurbished')
+        updated = self._update(queryset, product_type='refurbished')
         self.message_user(request, f'{updated} product(s) marked as Refurbished Products')
 
     mark_as_refurbished.short_description = '🔧 Mark as Refurbished Products'
 
     def mark_as_rental(self, request, queryset):
-        updated = queryset.update(product_type='rental')
+        updated = self._update(queryset, product_type='rental')
         self.message_user(request, f'{updated} product(s) marked as Rental Products')
 
     mark_as_rental.short_description = '📅 Mark as Rental Products'
 
     def mark_as_active(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = self._update(queryset, is_active=True)
+        reshuffle_featured()  # update() skips the signals
         self.message_user(request, f'{updated} product(s) marked as Active')
 
     mark_as_active.short_description = '✓ Mark as Active'
 
     def mark_as_inactive(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = self._update(queryset, is_active=False)
+        reshuffle_featured()  # update() skips the signals
         self.message_user(request, f'{updated} product(s) marked as Inactive')
 
     mark_as_inactive.short_description = '✖ Mark as Inactive'
 
+    def bulk_price_stock(self, request, queryset):
+        """Set-based price/discount/stock change with a dry-run diff before applying"""
+        form = BulkPriceStockForm(request.POST if 'operation' in request.POST else None)
+        preview = None
+        if form.is_valid():
+            changes = form.changes()
+            if 'apply' in request.POST:
+                try:
+                    updated = bulk.apply(queryset, changes)
+                except bulk.BulkChangeError as exc:
+                    self.message_user(request, f'Nothing changed: {exc}', messages.ERROR)
+                else:
+                    self.message_user(request, f'{updated} product(s) updated')
+                    return None
+            preview = bulk.preview(queryset, changes)
+
+        return TemplateResponse(request, 'admin/products/product/bulk_update.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Bulk price & stock update',
+            'opts': self.model._meta,
+            'form': form,
+            'preview': preview,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'count': queryset.count(),
+        })
+
+    bulk_price_stock.short_description = '💲 Bulk price / discount / stock update'
+
+    def get_urls(self):
+        return [
+            path(
+                'bulk-csv/',
+                self.admin_site.admin_view(self.bulk_csv_view),
+                name='products_product_bulk_csv',
+            ),
+            path(
+                'low-stock/',
+                self.admin_site.admin_view(self.low_stock_view),
+                name='products_product_low_stock',
+            ),
+        ] + super().get_urls()
+
+    def low_stock_view(self, request):
+        """Low and out-of-stock SKUs by category (``?format=csv`` for the full list)"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        rows = stock.low_stock_rows()
+        levels = dict(Product.STOCK_LEVEL_CHOICES)
+        if request.GET.get('format') == 'csv':
+            response = HttpResponse(content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="low-stock.csv"'
+            writer = csv.writer(response)
+            writer.writerow(['category', 'subcategory', 'sku', 'name', 'brand', 'stock_count', 'stock_status'])
+            for row in rows.iterator():
+                writer.writerow([
+                    row['category_name'], row['subcategory_name'], row['sku'], row['name'],
+                    row['brand'], row['stock_count'], levels[row['stock_level']],
+                ])
+            return response
+
+        summary = stock.low_stock_summary()
+        shown = list(rows[:LOW_STOCK_REPORT_ROWS])
+        for row in shown:
+            row['stock_status'] = levels[row['stock_level']]
+        return TemplateResponse(request, 'admin/products/product/low_stock.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Low stock report',
+            'opts': self.model._meta,
+            'summary': summary,
+            'rows': shown,
+            'total': sum(entry['low'] + entry['out'] for entry in summary),
+        })
+
+    def bulk_csv_view(self, request):
+        """Per-SKU price/stock changes from a CSV upload, previewed before applying"""
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        form = BulkCSVForm(request.POST or None, request.FILES or None)
+        preview = errors = missing = None
+        if request.method == 'POST' and form.is_valid():
+            skus, changes, errors = bulk.parse_csv(form.cleaned_data['csv_text'])
+            queryset = Product.objects.filter(sku__in=skus)
+            missing = sorted(set(skus) - set(queryset.values_list('sku', flat=True)))
+            if not changes:
+                errors.append('No price, discount or stock columns with values found.')
+            elif 'apply' in request.POST and not errors:
+                try:
+                    updated = bulk.apply(queryset, changes)
+                except bulk.BulkChangeError as exc:
+                    self.message_user(request, f'Nothing changed: {exc}', messages.ERROR)
+                else:
+                    self.message_user(request, f'{updated} product(s) updated from CSV')
+                    return HttpResponseRedirect(reverse('admin:products_product_changelist'))
+            if changes:
+                preview = bulk.preview(queryset, changes)
+            # Keep the parsed file for the "Apply" round trip
+            form = BulkCSVForm(initial={'csv_text': form.cleaned_data['csv_text']})
+
+        return TemplateResponse(request, 'admin/products/product/bulk_csv.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Bulk update from CSV',
+            'opts': self.model._meta,
+            'form': form,
+            'preview': preview,
+            'errors': errors,
+            'missing': missing,
+        })
+
     class Media:
         js = ('admin/js/product_conditional_fields.js',)
         css = {
@@ -218,4 +408,12 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_filter = ('is_primary', 'created_at')
     search_fields = ('product__name', 'alt_text')
     list_editable = ('is_primary', 'order')
-    ordering = ('product', 'order')
\ No newline at end of file
+    ordering = ('product', 'order')
+    list_select_related = ('product',)
+    autocomplete_fields = ('product',)   # ⭐ Not a <select> with every product
+    readonly_fields = ('product_summary',)
+
+    def product_summary(self, obj):
+        return obj.product.price_summary() if obj.product_id else '-'
+
+    product_summary.short_description = 'Product price'
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Text-input changelist filters for large tables.
+
+The stock filters list every distinct value (``SELECT DISTINCT brand`` over
+all products) on every changelist load. These render a single input with
+suggestions taken from small tables or the in-process catalogue index, and
+filter with an indexed equality lookup.
+"""
+
+from django.contrib import admin
+
+from .models import Subcategory
+from .search import get_catalog_index
+
+
+class InputFilter(admin.SimpleListFilter):
+    template = 'admin/products/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def suggestions(self):
+        return []
+
+    def choices(self, changelist):
+        # Other active filters, ordering and search survive submitting the input
+        self.hidden_params = [
+            (key, value)
+            for key, values in changelist.filter_params.items() if key != self.parameter_name
+            for value in values
+        ]
+        # Only the "All" link (to clear the filter); the input is in the template
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'All',
+        }
+
+
+class BrandFilter(InputFilter):
+    title = 'brand'
+    parameter_name = 'brand'
+
+    def suggestions(self):
+        return get_catalog_index().brand_labels()
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        brand = get_catalog_index().canonical_brand(value)
+        if brand is not None:
+            return queryset.filter(brand=brand)  # exact match uses the brand index
+        return queryset.filter(brand__iexact=value)
+
+
+class SubcategoryFilter(InputFilter):
+    title = 'subcategory'
+    parameter_name = 'subcategory_name'
+
+    def suggestions(self):
+        return list(Subcategory.objects.order_by('name').values_list('name', flat=True).distinct())
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        return queryset.filter(subcategory__in=Subcategory.objects.filter(name__iexact=value))
+
+
+class SubcategoryChoicesFilter(admin.RelatedFieldListFilter):
+    """The stock subcategory filter, without a category query per choice label"""
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin) or Subcategory._meta.ordering
+        subcategories = Subcategory.objects.select_related('category').order_by(*ordering)
+        return [(subcategory.pk, str(subcategory)) for subcategory in subcategories]
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        import cloudinary  # already loaded by CloudinaryField; only the config() is deferred
+        cloudinary.config(**settings.CLOUDINARY)
+        from . import lookups, signals  # noqa: F401
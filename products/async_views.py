@@ -0,0 +1,113 @@
+"""
+Async-native read endpoints for the catalogue.
+
+These views use Django's async ORM end to end, so under an ASGI server
+(``gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker``) a slow
+database call only suspends one coroutine instead of tying up a worker.
+The response shapes match the DRF viewsets in ``views.py``, and the product
+list runs that viewset's filter backends.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .fieldsets import optimize_queryset
+from .models import Category, Subcategory, Product
+from .serializers import (
+    CategorySerializer,
+    SubcategorySerializer,
+    ProductListSerializer,
+    ProductDetailSerializer,
+)
+from .views import ProductViewSet, StandardPagination
+
+
+def _page_url(request, page, last_page):
+    url = request.build_absolute_uri()
+    if page < 1 or page > last_page:
+        return None
+    if page == 1:
+        return remove_query_param(url, 'page')
+    return replace_query_param(url, 'page', page)
+
+
+async def _paginated_response(request, queryset, serializer_class, page_size, **extra):
+    """Same envelope as DRF's ``PageNumberPagination`` (plus ``extra`` keys)"""
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    count = await queryset.acount()
+    last_page = max(1, -(-count // page_size))
+    if page < 1 or page > last_page:
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+
+    offset = (page - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+    return JsonResponse({
+        'count': count,
+        'count_is_approximate': False,
+        'next': _page_url(request, page + 1, last_page),
+        'previous': _page_url(request, page - 1, last_page),
+        'results': serializer_class(objects, many=True).data,
+        **extra,
+    })
+
+
+@sync_to_async
+def _filter_products(request):
+    """
+    ``ProductViewSet``'s list queryset for ``request``: the same filterset,
+    search (with its fuzzy fallback) and ordering backends. Their form
+    validation and fallback probes query synchronously, hence the thread.
+    """
+    view = ProductViewSet(request=Request(request), action='list', format_kwarg=None, args=(), kwargs={})
+    queryset = optimize_queryset(ProductViewSet.queryset, ProductListSerializer())
+    return view.filter_queryset(queryset), getattr(view.request, 'did_you_mean', None)
+
+
+@require_GET
+async def product_list(request):
+    try:
+        page_size = int(request.GET.get('page_size', StandardPagination.page_size))
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid query parameter.'}, status=400)
+    page_size = max(1, min(page_size, StandardPagination.max_page_size))
+
+    try:
+        queryset, did_you_mean = await _filter_products(request)
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+    extra = {'did_you_mean': did_you_mean} if did_you_mean else {}
+    return await _paginated_response(request, queryset, ProductListSerializer, page_size, **extra)
+
+
+@require_GET
+async def product_detail(request, slug):
+    try:
+        product = await (
+            optimize_queryset(Product.objects.filter(is_active=True), ProductDetailSerializer())
+            .aget(slug=slug)
+        )
+    except Product.DoesNotExist:
+        raise Http404
+
+    # Nested subcategory needs its product count without a sync query
+    product.subcategory = await (
+        optimize_queryset(Subcategory.objects.all(), SubcategorySerializer())
+        .aget(pk=product.subcategory_id)
+    )
+    return JsonResponse(ProductDetailSerializer(product).data)
+
+
+@require_GET
+async def category_list(request):
+    queryset = optimize_queryset(Category.objects.filter(is_active=True), CategorySerializer())
+    return await _paginated_response(
+        request, queryset, CategorySerializer, settings.REST_FRAMEWORK['PAGE_SIZE']
+    )
@@ -0,0 +1,276 @@
+"""
+Set-based bulk price and stock changes.
+
+A change is a mapping of Product field -> SQL expression for the new value
+(``F()``, ``Round(F() * ...)``, ...), or a ``SkuChanges`` holding new values
+per SKU (CSV uploads), which is turned into ``Case``/``When`` expressions one
+batch of SKUs at a time. Nothing is loaded into Python:
+
+* ``preview()`` annotates the new values onto the queryset and reports how
+  many rows change, a before/after sample and every row the change would
+  make break the rules of ``Product.clean`` (checked in SQL, see ``RULES``);
+* ``apply()`` refuses changes with violations, otherwise runs one
+  ``UPDATE ... SET col = <expression>`` per batch of ids in a transaction.
+"""
+
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import BooleanField, Case, DecimalField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from .changes import products_changed
+from .models import Product
+
+
+BATCH_SIZE = 1000
+SAMPLE_SIZE = 50
+
+CHANGEABLE_FIELDS = ['price', 'original_price', 'discount', 'stock_count', 'in_stock']
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+# Product.clean and the field validators, as SQL conditions over either the
+# current columns (prefix '') or the annotated new values (prefix 'new_')
+RULES = [
+    ('Price cannot be negative', lambda p: Q(**{f'{p}price__lt': 0})),
+    ('Discount must be between 0 and 100',
+     lambda p: Q(**{f'{p}discount__lt': 0}) | Q(**{f'{p}discount__gt': 100})),
+    ('Stock cannot be negative', lambda p: Q(**{f'{p}stock_count__lt': 0})),
+    ('Product marked as "in stock" must have stock_count > 0',
+     lambda p: Q(**{f'{p}in_stock': True, f'{p}stock_count__lte': 0})),
+    ('Original price must be set when discount is applied',
+     lambda p: Q(**{f'{p}discount__gt': 0})
+     & (Q(**{f'{p}original_price__isnull': True}) | Q(**{f'{p}original_price': 0}))),
+    ('Discounted price cannot be higher than original price',
+     lambda p: Q(**{f'{p}original_price__gt': 0, f'{p}price__gt': F(f'{p}original_price')})),
+]
+
+
+class BulkChangeError(Exception):
+    """Raised by ``apply()`` when rows would violate the product rules"""
+
+    def __init__(self, violations):
+        self.violations = violations
+        super().__init__(f'{len(violations)} product(s) would become invalid')
+
+
+def _money(expression):
+    return Round(expression, 2, output_field=MONEY)
+
+
+# ----- Changes ------------------------------------------------------------
+
+def price_change(percent=None, amount=None):
+    """Raise/lower prices by a percentage or a fixed amount (sale prices keep their discount)"""
+    if percent is not None:
+        factor = Value(1 + Decimal(percent) / 100, output_field=MONEY)
+        new = lambda field: _money(F(field) * factor)  # noqa: E731
+    else:
+        new = lambda field: _money(F(field) + Value(Decimal(amount), output_field=MONEY))  # noqa: E731
+    return {'price': new('price'), 'original_price': new('original_price')}
+
+
+def discount_campaign(percent):
+    """Put products on sale: ``percent`` (a whole number, 1-99) off their regular (original) price"""
+    if percent != int(percent) or not 0 < percent < 100:
+        raise ValueError(f'Discount must be a whole percentage between 1 and 99, not {percent}')
+    percent = int(percent)
+    regular = Coalesce(F('original_price'), F('price'), output_field=MONEY)
+    return {
+        'original_price': regular,
+        'discount': Value(percent),
+        'price': _money(regular * Value(Decimal(100 - percent) / 100, output_field=MONEY)),
+    }
+
+
+def end_discount():
+    """Return sale products to their regular price"""
+    return {
+        'price': Coalesce(F('original_price'), F('price'), output_field=MONEY),
+        'original_price': Value(None, output_field=MONEY),
+        'discount': Value(0),
+    }
+
+
+def stock_change(delta=None, set_to=None):
+    stock = Value(int(set_to)) if set_to is not None else F('stock_count') + Value(int(delta))
+    return {'stock_count': stock}
+
+
+CSV_COLUMNS = {
+    'price': (Decimal, MONEY), 'original_price': (Decimal, MONEY),
+    'discount': (int, IntegerField()), 'stock_count': (int, IntegerField()),
+    'stock_delta': (int, IntegerField()),
+}
+
+
+class SkuChanges:
+    """
+    New values per SKU (``{column: {sku: value}}``). ``for_skus(skus)`` is
+    the change for those SKUs only, so each batch's ``Case`` lists just the
+    SKUs in that batch instead of the whole file.
+    """
+
+    def __init__(self, values):
+        self.values = {column: per_sku for column, per_sku in values.items() if per_sku}
+
+    def __bool__(self):
+        return bool(self.values)
+
+    @property
+    def skus(self):
+        return sorted(set().union(*self.values.values()))
+
+    def for_skus(self, skus):
+        changes = {}
+        for column, per_sku in self.values.items():
+            output_field = CSV_COLUMNS[column][1]
+            whens = [
+                When(sku=sku, then=Value(per_sku[sku], output_field=output_field))
+                for sku in skus if sku in per_sku
+            ]
+            if not whens:
+                continue
+            if column == 'stock_delta':
+                delta = Case(*whens, default=Value(0), output_field=output_field)
+                changes['stock_count'] = changes.get('stock_count', F('stock_count')) + delta
+            else:
+                current = changes.get(column, F(column))
+                changes[column] = Case(*whens, default=current, output_field=output_field)
+        return changes
+
+
+def csv_changes(rows):
+    """
+    Per-SKU changes from CSV rows with a ``sku`` column and any of ``price``,
+    ``original_price``, ``discount``, ``stock_count``, ``stock_delta``.
+    Returns ``(skus, changes, errors)``, ``changes`` being a ``SkuChanges``;
+    empty cells leave the value alone.
+    """
+    values = {column: {} for column in CSV_COLUMNS}
+    skus, errors = [], []
+    for line, row in enumerate(rows, 2):  # line 1 is the header
+        sku = (row.get('sku') or '').strip()
+        if not sku:
+            errors.append(f'Line {line}: missing sku')
+            continue
+        skus.append(sku)
+        for column, (cast, _) in CSV_COLUMNS.items():
+            raw = (row.get(column) or '').strip()
+            if not raw:
+                continue
+            try:
+                values[column][sku] = cast(raw)
+            except (InvalidOperation, ValueError):
+                errors.append(f'Line {line}: invalid {column} "{raw}"')
+    return skus, SkuChanges(values), errors
+
+
+def parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    return csv_changes(reader)
+
+
+# ----- Preview / apply ----------------------------------------------------
+
+def _complete(changes):
+    """Add the derived ``in_stock`` flag; every expression reads the old row, as in UPDATE"""
+    changes = dict(changes)
+    if 'stock_count' in changes and 'in_stock' not in changes:
+        changes['in_stock'] = Case(
+            When(GreaterThan(changes['stock_count'], 0), then=Value(True)),
+            default=Value(False), output_field=BooleanField(),
+        )
+    return changes
+
+
+def _annotate(queryset, changes):
+    return queryset.annotate(**{
+        f'new_{field}': changes.get(field, F(field)) for field in CHANGEABLE_FIELDS
+    })
+
+
+def _changed(field):
+    """NULL-safe ``new_<field> IS DISTINCT FROM <field>``"""
+    new = f'new_{field}'
+    return (
+        Q(**{f'{new}__isnull': False, f'{field}__isnull': False}) & ~Q(**{new: F(field)})
+        | Q(**{f'{new}__isnull': True, f'{field}__isnull': False})
+        | Q(**{f'{new}__isnull': False, f'{field}__isnull': True})
+    )
+
+
+def _parts(queryset, changes, batch_size=BATCH_SIZE):
+    """
+    ``(queryset, completed changes)`` pairs covering ``queryset``: the whole
+    of it for plain changes, one batch of SKUs at a time for ``SkuChanges``
+    """
+    if not isinstance(changes, SkuChanges):
+        return [(queryset, _complete(changes))]
+    skus = changes.skus
+    return [
+        (queryset.filter(sku__in=batch), _complete(changes.for_skus(batch)))
+        for batch in (skus[start:start + batch_size] for start in range(0, len(skus), batch_size))
+    ]
+
+
+def _violations(parts, limit=None):
+    """Rows the change makes invalid (already invalid rows are not the change's fault)"""
+    violations = []
+    for message, rule in RULES:
+        found = []
+        for queryset, changes in parts:
+            skus = _annotate(queryset, changes).filter(rule('new_') & ~rule('')).order_by('sku').values_list('sku', flat=True)
+            found += skus[:limit] if limit else skus
+        violations += [(sku, message) for sku in sorted(found)[:limit]]
+    return violations
+
+
+def preview(queryset, changes, sample_size=SAMPLE_SIZE):
+    """Dry run: ``{'rows', 'changed', 'sample', 'violations'}`` without writing anything"""
+    parts = _parts(queryset, changes)
+    fields = list(dict.fromkeys(field for _, part_changes in parts for field in part_changes))
+    changed, sample = 0, []
+    for part, part_changes in parts:
+        differs = Q()
+        for field in part_changes:
+            differs |= _changed(field)
+        rows = _annotate(part, part_changes).filter(differs).order_by('sku')
+        columns = ['sku', 'name'] + [
+            name for field in fields
+            for name in (field, f'new_{field}' if field in part_changes else field)
+        ]
+        changed += rows.count()
+        sample += rows.values_list(*columns)[:sample_size]
+
+    return {
+        'fields': fields,
+        'rows': queryset.count(),
+        'changed': changed,
+        'sample': sorted(sample)[:sample_size],
+        'violations': _violations(parts, limit=sample_size),
+    }
+
+
+def apply(queryset, changes, batch_size=BATCH_SIZE):
+    """Validate in SQL, then update in batches of ids; returns the number of rows updated"""
+    parts = _parts(queryset, changes, batch_size)
+    with transaction.atomic():
+        violations = _violations(parts)
+        if violations:
+            raise BulkChangeError(violations)
+
+        updated = 0
+        now = timezone.now()
+        for part, part_changes in parts:
+            ids = list(part.order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                updated += Product.objects.filter(pk__in=batch).update(updated_at=now, **part_changes)
+                products_changed(batch)  # update() skips the signals
+    return updated
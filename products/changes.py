@@ -0,0 +1,83 @@
+"""
+What has to happen when products change.
+
+Model saves and deletes (of products and their images) get here through ``signals.py``; the write paths that
+bypass signals (``update()``, ``bulk_create()``: bulk.apply, the admin
+actions) call ``products_changed(ids)`` themselves.
+
+Large loads (the synthetic generator) run inside ``bulk_load()``, which
+skips the listing, cache and CDN work per write and does it once at the end.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from config.response_cache import invalidate_responses
+from .listings import rebuild_listings, refresh_listings
+from .models import DERIVED_FIELDS, Product, ProductImage, image_url
+from .surrogate_keys import purge_catalog, purge_products
+
+
+_loading = threading.local()
+
+
+def refresh_derived_fields(ids, batch_size=500):
+    """Recompute the stored ``DERIVED_FIELDS`` of products ``ids`` where they are out of date"""
+    inputs = set().union(*DERIVED_FIELDS.values())
+    stale = [
+        product for product in Product.objects.filter(pk__in=ids).only(*DERIVED_FIELDS, *inputs)
+        if product.set_derived_fields()
+    ]
+    Product.objects.bulk_update(stale, list(DERIVED_FIELDS), batch_size=batch_size)
+    return len(stale)
+
+
+def refresh_primary_images(ids, batch_size=500):
+    """Point products ``ids`` at their primary image (and store its URL) where that is out of date"""
+    primaries = {
+        product_id: (image_id, image) for product_id, image_id, image in
+        ProductImage.objects.filter(product_id__in=ids, is_primary=True).values_list('product_id', 'pk', 'image')
+    }
+    stale = []
+    for product in Product.objects.filter(pk__in=ids).only('main_image', 'primary_image', 'primary_image_url'):
+        image_id, image = primaries.get(product.pk, (None, product.main_image))
+        url = image_url(image)
+        if (product.primary_image_id, product.primary_image_url) != (image_id, url):
+            product.primary_image_id, product.primary_image_url = image_id, url
+            stale.append(product)
+    Product.objects.bulk_update(stale, ['primary_image', 'primary_image_url'], batch_size=batch_size)
+    return len(stale)
+
+
+def products_changed(ids):
+    """Refresh the stored derived fields, primary images and listing rows of products ``ids``, drop cached responses, purge the CDN"""
+    ids = list(ids)
+    refresh_derived_fields(ids)
+    refresh_primary_images(ids)
+    if bulk_loading():
+        return 0  # bulk_load() rebuilds the rest once
+    refreshed = refresh_listings(ids)
+    invalidate_responses('products')
+    purge_products(ids)
+    return refreshed
+
+
+def bulk_loading():
+    return getattr(_loading, 'active', False)
+
+
+@contextmanager
+def bulk_load():
+    """
+    Defer per-write work during a large load: inside, signal handlers and
+    ``products_changed`` leave listings, cached responses and the CDN alone;
+    on a clean exit the listings are rebuilt and everything is dropped once.
+    """
+    _loading.active = True
+    try:
+        yield
+    finally:
+        _loading.active = False
+    rebuild_listings()
+    invalidate_responses()
+    purge_catalog()
@@ -0,0 +1,208 @@
+"""
+Row counts that stay cheap on large tables.
+
+``COUNT(*)`` reads every row (or index entry) it counts. Where an exact
+number is not needed, PostgreSQL's own estimate from ``pg_class.reltuples``
+(kept current by autovacuum/ANALYZE) answers in constant time, and
+``EXPLAIN`` gives the planner's row estimate for a filtered query.
+"""
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections, router
+from django.utils.functional import cached_property
+
+from config.cache import get_or_compute, namespaced_key
+
+
+# Cached API counts are dropped whenever either of these changes
+COUNT_NAMESPACES = ('products', 'categories')
+
+
+def estimated_row_count(model, using=None):
+    """Planner estimate of ``model``'s table size, or None where unavailable"""
+    connection = connections[using or router.db_for_read(model)]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 until the table has been vacuumed or analyzed once
+    return row[0] if row and row[0] >= 0 else None
+
+
+def explained_row_count(queryset):
+    """The planner's row estimate for ``queryset``, or None where unavailable"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+LARGE_TABLE_CHECK_INTERVAL = 60
+_large_tables = {}  # model -> (checked at, is large)
+
+
+def is_large_table(model):
+    """
+    True once ``model``'s table passes ``ADMIN_LARGE_CATALOG_ROWS`` rows;
+    re-checked at most once a minute per process.
+    """
+    threshold = settings.ADMIN_LARGE_CATALOG_ROWS
+    if threshold <= 0:
+        return True
+    checked_at, large = _large_tables.get(model, (None, False))
+    now = time.monotonic()
+    if checked_at is None or now - checked_at >= LARGE_TABLE_CHECK_INTERVAL:
+        estimate = estimated_row_count(model)
+        if estimate is None:
+            # No estimate: only count as far as the threshold
+            estimate = model._default_manager.order_by()[:threshold].count()
+        large = estimate >= threshold
+        _large_tables[model] = (now, large)
+    return large
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Unfiltered querysets on a large table use the planner estimate (when it
+    is beyond ``ADMIN_COUNT_LIMIT``); filtered ones are counted exactly, but
+    only up to ``ADMIN_COUNT_LIMIT`` rows. A page that comes back short
+    corrects an estimate that ran past the last row, so no empty trailing
+    pages are linked or served.
+    """
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not is_large_table(queryset.model):
+            return super().count
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                self.count_is_estimate = True
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+    def page(self, number):
+        page = super().page(number)
+        if not self.count_is_estimate:
+            return page
+        rows = list(page.object_list)
+        if len(rows) < self.per_page:
+            if not rows and page.number > 1:
+                raise EmptyPage('That page contains no results')
+            # The real end of the table: fix count and num_pages to match
+            self.__dict__['count'] = (page.number - 1) * self.per_page + len(rows)
+            self.__dict__.pop('num_pages', None)
+            self.count_is_estimate = False
+        return Page(rows, page.number, self)
+
+
+def count_rows(queryset):
+    """
+    ``(count, is_approximate)``: exact up to ``API_COUNT_EXACT_LIMIT`` rows,
+    the planner's estimate beyond that (exact again where there is none).
+    """
+    queryset = queryset.order_by()
+    limit = settings.API_COUNT_EXACT_LIMIT
+    if limit <= 0:
+        return queryset.count(), False
+    counted = queryset[:limit + 1].count()
+    if counted <= limit:
+        return counted, False
+    if queryset.query.where:
+        estimate = explained_row_count(queryset)
+    else:
+        estimate = estimated_row_count(queryset.model, queryset.db)
+    if estimate is None:
+        return queryset.count(), False
+    return max(estimate, counted), True
+
+
+def cached_per_query(queryset, kind, compute, extra=()):
+    """
+    ``compute()`` cached for ``API_COUNT_CACHE_SECONDS`` per ``queryset``
+    (ordering aside) and ``extra`` under the catalogue's cache version.
+    Raises ``EmptyResultSet`` for querysets that can match nothing.
+    """
+    seconds = settings.API_COUNT_CACHE_SECONDS
+    sql, params = queryset.order_by().query.sql_with_params()
+    if not seconds:
+        return compute()
+    digest = hashlib.md5(repr((queryset.db, sql, params, *extra)).encode(), usedforsecurity=False).hexdigest()
+    key = namespaced_key(COUNT_NAMESPACES, f'{kind}:{digest}')
+    return get_or_compute(key, compute, seconds)
+
+
+def cached_count_rows(queryset, known=None):
+    """
+    ``count_rows(queryset)`` through ``cached_per_query``; a caller that
+    already knows the exact count passes it as ``known``.
+    """
+    compute = (lambda: (known, False)) if known is not None else (lambda: count_rows(queryset))
+    try:
+        return cached_per_query(queryset, 'count', compute)
+    except EmptyResultSet:
+        return 0, False
+
+
+class ApproximatePage(Page):
+    """A page of an estimated count: whether there is a next one comes from the rows"""
+
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+
+class CountStrategyPaginator(Paginator):
+    """
+    Counts through ``count_rows()``, cached per query (so per normalized
+    filter/search combination) for ``API_COUNT_CACHE_SECONDS`` under the
+    catalogue's cache version. ``count_is_approximate`` tells whether the
+    count is an estimate; pages of an estimated count may run past it.
+    """
+    count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        count, self.count_is_approximate = cached_count_rows(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.count_is_approximate or int(number) < 1:
+                raise
+            return int(number)  # past the estimate: the rows decide, see page()
+
+    def page(self, number):
+        if self.count == 0 or not self.count_is_approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # One row more than the page shows whether another page follows
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return ApproximatePage(rows[:self.per_page], number, self, more=len(rows) > self.per_page)
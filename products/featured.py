@@ -0,0 +1,74 @@
+"""
+Rotating "featured" window without ORDER BY random().
+
+Active featured products carry a precomputed shuffled position in
+``Product.featured_rank`` (0..n-1, NULL for everything else). Each time
+bucket of ``FEATURED_ROTATION_SECONDS`` starts ``size`` positions further
+along the shuffle and reads its window in rank index order, wrapping around
+at the end. Positions are counted (OFFSET), not taken from the rank values,
+so gaps or duplicate ranks left by deletes never shorten or repeat a window.
+Results are stable within a bucket, so responses stay cacheable, and no
+request ever sorts the featured set.
+
+The shuffle is rebuilt by ``reshuffle_featured()``: from the
+``shuffle_featured`` command on a schedule, and whenever a product enters or
+leaves the featured set (``signals.py`` and the admin bulk actions).
+"""
+
+import random
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Product
+
+
+FEATURED = Q(is_active=True, is_featured=True)
+
+
+def reshuffle_featured(seed=None):
+    """Give every active featured product a new shuffled rank; returns the count"""
+    with transaction.atomic():
+        ids = list(Product.objects.filter(FEATURED).order_by('id').values_list('id', flat=True))
+        random.Random(seed).shuffle(ids)
+        Product.objects.filter(featured_rank__isnull=False).exclude(FEATURED).update(featured_rank=None)
+        ranked = [Product(id=product_id, featured_rank=rank) for rank, product_id in enumerate(ids)]
+        Product.objects.bulk_update(ranked, ['featured_rank'], batch_size=500)
+    return len(ids)
+
+
+def needs_reshuffle(product):
+    """True when ``product`` joined or left the featured set without a rank change"""
+    return (product.is_active and product.is_featured) != (product.featured_rank is not None)
+
+
+def current_bucket():
+    seconds = settings.FEATURED_ROTATION_SECONDS
+    return int(time.time() // seconds) if seconds else 0
+
+
+def seconds_left_in_bucket():
+    seconds = settings.FEATURED_ROTATION_SECONDS
+    return int(seconds - time.time() % seconds) if seconds else None
+
+
+def featured_window(queryset, size, bucket=None):
+    """
+    ``size`` featured products from ``queryset`` for time ``bucket``
+    (default: the current one), in shuffle order.
+    """
+    if bucket is None:
+        bucket = current_bucket()
+    ranked = queryset.filter(featured_rank__isnull=False).order_by('featured_rank', 'id')
+    total = ranked.count()
+    if not total:
+        return []
+    start = (bucket * size) % total
+
+    window = list(ranked[start:start + size])
+    if len(window) < size and start > 0:
+        # Wrap around to the beginning of the shuffle
+        window += list(ranked[:min(size - len(window), start)])
+    return window
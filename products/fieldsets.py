@@ -0,0 +1,171 @@
+"""
+Sparse fieldsets for the catalogue endpoints.
+
+``?fields=id,name,price`` trims a response to those fields and
+``?expand=images`` adds fields a serializer leaves out by default
+(``Meta.expandable_fields``). ``optimize_queryset`` then walks the fields that
+survived and derives the ``only()`` columns, ``select_related`` joins,
+``prefetch_related`` lookups and annotations they read, so a client asking for
+less also makes the database do less.
+
+Plain model fields, dotted sources and nested serializers are inferred. Fields
+the walker cannot see through (properties, method fields) declare what they
+read in ``Meta.field_requirements``::
+
+    field_requirements = {
+        'final_price': {'only': ['price', 'original_price', 'discount']},
+        'product_count': {'annotate': {'active_product_count': Count(...)}},
+    }
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def parse_field_list(value):
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin: keep only the fields named by the ``fields``/``expand`` context"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        expand = set(self.context.get('expand') or ())
+        available = set(self.fields)
+
+        unknown = (set(requested or ()) | expand) - available
+        if unknown:
+            raise ValidationError({'fields': [f'Unknown field "{name}".' for name in sorted(unknown)]})
+
+        if requested:
+            keep = set(requested)
+        else:
+            keep = available - set(getattr(self.Meta, 'expandable_fields', ()))
+        for name in available - keep - expand:
+            self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """Viewset mixin: ``?fields=``/``?expand=`` shape both the serializer and the query"""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        params = self.request.query_params
+        if params.get('fields'):
+            context['fields'] = parse_field_list(params['fields'])
+        if params.get('expand'):
+            context['expand'] = parse_field_list(params['expand'])
+        return context
+
+    def get_queryset(self):
+        context = self.get_serializer_context()
+        plan = plan_for(
+            self.get_serializer_class(),
+            tuple(context.get('fields') or ()),
+            tuple(context.get('expand') or ()),
+        )
+        return plan.apply(super().get_queryset().prefetch_related(None))
+
+
+class QueryPlan:
+
+    def __init__(self, model):
+        self.model = model
+        self.only = {model._meta.pk.name}
+        self.select = set()
+        self.prefetch = {}
+        self.annotate = {}
+        self.restrict_columns = True
+
+    def add_path(self, model, prefix, parts):
+        """Load the column at the end of ``parts``, joining any relations on the way"""
+        for position, part in enumerate(parts):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                # A property or method: it may read any column
+                self.restrict_columns = False
+                return
+            if not field.concrete:
+                self.restrict_columns = False
+                return
+            self.only.add(prefix + part)
+            if position == len(parts) - 1 or not field.is_relation:
+                return
+            self.select.add(prefix + part)
+            prefix, model = f'{prefix}{part}__', field.related_model
+
+    def collect(self, serializer, model, prefix=''):
+        requirements = getattr(getattr(serializer, 'Meta', None), 'field_requirements', {})
+        for name, field in serializer.fields.items():
+            if name in requirements:
+                self.add_requirements(requirements[name], model, prefix)
+                continue
+            if field.source == '*':
+                continue
+
+            path = field.source.replace('.', '__')
+            if isinstance(field, serializers.ListSerializer):
+                self.add_prefetch(model, prefix, path, field.child)
+            elif isinstance(field, serializers.BaseSerializer):
+                related = model._meta.get_field(path)
+                self.only.add(prefix + path)
+                self.select.add(prefix + path)
+                self.collect(field, related.related_model, f'{prefix}{path}__')
+            else:
+                self.add_path(model, prefix, path.split('__'))
+
+    def add_requirements(self, requirement, model, prefix):
+        for path in requirement.get('only', ()):
+            self.add_path(model, prefix, path.split('__'))
+        if not prefix:
+            # Annotations can only be added to the queryset's own model
+            self.annotate.update(requirement.get('annotate', {}))
+
+    def add_prefetch(self, model, prefix, path, child):
+        relation = model._meta.get_field(path)
+        queryset = relation.related_model._default_manager.all()
+        plan = QueryPlan(relation.related_model)
+        plan.collect(child, relation.related_model)
+        if not relation.many_to_many:
+            # The prefetcher matches rows back to their parent through this column
+            plan.only.add(relation.field.name)
+        self.prefetch[prefix + path] = Prefetch(prefix + path, queryset=plan.apply(queryset))
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch.values())
+        if self.annotate:
+            queryset = queryset.annotate(**self.annotate)
+            if not queryset.query.order_by and self.model._meta.ordering:
+                # Meta.ordering is not applied to GROUP BY queries, so repeat it
+                queryset = queryset.order_by(*self.model._meta.ordering)
+        if self.restrict_columns:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+@lru_cache(maxsize=256)
+def plan_for(serializer_class, fields=(), expand=()):
+    """Memoised ``QueryPlan`` for one serializer and field selection"""
+    serializer = serializer_class(context={'fields': list(fields), 'expand': list(expand)})
+    plan = QueryPlan(serializer.Meta.model)
+    plan.collect(serializer, serializer.Meta.model)
+    return plan
+
+
+def optimize_queryset(queryset, serializer):
+    """Restrict ``queryset`` to the columns, joins and prefetches ``serializer`` reads"""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    plan = QueryPlan(queryset.model)
+    plan.collect(serializer, queryset.model)
+    return plan.apply(queryset.prefetch_related(None))
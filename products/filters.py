@@ -0,0 +1,85 @@
+import django_filters
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework import filters
+from .counts import cached_count_rows, cached_per_query
+from .models import Category, Product, ProductListing
+from .search import fuzzy_match_ids, normalize
+
+
+FUZZY_MAX_MATCHES = 100
+
+
+class FuzzySearchFilter(filters.SearchFilter):
+    """
+    ``SearchFilter`` that falls back to trigram matching when the exact
+    ``icontains`` search finds nothing, so "lenvo" still lists Lenovo.
+
+    The fallback ranks the products the other filters already allow, best
+    match first; ``SearchRankOrderingFilter`` keeps that order unless
+    ``?ordering=`` asks for another. Whether the exact search found anything
+    is answered by the cached page count the paginator reuses, and the
+    ranked matches are cached alongside it. The corrected query is left on
+    ``request.did_you_mean`` for the paginator.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filtered = super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        if not terms or cached_count_rows(filtered)[0]:
+            return filtered
+
+        query = ' '.join(terms)
+        try:
+            did_you_mean, ids = cached_per_query(
+                queryset, 'fuzzy', lambda: fuzzy_match_ids(queryset, query, FUZZY_MAX_MATCHES), extra=(query,)
+            )
+        except EmptyResultSet:
+            return filtered
+        if did_you_mean and did_you_mean != normalize(query):
+            request.did_you_mean = did_you_mean
+        request.search_ranked = True
+        if not ids:
+            return queryset.none()
+        rank = Case(*(When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)), output_field=IntegerField())
+        matches = queryset.filter(pk__in=ids)
+        cached_count_rows(matches, known=len(ids))  # spares the paginator a COUNT
+        return matches.order_by(rank)
+
+
+class SearchRankOrderingFilter(filters.OrderingFilter):
+    """``OrderingFilter`` that leaves fuzzy matches in similarity order unless ``?ordering=`` is given"""
+
+    def get_ordering(self, request, queryset, view):
+        if getattr(request, 'search_ranked', False) and not request.query_params.get(self.ordering_param):
+            return None
+        return super().get_ordering(request, queryset, view)
+
+
+class PriceRangeFilterSet(django_filters.FilterSet):
+    """``?min_price=`` / ``?max_price=`` on the price customers pay (``effective_price``)"""
+    min_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='lte')
+
+
+class StockStatusFilterSet(django_filters.FilterSet):
+    """``?stock_status=in_stock|low_stock|out_of_stock`` on the stored ``stock_level``"""
+    stock_status = django_filters.ChoiceFilter(field_name='stock_level', choices=Product.STOCK_LEVEL_CHOICES)
+
+
+class ProductFilter(PriceRangeFilterSet, StockStatusFilterSet):
+
+    class Meta:
+        model = Product
+        fields = ['subcategory', 'subcategory__category', 'brand', 'in_stock', 'is_featured', 'product_type']
+
+
+class ProductListingFilter(PriceRangeFilterSet, StockStatusFilterSet):
+    """``ProductFilter`` over the listing projection (same names, no joins)"""
+    subcategory__category = django_filters.ModelChoiceFilter(
+        field_name='category', queryset=Category.objects.all()
+    )
+
+    class Meta:
+        model = ProductListing
+        fields = ['subcategory', 'subcategory__category', 'brand', 'in_stock', 'is_featured', 'product_type']
@@ -1,6 +1,7 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import Product
+from . import bulk
 import json
 
 
@@ -118,4 +119,66 @@ class ProductAdminForm(forms.ModelForm):
         js = ('admin/js/product_conditional_fields.js',)
         css = {
             'all': ('admin/css/product_admin.css',)
-        }
\ No newline at end of file
+        }
+
+
+class BulkPriceStockForm(forms.Form):
+    """Parameters for the set-based bulk price/stock admin action (see bulk.py)"""
+
+    OPERATION_CHOICES = [
+        ('price_percent', 'Change prices by percentage (e.g. 5 or -10)'),
+        ('price_amount', 'Change prices by amount in AED (e.g. 2.50 or -1)'),
+        ('discount_start', 'Start discount campaign: % off the regular price'),
+        ('discount_end', 'End discount (back to regular price)'),
+        ('stock_delta', 'Adjust stock by (e.g. 20 or -5)'),
+        ('stock_set', 'Set stock to'),
+    ]
+
+    operation = forms.ChoiceField(choices=OPERATION_CHOICES, widget=forms.RadioSelect)
+    value = forms.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        operation = cleaned_data.get('operation')
+        value = cleaned_data.get('value')
+        if operation and operation != 'discount_end' and value is None:
+            self.add_error('value', 'A value is required for this operation.')
+        elif operation == 'discount_start' and (not 0 < value < 100 or value != int(value)):
+            self.add_error('value', 'Discount must be a whole number between 1 and 99 percent.')
+        elif operation in ('stock_delta', 'stock_set') and value != int(value):
+            self.add_error('value', 'Stock changes must be whole numbers.')
+        return cleaned_data
+
+    def changes(self):
+        operation, value = self.cleaned_data['operation'], self.cleaned_data['value']
+        return {
+            'price_percent': lambda: bulk.price_change(percent=value),
+            'price_amount': lambda: bulk.price_change(amount=value),
+            'discount_start': lambda: bulk.discount_campaign(value),
+            'discount_end': bulk.end_discount,
+            'stock_delta': lambda: bulk.stock_change(delta=value),
+            'stock_set': lambda: bulk.stock_change(set_to=value),
+        }[operation]()
+
+
+class BulkCSVForm(forms.Form):
+    csv_file = forms.FileField(
+        required=False,
+        label="CSV file",
+        help_text="Columns: sku (required) and any of price, original_price, discount, "
+                  "stock_count, stock_delta. Empty cells leave the value unchanged."
+    )
+    # The previewed file is sent back with "Apply" so it need not be uploaded twice
+    csv_text = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('csv_file')
+        if upload:
+            try:
+                cleaned_data['csv_text'] = upload.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise ValidationError("The CSV file must be UTF-8 encoded.")
+        if not cleaned_data.get('csv_text'):
+            raise ValidationError("Choose a CSV file.")
+        return cleaned_data
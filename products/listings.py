@@ -0,0 +1,181 @@
+"""
+The ``ProductListing`` projection behind /api/products/.
+
+Every active product has one flat row carrying the columns the list filters
+and orderings need (category ids copied in, so no joins) and ``data``: the
+``ProductListSerializer`` output rendered once, at write time. A compatible
+list request is then one indexed scan of a single table plus the count, and
+its response body is the stored JSON strings concatenated into the usual
+pagination envelope, with no model instances or serializers involved.
+
+Rows are refreshed by ``refresh_listings(ids)``:
+
+* ``signals.py`` on Product saves, and on Subcategory/Category saves whose
+  names, slugs or parent changed (deletes cascade);
+* the bulk paths that bypass signals: ``bulk.apply()``, the admin update()
+  actions and the synthetic catalogue generator;
+* ``python manage.py rebuild_listings`` for everything (after deploys that
+  change the list serializer, or after loaddata).
+
+Requests the projection cannot answer (``?search=``, ``?fields=``/
+``?expand=``, unknown parameters, non-JSON renderers) take the normal
+serializer pipeline, as does everything while the table is still empty.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django_filters.utils import translate_validation
+from rest_framework.filters import OrderingFilter
+
+from config.renderers import ORJSONRenderer
+from .filters import ProductListingFilter
+from .models import Product, ProductListing
+from .serializers import ProductListSerializer
+
+
+BATCH_SIZE = 500
+READY_CHECK_SECONDS = 60
+
+LISTING_PARAMS = {'page', 'page_size', 'ordering'}
+
+UPDATE_FIELDS = [
+    field.name for field in ProductListing._meta.concrete_fields if not field.primary_key
+]
+
+_ready = {}  # {'value': bool, 'checked': monotonic time}
+
+
+# ----- Maintenance --------------------------------------------------------
+
+def build_listings(products):
+    """
+    Unsaved ``ProductListing`` rows for ``products`` (with
+    subcategory__category loaded). One ``many=True`` serializer and one
+    renderer cover the whole batch; a serializer per row costs ten times more.
+    """
+    renderer = ORJSONRenderer()
+    serialized = ProductListSerializer(products, many=True).data
+    return [_listing(product, renderer.render(data).decode()) for product, data in zip(products, serialized)]
+
+
+def _listing(product, data):
+    subcategory = product.subcategory
+    category = subcategory.category
+    return ProductListing(
+        product_id=product.id,
+        subcategory_id=subcategory.id,
+        category_id=category.id,
+        brand=product.brand,
+        product_type=product.product_type,
+        in_stock=product.in_stock,
+        is_featured=product.is_featured,
+        name=product.name,
+        price=product.price,
+        created_at=product.created_at,
+        category_name=category.name,
+        category_slug=category.slug,
+        subcategory_name=subcategory.name,
+        subcategory_slug=subcategory.slug,
+        effective_price=product.effective_price,
+        is_on_sale=product.is_on_sale,
+        stock_level=product.stock_level,
+        image_url=product.primary_image_url,
+        data=data,
+    )
+
+
+def refresh_listings(ids, batch_size=BATCH_SIZE):
+    """Re-render the listing rows of products ``ids``; inactive or deleted ones are dropped"""
+    ids = list(ids)
+    refreshed = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        products = list(
+            Product.objects.filter(pk__in=batch, is_active=True).select_related('subcategory__category')
+        )
+        with transaction.atomic():
+            ProductListing.objects.filter(pk__in=batch).exclude(
+                pk__in=[product.id for product in products]
+            ).delete()
+            ProductListing.objects.bulk_create(
+                build_listings(products),
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=UPDATE_FIELDS,
+            )
+        refreshed += len(products)
+    if refreshed and not _ready.get('value'):
+        _ready.clear()  # the projection may have just been built
+    return refreshed
+
+
+def rebuild_listings(batch_size=BATCH_SIZE):
+    """Refresh every active product's row and drop the rest; returns the row count"""
+    ProductListing.objects.exclude(product__is_active=True).delete()
+    ids = Product.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+    return refresh_listings(ids, batch_size=batch_size)
+
+
+def refresh_subcategory_listings(subcategory):
+    """Rows that copied an outdated name/slug/category of ``subcategory``"""
+    ids = ProductListing.objects.filter(subcategory=subcategory).exclude(
+        Q(subcategory_name=subcategory.name)
+        & Q(subcategory_slug=subcategory.slug)
+        & Q(category_id=subcategory.category_id)
+    ).values_list('pk', flat=True)
+    return refresh_listings(ids)
+
+
+def refresh_category_listings(category):
+    ids = ProductListing.objects.filter(category=category).exclude(
+        category_name=category.name, category_slug=category.slug
+    ).values_list('pk', flat=True)
+    return refresh_listings(ids)
+
+
+# ----- Serving ------------------------------------------------------------
+
+def listings_ready():
+    """False until the projection has been built (checked once a minute per process)"""
+    now = time.monotonic()
+    if 'value' not in _ready or now - _ready['checked'] > READY_CHECK_SECONDS:
+        _ready.update(value=ProductListing.objects.exists(), checked=now)
+    return _ready['value']
+
+
+def listing_response(view, request):
+    """
+    The list page for ``request`` straight from the projection, or None when
+    the request needs the full serializer pipeline.
+    """
+    renderer = request.accepted_renderer
+    if not settings.PRODUCT_LISTING_PROJECTION or renderer.format != 'json':
+        return None
+    if renderer.get_indent(request.accepted_media_type, {}):
+        return None  # stored rows are compact
+    if set(request.query_params) - LISTING_PARAMS - set(ProductListingFilter.base_filters):
+        return None
+    if not listings_ready():
+        return None
+
+    filterset = ProductListingFilter(
+        request.query_params, queryset=ProductListing.objects.all(), request=request
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    queryset = OrderingFilter().filter_queryset(request, filterset.qs, view)
+
+    paginator = view.paginator
+    page = paginator.paginate_queryset(queryset.values_list('data', flat=True), request, view=view)
+    envelope = renderer.render({
+        'count': paginator.page.paginator.count,
+        'count_is_approximate': paginator.page.paginator.count_is_approximate,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    })
+    body = b'%s,"results":[%s]}' % (envelope[:-1], ','.join(page).encode())
+    return HttpResponse(body, content_type='application/json')
@@ -0,0 +1,26 @@
+"""
+``__trgm_icontains``: case-insensitive substring match the pg_trgm GIN
+indexes can answer.
+
+On PostgreSQL Django's ``icontains`` compiles to
+``UPPER(col::text) LIKE UPPER(%s)``, an expression the plain-column
+``gin_trgm_ops`` indexes of migration 0005 do not cover, so it scans the
+table. This lookup emits ``col ILIKE %s`` there instead (same escaping and
+matches); other databases get the ordinary ``icontains`` SQL.
+"""
+
+from django.db.models import CharField
+from django.db.models.lookups import IContains
+
+
+@CharField.register_lookup
+class TrigramIContains(IContains):
+    lookup_name = 'trgm_icontains'
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', (*lhs_params, *rhs_params)
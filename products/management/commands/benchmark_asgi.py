@@ -0,0 +1,118 @@
+"""
+Compare concurrent-connection throughput of the WSGI and ASGI read paths.
+
+Starts gunicorn twice with the same worker count -- sync workers serving the
+DRF viewsets, then uvicorn workers serving the async views -- and drives each
+with the same number of concurrent connections.
+
+Usage:
+    python manage.py benchmark_asgi --workers 2 --concurrency 64 --duration 10
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the WSGI (sync DRF) and ASGI (async ORM) catalogue read paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+        parser.add_argument('--port', type=int, default=8701)
+        parser.add_argument('--wsgi-path', default='/api/products/')
+        parser.add_argument('--asgi-path', default='/api/async/products/')
+
+    def handle(self, *args, **options):
+        runs = [
+            ('WSGI', 'config.wsgi:application', [], options['wsgi_path']),
+            ('ASGI', 'config.asgi:application', ['-k', 'uvicorn_worker.UvicornWorker'], options['asgi_path']),
+        ]
+        for offset, (label, app, extra, path) in enumerate(runs):
+            port = options['port'] + offset
+            server = self._start_server(app, extra, port, options['workers'])
+            try:
+                latencies, errors, elapsed = asyncio.run(self._drive(
+                    port, path, options['concurrency'], options['duration']
+                ))
+            finally:
+                server.terminate()
+                server.wait(timeout=10)
+            self._report(label, path, latencies, errors, elapsed)
+
+    def _start_server(self, app, extra, port, workers):
+        command = [
+            sys.executable, '-m', 'gunicorn', app,
+            '--workers', str(workers),
+            '--bind', f'127.0.0.1:{port}',
+            '--log-level', 'warning',
+            *extra,
+        ]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        server = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR)
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited while starting {app}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'gunicorn did not start listening on port {port}')
+
+    async def _request(self, port, path):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        writer.close()
+        return status_line.split(b' ', 2)[1] == b'200'
+
+    async def _drive(self, port, path, concurrency, duration):
+        latencies = []
+        errors = 0
+        stop_at = time.monotonic() + duration
+
+        async def client():
+            nonlocal errors
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    ok = await self._request(port, path)
+                except (OSError, IndexError, asyncio.IncompleteReadError):
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, errors, time.monotonic() - started
+
+    def _report(self, label, path, latencies, errors, elapsed):
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f'{label} {path}: no successful requests ({errors} errors)'))
+            return
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+        self.stdout.write(
+            f'{label:<5} {path:<28} {len(latencies) / elapsed:8.1f} req/s  '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+            f'p95 {p95 * 1000:7.1f} ms  errors {errors}'
+        )
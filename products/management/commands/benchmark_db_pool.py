@@ -0,0 +1,93 @@
+"""
+Requests/sec against a local PostgreSQL with and without connection pooling.
+
+Each configuration runs in a fresh child process (settings are read from the
+environment at startup) that drives the Django test client from several
+threads. With ``DB_CONN_MAX_AGE=0`` every request opens and closes its own
+connection, which is what bursty traffic costs today.
+
+Usage:
+    DATABASE_URL=postgres://localhost/khaizan python manage.py benchmark_db_pool
+    python manage.py benchmark_db_pool --threads 8 --duration 10 --path /api/categories/
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+
+CONFIGURATIONS = [
+    ('no pooling, new connection per request', {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '0'}),
+    ('persistent connections (CONN_MAX_AGE=60)', {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '60'}),
+    ('psycopg pool', {'DB_POOL': 'True'}),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API requests/sec with and without database connection pooling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per configuration')
+        parser.add_argument('--path', default='/api/products/?page_size=5')
+        parser.add_argument('--child', action='store_true', help='Internal: run one measurement')
+
+    def handle(self, *args, **options):
+        if options['child']:
+            self.stdout.write(json.dumps(self._measure(options)))
+            return
+
+        if connection.vendor != 'postgresql':
+            raise CommandError('Pooling is PostgreSQL-only: point DATABASE_URL at a local Postgres')
+
+        for label, env in CONFIGURATIONS:
+            result = subprocess.run(
+                [
+                    sys.executable, 'manage.py', 'benchmark_db_pool', '--child',
+                    '--threads', str(options['threads']),
+                    '--duration', str(options['duration']),
+                    '--path', options['path'],
+                ],
+                env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE, **env),
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+            if result.returncode != 0:
+                raise CommandError(result.stderr.strip())
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{label:<42} {stats['requests'] / stats['elapsed']:8.1f} req/s  "
+                f"errors {stats['errors']}"
+            )
+
+    def _measure(self, options):
+        stop_at = time.monotonic() + options['duration']
+        counts = {'requests': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+            done = errors = 0
+            while time.monotonic() < stop_at:
+                if client.get(options['path']).status_code == 200:
+                    done += 1
+                else:
+                    errors += 1
+            with lock:
+                counts['requests'] += done
+                counts['errors'] += errors
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return dict(counts, elapsed=time.monotonic() - started)
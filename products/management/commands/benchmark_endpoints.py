@@ -0,0 +1,232 @@
+"""
+Endpoint benchmark suite with regression thresholds.
+
+Seeds a throwaway test database with a deterministic catalogue, then drives
+every public endpoint through the Django test client and records p50/p95
+latency, query count and peak allocated memory. Results are compared with a
+stored baseline; any query-count increase, or latency/memory beyond the
+tolerances, fails the run (non-zero exit status).
+
+Latency baselines are machine-specific: regenerate them with
+``--update-baseline`` on the machine that runs the comparison.
+
+Usage:
+    python manage.py benchmark_endpoints --size 1k
+    python manage.py benchmark_endpoints --size 10k --repeat 30
+    python manage.py benchmark_endpoints --size 1k --update-baseline
+"""
+
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from products.models import Category, Subcategory, Product
+from products.synthetic import generate_catalog
+
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmarks' / 'baseline.json'
+
+
+def _quote(products, items):
+    return {
+        'name': 'Benchmark Buyer',
+        'email': 'buyer@example.com',
+        'phone': '+971500000000',
+        'company': 'Benchmarks LLC',
+        'items': [
+            {'product': product.id, 'quantity': 1 + i % 5, 'price': str(product.price)}
+            for i, product in enumerate(products[:items])
+        ],
+    }
+
+
+def build_scenarios():
+    """``[(name, method, path, body)]`` covering every public endpoint"""
+    product = Product.objects.filter(is_active=True).order_by('sku').first()
+    subcategory = Subcategory.objects.order_by('id').first()
+    category = Category.objects.order_by('id').first()
+    quote_products = list(Product.objects.filter(is_active=True).order_by('sku')[:200])
+
+    scenarios = [
+        ('products.list', 'get', '/api/products/', None),
+        ('products.list.page_size_100', 'get', '/api/products/?page_size=100', None),
+        ('products.list.deep_page', 'get', '/api/products/?page=40', None),
+        ('products.list.columns', 'get', '/api/products/?page_size=100&format=columns', None),
+        ('products.filter.subcategory', 'get', f'/api/products/?subcategory={subcategory.id}', None),
+        ('products.filter.category', 'get', f'/api/products/?subcategory__category={category.id}', None),
+        ('products.filter.brand', 'get', '/api/products/?brand=HP', None),
+        ('products.filter.in_stock', 'get', '/api/products/?in_stock=false', None),
+        ('products.filter.is_featured', 'get', '/api/products/?is_featured=true', None),
+        ('products.filter.product_type', 'get', '/api/products/?product_type=rental', None),
+        ('products.order.price', 'get', '/api/products/?ordering=price', None),
+        ('products.order.-price', 'get', '/api/products/?ordering=-price', None),
+        ('products.order.name', 'get', '/api/products/?ordering=name', None),
+        ('products.order.created_at', 'get', '/api/products/?ordering=created_at', None),
+        ('products.order.effective_price', 'get', '/api/products/?ordering=effective_price', None),
+        ('products.filter.price_range', 'get', '/api/products/?min_price=100&max_price=500', None),
+        ('products.filter.stock_status', 'get', '/api/products/?stock_status=low_stock', None),
+        ('products.price_histogram', 'get', '/api/products/price-histogram/', None),
+        ('products.search.word', 'get', '/api/products/?search=printer', None),
+        ('products.search.sku', 'get', f'/api/products/?search={product.sku}', None),
+        ('products.search.fuzzy', 'get', '/api/products/?search=lenvo', None),
+        ('products.detail', 'get', f'/api/products/{product.slug}/', None),
+        ('products.batch.20', 'get',
+         '/api/products/batch/?slugs=' + ','.join(p.slug for p in quote_products[:20]), None),
+        ('products.featured', 'get', '/api/products/featured/', None),
+        ('products.new', 'get', '/api/products/new/', None),
+        ('products.refurbished', 'get', '/api/products/refurbished/', None),
+        ('products.rental', 'get', '/api/products/rental/', None),
+        ('products.autocomplete', 'get', '/api/products/autocomplete/?q=hp', None),
+        ('products.did_you_mean', 'get', '/api/products/did-you-mean/?q=lenvo', None),
+        ('categories.list', 'get', '/api/categories/', None),
+        ('categories.detail', 'get', f'/api/categories/{category.slug}/', None),
+        ('subcategories.list', 'get', '/api/subcategories/', None),
+        ('subcategories.filter.category', 'get', f'/api/subcategories/?category={category.id}', None),
+        ('subcategories.detail', 'get', f'/api/subcategories/{subcategory.slug}/', None),
+    ]
+    for items in (1, 20, 200):
+        scenarios.append((f'quotes.create.{items}', 'post', '/api/quotes/', _quote(quote_products, items)))
+    return scenarios
+
+
+def measure(client, method, path, body, repeat):
+    def call():
+        if method == 'post':
+            return client.post(path, body, content_type='application/json')
+        return client.get(path)
+
+    response = call()  # warm-up (and lazily built in-process indexes)
+    if response.status_code >= 400:
+        raise CommandError(f'{method.upper()} {path} returned {response.status_code}')
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    with CaptureQueriesContext(connection) as queries:
+        call()
+    query_count = len(queries)  # the next request clears the query log
+
+    # A collection cycle landing inside the traced call would swing the peak
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[max(0, int(len(timings) * 0.95) - 1)], 3),
+        'queries': query_count,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every public endpoint against a seeded catalogue and check for regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='1k', help=f"Catalogue size: {', '.join(SIZES)} or a number")
+        parser.add_argument('--repeat', type=int, default=20, help='Timed calls per endpoint')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--update-baseline', action='store_true')
+        parser.add_argument('--latency-tolerance', type=float, default=0.5,
+                            help='Allowed p95 increase as a fraction of the baseline')
+        parser.add_argument('--latency-slack-ms', type=float, default=2.0,
+                            help='Absolute p95 increase always tolerated (timer noise)')
+        parser.add_argument('--memory-tolerance', type=float, default=0.25)
+        parser.add_argument('--only', help='Only run scenarios whose name starts with this')
+
+    def handle(self, *args, **options):
+        size = SIZES.get(options['size']) or int(options['size'])
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            started = time.perf_counter()
+            generate_catalog(size, seed=options['seed'])
+            self.stdout.write(f'Seeded {size} products in {time.perf_counter() - started:.1f}s')
+
+            # Keep instrumentation, replica routing, the response cache and
+            # cached counts out of the measurements (a warm cache would hide
+            # every regression)
+            with override_settings(
+                SQL_INSTRUMENTATION_SAMPLE_RATE=0, REPLICA_ROUTED_APPS=[],
+                RESPONSE_CACHE_SECONDS=0, API_COUNT_CACHE_SECONDS=0,
+            ):
+                results = self._run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self._compare(str(size), results, options)
+
+    def _run(self, options):
+        client = Client()
+        results = {}
+        self.stdout.write(f"{'scenario':<34}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}{'peak KiB':>10}")
+        for name, method, path, body in build_scenarios():
+            if options['only'] and not name.startswith(options['only']):
+                continue
+            result = results[name] = measure(client, method, path, body, options['repeat'])
+            self.stdout.write(
+                f"{name:<34}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['queries']:>9}{result['peak_kib']:>10.1f}"
+            )
+        return results
+
+    def _compare(self, size, results, options):
+        path = Path(options['baseline'])
+        baseline = json.loads(path.read_text()) if path.exists() else {}
+
+        if options['update_baseline']:
+            baseline.setdefault(size, {}).update(results)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline for size {size} written to {path}'))
+            return
+
+        expected = baseline.get(size)
+        if not expected:
+            self.stdout.write(self.style.WARNING(f'No baseline for size {size}; run with --update-baseline'))
+            return
+
+        failures = []
+        for name, result in results.items():
+            base = expected.get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                failures.append(f"{name}: queries {base['queries']} -> {result['queries']}")
+            latency_limit = base['p95_ms'] * (1 + options['latency_tolerance']) + options['latency_slack_ms']
+            if result['p95_ms'] > latency_limit:
+                failures.append(f"{name}: p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+            if result['peak_kib'] > base['peak_kib'] * (1 + options['memory_tolerance']):
+                failures.append(f"{name}: peak memory {base['peak_kib']} -> {result['peak_kib']} KiB")
+
+        if failures:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against the size {size} baseline'))
@@ -0,0 +1,109 @@
+"""
+Encode time and payload size of the API renderers on 100-item product pages.
+
+Seeds a throwaway test database like benchmark_endpoints, serializes a
+100-item list page and 100 product details once, then times each renderer
+on the same data and reports the raw and gzipped body sizes.
+
+Usage:
+    python manage.py benchmark_renderers
+    python manage.py benchmark_renderers --size 10k --repeat 200
+"""
+
+import gzip
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from rest_framework.renderers import JSONRenderer
+
+from config import renderers
+from products.management.commands.benchmark_endpoints import SIZES
+from products.models import Product
+from products.serializers import ProductDetailSerializer, ProductListSerializer
+from products.synthetic import generate_catalog
+
+
+PAGE_SIZE = 100
+
+
+def build_payloads():
+    """``{name: data}`` for a list page and a batch of details, as the views return them"""
+    products = Product.objects.filter(is_active=True).select_related('subcategory__category')
+    page = list(products.order_by('-created_at')[:PAGE_SIZE])
+    details = list(products.prefetch_related('images').order_by('sku')[:PAGE_SIZE])
+    return {
+        'list page': {
+            'count': products.count(),
+            'next': 'http://testserver/api/products/?page=2&page_size=100',
+            'previous': None,
+            'results': ProductListSerializer(page, many=True).data,
+        },
+        'details': ProductDetailSerializer(details, many=True).data,
+    }
+
+
+def available_renderers():
+    found = [('JSONRenderer (stdlib json)', JSONRenderer())]
+    if renderers.orjson is not None:
+        found.append(('ORJSONRenderer', renderers.ORJSONRenderer()))
+    if renderers.msgpack is not None:
+        found.append(('MessagePackRenderer', renderers.MessagePackRenderer()))
+    return found
+
+
+def measure(renderer, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = renderer.render(data, renderer.media_type, {})
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'bytes': len(body),
+        'gzip_bytes': len(gzip.compress(body, compresslevel=6)),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare renderer encode time and payload size on 100-item product pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='1k', help=f"Catalogue size: {', '.join(SIZES)} or a number")
+        parser.add_argument('--repeat', type=int, default=100, help='Timed encodes per renderer')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        size = SIZES.get(options['size']) or int(options['size'])
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            generate_catalog(size, seed=options['seed'])
+            payloads = build_payloads()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        missing = [name for name in ('orjson', 'msgpack') if getattr(renderers, name) is None]
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Not installed, skipped: {', '.join(missing)}"))
+
+        for payload, data in payloads.items():
+            self.stdout.write(f'\n{payload} ({PAGE_SIZE} products)')
+            self.stdout.write(f"{'renderer':<30}{'p50 ms':>9}{'min ms':>9}{'bytes':>10}{'gzip':>9}{'speedup':>9}")
+            reference = None
+            for name, renderer in available_renderers():
+                result = measure(renderer, data, options['repeat'])
+                reference = reference or result['p50_ms']
+                self.stdout.write(
+                    f"{name:<30}{result['p50_ms']:>9.3f}{result['min_ms']:>9.3f}"
+                    f"{result['bytes']:>10}{result['gzip_bytes']:>9}{reference / result['p50_ms']:>8.1f}x"
+                )
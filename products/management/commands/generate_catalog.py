@@ -0,0 +1,117 @@
+"""
+Django management command to generate a large, reproducible synthetic catalogue.
+
+Unlike populate_products it never deletes real data, and the same --seed always
+produces the same rows. Products are written with batched bulk inserts; with
+--workers > 1 each worker process inserts its own disjoint SKU range. The
+listing projection is rebuilt once, after every worker has finished.
+
+Usage:
+    python manage.py generate_catalog --products 100000
+    python manage.py generate_catalog --products 1000000 --workers 4 --quotes 20000
+    python manage.py generate_catalog --clear
+"""
+
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+
+from products.changes import bulk_load
+from products.featured import reshuffle_featured
+from products.models import Subcategory, Product
+from products.synthetic import (
+    build_categories,
+    generate_products,
+    generate_quotes,
+    sku_for,
+)
+from quotes.models import QuoteRequest
+
+
+def _worker(args):
+    seed, subcategory_ids, start, count, batch_size = args
+    connections.close_all()  # never reuse the parent's connection after fork
+    subcategories = list(Subcategory.objects.filter(id__in=subcategory_ids).order_by('id'))
+    with transaction.atomic():
+        return generate_products(seed, subcategories, start, count, batch_size=batch_size)
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic catalogue (categories, products, images, quotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--categories', type=int, default=7)
+        parser.add_argument('--subcategories', type=int, default=4, help='Subcategories per category')
+        parser.add_argument('--quotes', type=int, default=0)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=1, help='Parallel insert processes')
+        parser.add_argument('--start', type=int, help='First SKU number (default: after existing synthetic SKUs)')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated products first')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        if options['clear']:
+            deleted, _ = Product.objects.filter(sku__startswith=sku_for(0)[:4]).delete()
+            self.stdout.write(f'Deleted {deleted} synthetic rows')
+
+        # Listings, cached responses and CDN purges are done once, on the way out
+        with bulk_load():
+            subcategories = build_categories(options['categories'], options['subcategories'])
+            self.stdout.write(f'{len(subcategories)} subcategories ready')
+
+            start = options['start']
+            if start is None:
+                last = (
+                    Product.objects.filter(sku__startswith=sku_for(0)[:4])
+                    .order_by('-sku').values_list('sku', flat=True).first()
+                )
+                start = int(last[4:]) + 1 if last else 1
+
+            workers = options['workers']
+            if workers > 1 and connection.vendor == 'sqlite':
+                self.stdout.write(self.style.WARNING('SQLite allows one writer at a time: using 1 worker'))
+                workers = 1
+
+            total = options['products']
+            batch_size = options['batch_size']
+            if workers == 1:
+                with transaction.atomic():
+                    products, images = generate_products(
+                        options['seed'], subcategories, start, total, batch_size=batch_size
+                    )
+            else:
+                # Chunks are whole batches so the output is identical to a 1-worker run
+                batches = -(-total // batch_size)
+                per_worker = -(-batches // workers) * batch_size
+                subcategory_ids = [subcategory.id for subcategory in subcategories]
+                jobs = [
+                    (options['seed'], subcategory_ids, chunk_start, min(per_worker, start + total - chunk_start), batch_size)
+                    for chunk_start in range(start, start + total, per_worker)
+                ]
+                connections.close_all()
+                with multiprocessing.get_context('fork').Pool(len(jobs)) as pool:
+                    results = pool.map(_worker, jobs)
+                products = sum(result[0] for result in results)
+                images = sum(result[1] for result in results)
+
+            self.stdout.write(
+                f'Created {products} products (SKU {sku_for(start)}..{sku_for(start + total - 1)}) '
+                f'and {images} images'
+            )
+
+            # bulk_create skips the signals that keep the featured rotation current
+            reshuffle_featured(options['seed'])
+
+        if options['quotes']:
+            quotes, items = generate_quotes(options['seed'], options['quotes'], batch_size=batch_size)
+            self.stdout.write(f'Created {quotes} quotes with {items} items')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {time.perf_counter() - started:.1f}s '
+            f'({Product.objects.count()} products, {QuoteRequest.objects.count()} quotes in total)'
+        ))
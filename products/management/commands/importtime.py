@@ -0,0 +1,73 @@
+"""
+Summarise ``python -X importtime`` for the application's boot path.
+
+Runs a fresh interpreter that sets Django up and imports the WSGI module (the
+same work every gunicorn worker does without ``preload_app``), then reports
+the slowest imports and the resident memory it ended with.
+
+Usage:
+    python manage.py importtime
+    python manage.py importtime --limit 30 --module config.asgi
+"""
+
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+BOOT_SCRIPT = '''
+import importlib, resource, sys
+importlib.import_module(sys.argv[1])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+class Command(BaseCommand):
+    help = 'Report import time and resident memory of a cold application boot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='config.wsgi', help='Module a worker imports at boot')
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT, options['module']],
+            env=env, cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        imports = []
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                imports.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+        total_us = sum(self_us for _, self_us, _, _ in imports)
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in imports:
+            by_package[name.split('.')[0]] += self_us
+
+        limit = options['limit']
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(imports)} modules imported in {total_us / 1000:.1f} ms, '
+            f'max RSS {int(result.stdout.split()[-1]) / 1024:.1f} MiB'
+        ))
+
+        self.stdout.write('\nSlowest top-level imports (cumulative):')
+        top_level = sorted((i for i in imports if i[3] == 0), key=lambda i: -i[2])
+        for name, _, cumulative_us, _ in top_level[:limit]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {name}')
+
+        self.stdout.write('\nPackages by own import time:')
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'  {self_us / 1000:8.1f} ms  {package}')
@@ -0,0 +1,31 @@
+"""
+Django management command to rebuild the ProductListing projection.
+
+Run it after deploys that change ProductListSerializer, after loaddata, or
+once after the migration that creates the table; product, subcategory and
+category saves keep it current afterwards.
+
+Usage:
+    python manage.py rebuild_listings
+    python manage.py rebuild_listings --batch-size 2000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.listings import BATCH_SIZE, rebuild_listings
+
+
+class Command(BaseCommand):
+    help = 'Re-render every row of the product listing projection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_listings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} product listings in {time.perf_counter() - started:.1f}s'
+        ))
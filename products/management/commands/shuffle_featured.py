@@ -0,0 +1,28 @@
+"""
+Django management command to reshuffle the featured products rotation.
+
+Run it on a schedule (e.g. nightly cron) so the rotation order changes;
+joining or leaving the featured set already reshuffles automatically.
+
+Usage:
+    python manage.py shuffle_featured
+    python manage.py shuffle_featured --seed 7
+"""
+
+from django.core.management.base import BaseCommand
+
+from config.cdn import purge
+from products.featured import reshuffle_featured
+from products.surrogate_keys import collection_key
+
+
+class Command(BaseCommand):
+    help = 'Reshuffle the featured products rotation order'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, help='Reproducible shuffle (default: random)')
+
+    def handle(self, *args, **options):
+        count = reshuffle_featured(options['seed'])
+        purge({collection_key('featured')})
+        self.stdout.write(self.style.SUCCESS(f'Reshuffled {count} featured products'))
@@ -0,0 +1,52 @@
+"""
+Django management command to report stock level transitions.
+
+Run it on a schedule (e.g. hourly cron). Each run reports only the products
+whose stock level (in stock / low stock / out of stock) changed since the
+previous run, then remembers the reported levels. The report is printed and,
+when STOCK_ALERT_RECIPIENTS is set, emailed.
+
+Usage:
+    python manage.py stock_alerts
+    python manage.py stock_alerts --dry-run    # report without remembering
+"""
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.stock import mark_alerted, stock_transitions
+
+
+LEVELS = dict(Product.STOCK_LEVEL_CHOICES)
+
+
+class Command(BaseCommand):
+    help = 'Report products whose stock level changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report, but report the same changes again next run')
+
+    def handle(self, *args, **options):
+        transitions = stock_transitions()
+        if not transitions:
+            self.stdout.write('No stock level changes')
+            return
+
+        lines = [
+            f"{row['category_name']} · {row['sku']} {row['name']}: "
+            f"{LEVELS[row['alerted_level']]} → {LEVELS[row['stock_level']]} ({row['stock_count']} left)"
+            for row in transitions
+        ]
+        report = '\n'.join(lines)
+        self.stdout.write(report)
+
+        if settings.STOCK_ALERT_RECIPIENTS:
+            send_mail(
+                f'Stock alert: {len(transitions)} product(s) changed stock level',
+                report, None, settings.STOCK_ALERT_RECIPIENTS,
+            )
+        if not options['dry_run']:
+            mark_alerted(transitions)
+        self.stdout.write(self.style.SUCCESS(f'Reported {len(transitions)} stock level change(s)'))
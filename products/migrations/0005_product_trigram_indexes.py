@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+TRIGRAM_INDEXES = {
+    'products_product_name_trgm': 'name',
+    'products_product_brand_trgm': 'brand',
+    'products_product_sku_trgm': 'sku',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm only exists on PostgreSQL; SQLite uses the in-process index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON products_product '
+            f'USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_product_condition_alter_product_features_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:47
+
+import random
+
+from django.db import migrations, models
+
+
+def rank_featured(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ids = list(
+        Product.objects.filter(is_active=True, is_featured=True)
+        .order_by('id').values_list('id', flat=True)
+    )
+    random.Random(0).shuffle(ids)
+    for rank, product_id in enumerate(ids):
+        Product.objects.filter(id=product_id).update(featured_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='featured_rank',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('featured_rank__isnull', False)), fields=['featured_rank'], name='products_featured_rank_idx'),
+        ),
+        migrations.RunPython(rank_featured, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_featured_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='products.product')),
+                ('brand', models.CharField(max_length=200)),
+                ('product_type', models.CharField(choices=[('new', 'New Product'), ('refurbished', 'Refurbished Product'), ('rental', 'Rental Product')], max_length=20)),
+                ('in_stock', models.BooleanField()),
+                ('is_featured', models.BooleanField()),
+                ('name', models.CharField(max_length=300)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('category_name', models.CharField(max_length=200)),
+                ('category_slug', models.SlugField()),
+                ('subcategory_name', models.CharField(max_length=200)),
+                ('subcategory_slug', models.SlugField(max_length=250)),
+                ('final_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_on_sale', models.BooleanField()),
+                ('stock_status', models.CharField(max_length=20)),
+                ('image_url', models.URLField(blank=True, max_length=500)),
+                ('data', models.TextField(help_text='Prerendered list JSON for this product')),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.category')),
+                ('subcategory', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.subcategory')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='products_pr_created_818a10_idx'), models.Index(fields=['price'], name='products_pr_price_9e02a8_idx'), models.Index(fields=['name'], name='products_pr_name_c963a0_idx'), models.Index(fields=['subcategory', '-created_at'], name='products_pr_subcate_3ca503_idx'), models.Index(fields=['category', '-created_at'], name='products_pr_categor_d507bc_idx'), models.Index(fields=['brand'], name='products_pr_brand_103452_idx'), models.Index(fields=['product_type', '-created_at'], name='products_pr_product_e6c613_idx'), models.Index(fields=['is_featured'], name='products_pr_is_feat_d5fd63_idx'), models.Index(fields=['in_stock'], name='products_pr_in_stoc_518322_idx')],
+            },
+        ),
+    ]
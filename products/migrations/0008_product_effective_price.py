@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:23
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 500
+
+
+def store_effective_prices(apps, schema_editor):
+    # Product.final_price as of this migration, a pk-ordered chunk at a time
+    Product = apps.get_model('products', 'Product')
+    last_pk = 0
+    while True:
+        products = list(
+            Product.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('price', 'original_price', 'discount')[:BATCH_SIZE]
+        )
+        if not products:
+            break
+        for product in products:
+            if product.discount > 0 and product.original_price:
+                discount_amount = (product.original_price * product.discount) / 100
+                product.effective_price = round(product.original_price - discount_amount, 2)
+            else:
+                product.effective_price = product.price
+        Product.objects.bulk_update(products, ['effective_price'])
+        last_pk = products[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_productlisting'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='productlisting',
+            old_name='final_price',
+            new_name='effective_price',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Price the customer pays (after discount)', max_digits=10),
+        ),
+        migrations.RunPython(store_effective_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price'], name='products_pr_effecti_8ce082_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['effective_price'], name='products_pr_effecti_325cc4_idx'),
+        ),
+    ]
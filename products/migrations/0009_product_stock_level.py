@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+STOCK_LEVEL_CHOICES = [('in_stock', 'In Stock'), ('low_stock', 'Low Stock'), ('out_of_stock', 'Out of Stock')]
+
+
+def store_stock_levels(apps, schema_editor):
+    # Product.stock_status as of this migration (low below 5)
+    Product = apps.get_model('products', 'Product')
+    Product.objects.filter(stock_count__lte=0).update(stock_level='out_of_stock')
+    Product.objects.filter(stock_count__gt=0, stock_count__lt=5).update(stock_level='low_stock')
+    Product.objects.filter(stock_count__gte=5).update(stock_level='in_stock')
+
+    # Only changes from here on are alerted
+    StockLevelAlert = apps.get_model('products', 'StockLevelAlert')
+    StockLevelAlert.objects.bulk_create(
+        StockLevelAlert(product_id=product_id, stock_level=level)
+        for product_id, level in Product.objects.exclude(stock_level='in_stock').values_list('pk', 'stock_level')
+    )
+
+    ProductListing = apps.get_model('products', 'ProductListing')
+    for code, label in STOCK_LEVEL_CHOICES:
+        ProductListing.objects.filter(stock_level=label).update(stock_level=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_level',
+            field=models.CharField(choices=STOCK_LEVEL_CHOICES, default='out_of_stock', editable=False, max_length=20),
+        ),
+        migrations.CreateModel(
+            name='StockLevelAlert',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_alert', serialize=False, to='products.product')),
+                ('stock_level', models.CharField(choices=STOCK_LEVEL_CHOICES, max_length=20)),
+                ('alerted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RenameField(
+            model_name='productlisting',
+            old_name='stock_status',
+            new_name='stock_level',
+        ),
+        migrations.AlterField(
+            model_name='productlisting',
+            name='stock_level',
+            field=models.CharField(choices=STOCK_LEVEL_CHOICES, max_length=20),
+        ),
+        migrations.RunPython(store_stock_levels, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock_level', 'in_stock'), _negated=True), fields=['stock_level', 'subcategory'], name='products_stock_attention_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(condition=models.Q(('stock_level', 'in_stock'), _negated=True), fields=['stock_level'], name='products_listing_stock_idx'),
+        ),
+    ]
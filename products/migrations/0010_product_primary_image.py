@@ -0,0 +1,70 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:27
+
+import cloudinary
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 500
+
+
+def keep_one_primary_image(apps, schema_editor):
+    # Products with several primary images keep the first one in display order
+    ProductImage = apps.get_model('products', 'ProductImage')
+    seen, demoted = set(), []
+    for image_id, product_id in (
+        ProductImage.objects.filter(is_primary=True)
+        .order_by('product_id', 'order', 'created_at', 'pk').values_list('pk', 'product_id')
+    ):
+        if product_id in seen:
+            demoted.append(image_id)
+        seen.add(product_id)
+    ProductImage.objects.filter(pk__in=demoted).update(is_primary=False)
+
+
+def store_primary_images(apps, schema_editor):
+    # A pk-ordered chunk of products (and their primary images) at a time
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+    last_pk = 0
+    while True:
+        products = list(Product.objects.filter(pk__gt=last_pk).order_by('pk').only('main_image')[:BATCH_SIZE])
+        if not products:
+            break
+        primaries = {
+            product_id: (image_id, image) for product_id, image_id, image in
+            ProductImage.objects.filter(is_primary=True, product__in=products)
+            .values_list('product_id', 'pk', 'image')
+        }
+        for product in products:
+            image_id, image = primaries.get(product.pk, (None, product.main_image))
+            product.primary_image_id = image_id
+            product.primary_image_url = cloudinary.CloudinaryImage(str(image)).build_url() if image else ''
+        Product.objects.bulk_update(products, ['primary_image', 'primary_image_url'])
+        last_pk = products[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_stock_level'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_one_primary_image, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('product',), name='products_one_primary_image'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productimage'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(store_primary_images, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+import cloudinary
 from cloudinary.models import CloudinaryField  # ⭐ Import Cloudinary
 
 
@@ -84,6 +85,28 @@ class Subcategory(models.Model):
         return f"{self.category.name} → {self.name}"
 
 
+# Inputs of Product.final_price / effective_price
+PRICE_FIELDS = {'price', 'original_price', 'discount'}
+
+# Stored copies of computed Product values -> the fields they are computed from
+DERIVED_FIELDS = {'effective_price': PRICE_FIELDS, 'stock_level': {'stock_count'}}
+
+LOW_STOCK_THRESHOLD = 5
+
+
+def image_url(image):
+    """Delivery URL of a Cloudinary image ('' for none)"""
+    return cloudinary.CloudinaryImage(str(image)).build_url() if image else ''
+
+
+def stock_level_for(stock_count):
+    if stock_count <= 0:
+        return 'out_of_stock'
+    if stock_count < LOW_STOCK_THRESHOLD:
+        return 'low_stock'
+    return 'in_stock'
+
+
 class Product(models.Model):
     """Main Product Model"""
 
@@ -93,6 +116,12 @@ class Product(models.Model):
         ('rental', 'Rental Product'),
     ]
 
+    STOCK_LEVEL_CHOICES = [
+        ('in_stock', 'In Stock'),
+        ('low_stock', 'Low Stock'),
+        ('out_of_stock', 'Out of Stock'),
+    ]
+
     # Basic Information
     name = models.CharField(max_length=300)
     slug = models.SlugField(unique=True, blank=True, max_length=350)
@@ -131,6 +160,14 @@ class Product(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)],
         help_text="Discount percentage (0-100)"
     )
+    # ⭐ final_price, stored on save so the API can filter and sort by it in SQL
+    effective_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Price the customer pays (after discount)"
+    )
 
     # Rental Pricing
     rental_price_daily = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -141,6 +178,10 @@ class Product(models.Model):
     # Inventory
     stock_count = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     in_stock = models.BooleanField(default=True)
+    # ⭐ stock_status, stored on save so low/out-of-stock rows come from an index
+    stock_level = models.CharField(
+        max_length=20, choices=STOCK_LEVEL_CHOICES, default='out_of_stock', editable=False
+    )
 
     # Description & Details
     description = models.TextField(help_text="Main product description")
@@ -166,6 +207,13 @@ class Product(models.Model):
         null=True,
         help_text="Main product image (uploads to Cloudinary)"
     )
+    # ⭐ The image grids show: the primary ProductImage, else main_image.
+    # Kept current by changes.refresh_primary_images, so no per-product query
+    primary_image = models.ForeignKey(
+        'ProductImage', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', editable=False,
+    )
+    primary_image_url = models.URLField(max_length=500, blank=True, editable=False)
 
     # SEO Fields
     meta_title = models.CharField(max_length=200, blank=True)
@@ -174,6 +222,8 @@ class Product(models.Model):
     # Status Flags
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    # ⭐ Position in the shuffled featured rotation (see featured.py)
+    featured_rank = models.PositiveIntegerField(null=True, blank=True, editable=False)
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -191,6 +241,17 @@ class Product(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['brand']),
             models.Index(fields=['in_stock']),
+            models.Index(fields=['effective_price']),
+            models.Index(
+                fields=['stock_level', 'subcategory'],
+                name='products_stock_attention_idx',
+                condition=~models.Q(stock_level='in_stock'),
+            ),
+            models.Index(
+                fields=['featured_rank'],
+                name='products_featured_rank_idx',
+                condition=models.Q(featured_rank__isnull=False),
+            ),
         ]
 
     def clean(self):
@@ -218,8 +279,22 @@ class Product(models.Model):
             self.slug = slugify(self.name)
         if not self.meta_title:
             self.meta_title = self.name
+        self.set_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *(
+                field for field, inputs in DERIVED_FIELDS.items() if inputs & set(update_fields)
+            )}
         super().save(*args, **kwargs)
 
+    def set_derived_fields(self):
+        """Store the current values of ``DERIVED_FIELDS``; True if any changed"""
+        values = {'effective_price': self.final_price, 'stock_level': stock_level_for(self.stock_count)}
+        changed = any(getattr(self, field) != value for field, value in values.items())
+        for field, value in values.items():
+            setattr(self, field, value)
+        return changed
+
     def __str__(self):
         return self.name
 
@@ -246,20 +321,18 @@ class Product(models.Model):
 
     @property
     def stock_status(self):
-        if self.stock_count == 0:
-            return "Out of Stock"
-        elif self.stock_count < 5:
-            return "Low Stock"
-        else:
-            return "In Stock"
+        return dict(self.STOCK_LEVEL_CHOICES)[stock_level_for(self.stock_count)]
 
     @property
     def product_type_display(self):
         return dict(self.PRODUCT_TYPE_CHOICES).get(self.product_type, 'New Product')
 
-    def get_primary_image(self):
-        primary = self.images.filter(is_primary=True).first()
-        return primary.image if primary else self.main_image
+    def price_summary(self):
+        """One-line price and stock summary for admin read-only fields"""
+        summary = f"AED {self.final_price:.2f}"
+        if self.is_on_sale:
+            summary += f" (was AED {self.original_price:.2f}, -{self.discount}%)"
+        return f"{self.sku} · {summary} · {self.stock_status}"
 
     def get_all_images(self):
         images = list(self.images.all())
@@ -290,11 +363,101 @@ class ProductImage(models.Model):
             models.Index(fields=['product', 'is_primary']),
             models.Index(fields=['product', 'order']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product'],
+                condition=models.Q(is_primary=True),
+                name='products_one_primary_image',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.alt_text:
             self.alt_text = f"{self.product.name} - Image {self.order}"
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self.is_primary:
+                # A new primary replaces the previous one
+                (ProductImage.objects.filter(product_id=self.product_id, is_primary=True)
+                 .exclude(pk=self.pk).update(is_primary=False))
+            super().save(*args, **kwargs)
+
+    def validate_constraints(self, exclude=None):
+        # A second primary is not a form error: save() demotes the first one
+        super().validate_constraints(exclude={*(exclude or ()), 'is_primary'})
+
+    def __str__(self):
+        return f"{self.product.name} - Image {self.order}"
+
+
+class ProductListing(models.Model):
+    """
+    Flat read model behind /api/products/: one row per active product with
+    the category/subcategory columns copied in, the derived values stored and
+    the list serializer output prerendered in ``data``. Kept current by
+    ``products.listings`` (signals, bulk updates, ``rebuild_listings``).
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='listing'
+    )
+    # Filter / ordering columns (same names as the Product list filters)
+    # (indexed together with created_at below)
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.CASCADE, related_name='+', db_index=False)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', db_index=False)
+    brand = models.CharField(max_length=200)
+    product_type = models.CharField(max_length=20, choices=Product.PRODUCT_TYPE_CHOICES)
+    in_stock = models.BooleanField()
+    is_featured = models.BooleanField()
+    name = models.CharField(max_length=300)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    # Denormalized / derived values
+    category_name = models.CharField(max_length=200)
+    category_slug = models.SlugField()
+    subcategory_name = models.CharField(max_length=200)
+    subcategory_slug = models.SlugField(max_length=250)
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2)
+    is_on_sale = models.BooleanField()
+    stock_level = models.CharField(max_length=20, choices=Product.STOCK_LEVEL_CHOICES)
+    image_url = models.URLField(max_length=500, blank=True)
+
+    data = models.TextField(help_text="Prerendered list JSON for this product")
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['price']),
+            models.Index(fields=['effective_price']),
+            models.Index(fields=['name']),
+            models.Index(fields=['subcategory', '-created_at']),
+            models.Index(fields=['category', '-created_at']),
+            models.Index(fields=['brand']),
+            models.Index(fields=['product_type', '-created_at']),
+            models.Index(fields=['is_featured']),
+            models.Index(fields=['in_stock']),
+            models.Index(
+                fields=['stock_level'],
+                name='products_listing_stock_idx',
+                condition=~models.Q(stock_level='in_stock'),
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class StockLevelAlert(models.Model):
+    """
+    Stock level ``manage.py stock_alerts`` last reported for a product. Only
+    products last reported as low or out of stock have a row.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='stock_alert'
+    )
+    stock_level = models.CharField(max_length=20, choices=Product.STOCK_LEVEL_CHOICES)
+    alerted_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.product.name} - Image {self.order}"
\ No newline at end of file
+        return f'{self.product_id}: {self.stock_level}'
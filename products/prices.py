@@ -0,0 +1,55 @@
+"""
+Price statistics over ``Product.effective_price`` (the price customers pay).
+
+Everything is aggregated in SQL: one query for the bounds, one ``GROUP BY``
+over the bucket number, however many products match.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, IntegerField, Max, Min, Value
+from django.db.models.functions import Cast, Floor, Least
+
+
+HISTOGRAM_BUCKETS = 10
+HISTOGRAM_MAX_BUCKETS = 50
+
+CENT = Decimal('0.01')
+
+
+def _price(value):
+    return str(value.quantize(CENT))
+
+
+def price_histogram(queryset, buckets=HISTOGRAM_BUCKETS):
+    """``{'count', 'min', 'max', 'buckets': [{'min', 'max', 'count'}]}`` of equal-width price buckets"""
+    queryset = queryset.order_by()
+    bounds = queryset.aggregate(count=Count('pk'), low=Min('effective_price'), high=Max('effective_price'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return {'count': 0, 'min': None, 'max': None, 'buckets': []}
+
+    width = (high - low) / buckets
+    if not width:
+        counts = {0: bounds['count']}
+        buckets = 1
+    else:
+        decimal = DecimalField(max_digits=20, decimal_places=10)
+        position = (F('effective_price') - Value(low, decimal)) / Value(width, decimal)
+        # The top price lands in the last bucket, not one past it
+        bucket = Least(Cast(Floor(position), IntegerField()), Value(buckets - 1))
+        counts = dict(
+            queryset.annotate(bucket=bucket).values('bucket')
+            .annotate(count=Count('pk')).values_list('bucket', 'count')
+        )
+
+    edges = [low + width * number for number in range(buckets)] + [high]
+    return {
+        'count': bounds['count'],
+        'min': _price(low),
+        'max': _price(high),
+        'buckets': [
+            {'min': _price(edges[number]), 'max': _price(edges[number + 1]), 'count': counts.get(number, 0)}
+            for number in range(buckets)
+        ],
+    }
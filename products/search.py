@@ -0,0 +1,523 @@
+"""
+Search indexes for the product catalogue.
+
+Prefix (autocomplete) and trigram (typo-tolerant) indexes live in-process.
+
+Indexes are built lazily, once per worker process, and kept in sync with the
+database by polling a cheap change version (row count + latest ``updated_at``)
+at most every ``CATALOG_INDEX_CHECK_INTERVAL`` seconds. Between checks a
+lookup never touches the database. On PostgreSQL fuzzy search is answered by
+``pg_trgm`` GIN indexes instead (see migration 0005).
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max, Q
+
+from .models import Category, Subcategory, Product
+
+
+CHECK_INTERVAL = getattr(settings, 'CATALOG_INDEX_CHECK_INTERVAL', 5)
+MAX_SCAN = 256  # Upper bound on index rows inspected per lookup
+SIMILARITY_THRESHOLD = 0.3  # Same default as pg_trgm.similarity_threshold
+TERMS_PER_TOKEN = 5  # Candidate corrections kept per misspelled word
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+# Lower sorts first when two suggestions match equally well
+KIND_PRIORITY = {'product': 0, 'brand': 1, 'category': 2, 'subcategory': 3}
+
+
+def normalize(text):
+    """Casefold and collapse everything that is not a letter/digit to one space"""
+    return _NON_ALNUM.sub(' ', (text or '').casefold()).strip()
+
+
+def prefix_keys(*labels):
+    """Index keys for labels: the full normalized label plus each word"""
+    keys = set()
+    for label in labels:
+        norm = normalize(label)
+        if not norm:
+            continue
+        keys.add(norm)
+        keys.update(norm.split(' '))
+    return keys
+
+
+def trigrams(word):
+    """pg_trgm style trigrams: the word padded with two leading and one trailing space"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def fuzzy_terms(*labels):
+    return {word for label in labels for word in normalize(label).split(' ') if len(word) > 1}
+
+
+class PrefixIndex:
+    """
+    Compact prefix index backed by one sorted list of ``(key, ref)`` pairs.
+
+    A lookup is a binary search to the first key >= prefix followed by a short
+    forward scan, so it is O(log n + k) with no per-keystroke allocation of
+    the whole catalogue. Entries are keyed by ``ref`` and can be replaced or
+    removed individually, which is what makes incremental refresh cheap.
+    Not thread-safe on its own (``CatalogIndex`` serializes access).
+    """
+
+    def __init__(self):
+        self._pairs = []
+        self._entries = {}  # ref -> (payload, keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, ref, payload, keys):
+        self.remove(ref)
+        keys = frozenset(keys)
+        self._entries[ref] = (payload, keys)
+        for key in keys:
+            insort(self._pairs, (key, ref))
+
+    def remove(self, ref):
+        entry = self._entries.pop(ref, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            i = bisect_left(self._pairs, (key, ref))
+            if i < len(self._pairs) and self._pairs[i] == (key, ref):
+                del self._pairs[i]
+
+    def bulk_load(self, items):
+        """Replace the whole index from ``(ref, payload, keys)`` triples"""
+        self._entries = {}
+        pairs = []
+        for ref, payload, keys in items:
+            keys = frozenset(keys)
+            self._entries[ref] = (payload, keys)
+            pairs.extend((key, ref) for key in keys)
+        pairs.sort()
+        self._pairs = pairs
+
+    def search(self, query, limit=8):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        pairs = self._pairs
+        i = bisect_left(pairs, (prefix,))
+        end = min(len(pairs), i + MAX_SCAN)
+        seen = set()
+        candidates = []
+        while i < end:
+            key, ref = pairs[i]
+            if not key.startswith(prefix):
+                break
+            if ref not in seen:
+                seen.add(ref)
+                payload = self._entries[ref][0]
+                label = normalize(payload['label'])
+                candidates.append((
+                    0 if label == prefix else 1 if label.startswith(prefix) else 2,
+                    KIND_PRIORITY.get(payload['type'], 9),
+                    len(label),
+                    label,
+                    ref,
+                ))
+            i += 1
+
+        candidates.sort()
+        return [self._entries[c[-1]][0] for c in candidates[:limit]]
+
+
+class TrigramIndex:
+    """
+    Posting lists from trigram to vocabulary term, with term -> refs behind them.
+
+    Finding corrections for a word only visits terms sharing at least one
+    trigram with it, so lookups are sub-linear in catalogue size instead of an
+    edit-distance pass over every row.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)  # trigram -> terms
+        self._term_refs = {}               # term -> refs using it
+        self._term_size = {}               # term -> number of trigrams
+        self._ref_terms = {}               # ref -> terms
+
+    def __len__(self):
+        return len(self._term_refs)
+
+    def clear(self):
+        self.__init__()
+
+    def add(self, ref, terms):
+        self.remove(ref)
+        terms = frozenset(terms)
+        self._ref_terms[ref] = terms
+        for term in terms:
+            refs = self._term_refs.get(term)
+            if refs is None:
+                refs = self._term_refs[term] = set()
+                grams = trigrams(term)
+                self._term_size[term] = len(grams)
+                for gram in grams:
+                    self._postings[gram].add(term)
+            refs.add(ref)
+
+    def remove(self, ref):
+        for term in self._ref_terms.pop(ref, ()):
+            refs = self._term_refs[term]
+            refs.discard(ref)
+            if refs:
+                continue
+            del self._term_refs[term]
+            del self._term_size[term]
+            for gram in trigrams(term):
+                posting = self._postings[gram]
+                posting.discard(term)
+                if not posting:
+                    del self._postings[gram]
+
+    def similar_terms(self, word, limit=TERMS_PER_TOKEN):
+        """``[(similarity, term)]`` best first, using pg_trgm's similarity measure"""
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for term, common in shared.items():
+            score = common / (len(grams) + self._term_size[term] - common)
+            if score >= SIMILARITY_THRESHOLD:
+                scored.append((score, term))
+        scored.sort(key=lambda match: (-match[0], match[1]))
+        return scored[:limit]
+
+    def correct(self, query):
+        """Best spelling of each query word (unchanged when nothing is close)"""
+        corrected = []
+        for word in normalize(query).split(' '):
+            matches = self.similar_terms(word, limit=1) if word else []
+            corrected.append(matches[0][1] if matches else word)
+        return ' '.join(corrected)
+
+    def search(self, query, limit=8):
+        """Return ``(did_you_mean, [(ref, score)])`` ranked by mean word similarity"""
+        words = [word for word in normalize(query).split(' ') if word]
+        if not words:
+            return '', []
+
+        corrected = []
+        scores = defaultdict(float)
+        for word in words:
+            matches = self.similar_terms(word)
+            corrected.append(matches[0][1] if matches else word)
+            best = {}
+            for score, term in matches:
+                for ref in self._term_refs[term]:
+                    if score > best.get(ref, 0):
+                        best[ref] = score
+            for ref, score in best.items():
+                scores[ref] += score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return ' '.join(corrected), [(ref, score / len(words)) for ref, score in ranked]
+
+
+class CatalogIndex:
+    """
+    Autocomplete and fuzzy-search index over product names/SKUs, brands and
+    category names.
+
+    Refresh is incremental: rows whose ``updated_at`` moved past the last seen
+    value are re-indexed, and a full rebuild only happens when the row count
+    shows that something was deleted. Safe to share between threads: rows
+    are fetched first, then applied (or a rebuilt index swapped in) under a
+    lock that lookups also take.
+    """
+
+    def __init__(self):
+        self.index = PrefixIndex()
+        self.trigrams = TrigramIndex()
+        self._lock = threading.Lock()       # one refresh at a time
+        # Guards the structures below: lookups hold it while reading them and
+        # refreshes while changing them, never while querying the database
+        self._data_lock = threading.Lock()
+        self._checked_at = 0.0
+        self._product_version = None
+        self._category_version = None
+        self._product_ids = set()   # every product id seen, active or not
+        self._brands = {}           # normalized brand -> [label, product count]
+        self._product_brand = {}    # product id -> normalized brand
+
+    def search(self, query, limit=8):
+        self.refresh()
+        with self._data_lock:
+            return self.index.search(query, limit=limit)
+
+    def fuzzy_search(self, query, limit=8):
+        self.refresh()
+        with self._data_lock:
+            did_you_mean, matches = self.trigrams.search(query, limit=limit)
+            results = [
+                dict(self.index._entries[('p', pk)][0], score=round(score, 3))
+                for pk, score in matches
+            ]
+        return did_you_mean, results
+
+    def ranked_matches(self, query):
+        """``(did_you_mean, [product id, ...])`` for every product matching ``query``, best first"""
+        self.refresh()
+        with self._data_lock:
+            did_you_mean, matches = self.trigrams.search(query, limit=None)
+        return did_you_mean, [pk for pk, _ in matches]
+
+    def brand_labels(self):
+        """Every brand in the catalogue (original spelling), most products first"""
+        self.refresh()
+        with self._data_lock:
+            brands = list(self._brands.values())
+        return [label for label, _ in sorted(brands, key=lambda entry: (-entry[1], entry[0]))]
+
+    def canonical_brand(self, brand):
+        """Stored spelling of ``brand`` (case/accents ignored), or None"""
+        self.refresh()
+        with self._data_lock:
+            entry = self._brands.get(normalize(brand))
+        return entry[0] if entry else None
+
+    def refresh(self, force=False):
+        if not force and time.monotonic() - self._checked_at < CHECK_INTERVAL:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < CHECK_INTERVAL:
+                return
+            self._refresh_categories()
+            self._refresh_products()
+            self._checked_at = time.monotonic()
+
+    def _refresh_categories(self):
+        # Small tables: reloaded wholesale whenever they change
+        category_version = (
+            Category.objects.aggregate(n=Count('id'), ts=Max('updated_at')),
+            Subcategory.objects.aggregate(n=Count('id'), ts=Max('updated_at')),
+        )
+        if category_version == self._category_version:
+            return
+
+        items = [
+            (('c', category.id), {'type': 'category', 'label': category.name, 'slug': category.slug},
+             prefix_keys(category.name))
+            for category in Category.objects.filter(is_active=True).only('id', 'name', 'slug')
+        ]
+        subcategories = (
+            Subcategory.objects
+            .filter(is_active=True, category__is_active=True)
+            .only('id', 'name', 'slug')
+        )
+        items += [
+            (('s', subcategory.id), {'type': 'subcategory', 'label': subcategory.name, 'slug': subcategory.slug},
+             prefix_keys(subcategory.name))
+            for subcategory in subcategories
+        ]
+        with self._data_lock:
+            for ref in [r for r in self.index._entries if r[0] in ('c', 's')]:
+                self.index.remove(ref)
+            for item in items:
+                self.index.add(*item)
+        self._category_version = category_version
+
+    def _product_rows(self, queryset):
+        return queryset.values_list('id', 'name', 'slug', 'sku', 'brand', 'is_active')
+
+    def _refresh_products(self):
+        version = Product.objects.aggregate(n=Count('id'), ts=Max('updated_at'))
+        if version == self._product_version:
+            return
+
+        if self._product_version is None or self._product_version['ts'] is None:
+            self._rebuild_products(version)
+            return
+
+        changed = list(self._product_rows(
+            Product.objects.filter(updated_at__gte=self._product_version['ts'])
+        ))
+        if len(self._product_ids.union(row[0] for row in changed)) != version['n']:
+            # Rows were deleted: nothing short of a rebuild can tell which
+            self._rebuild_products(version)
+            return
+
+        with self._data_lock:
+            for row in changed:
+                self._apply_product(*row)
+        self._product_version = version
+
+    def _rebuild_products(self, version):
+        """Build fresh structures off to the side, then swap them in"""
+        index, trigram_index = PrefixIndex(), TrigramIndex()
+        product_ids, brands, product_brand = set(), {}, {}
+
+        items = []
+        for pk, name, slug, sku, brand, is_active in self._product_rows(Product.objects.all()):
+            product_ids.add(pk)
+            if not is_active:
+                continue
+            items.append(self._product_item(pk, name, slug, sku, brand))
+            trigram_index.add(pk, fuzzy_terms(name, brand, sku))
+            key = normalize(brand)
+            if key:
+                product_brand[pk] = key
+                brands.setdefault(key, [brand, 0])[1] += 1
+        items.extend(
+            (('b', key), self._brand_payload(label), prefix_keys(label))
+            for key, (label, _) in brands.items()
+        )
+        # Categories are only changed by this (refreshing) thread
+        items.extend(
+            (ref, payload, keys)
+            for ref, (payload, keys) in self.index._entries.items() if ref[0] in ('c', 's')
+        )
+        index.bulk_load(items)
+
+        with self._data_lock:
+            self.index, self.trigrams = index, trigram_index
+            self._product_ids, self._brands, self._product_brand = product_ids, brands, product_brand
+        self._product_version = version
+
+    def _product_item(self, pk, name, slug, sku, brand):
+        payload = {'type': 'product', 'id': pk, 'label': name, 'slug': slug, 'sku': sku, 'brand': brand}
+        return ('p', pk), payload, prefix_keys(name, sku)
+
+    def _brand_payload(self, label):
+        return {'type': 'brand', 'label': label, 'slug': label}
+
+    def _count_brand(self, pk, brand):
+        key = normalize(brand)
+        if not key:
+            return False
+        self._product_brand[pk] = key
+        entry = self._brands.setdefault(key, [brand, 0])
+        entry[1] += 1
+        return entry[1] == 1
+
+    def _uncount_brand(self, pk):
+        key = self._product_brand.pop(pk, None)
+        if key is None:
+            return
+        entry = self._brands[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._brands[key]
+            self.index.remove(('b', key))
+
+    def _apply_product(self, pk, name, slug, sku, brand, is_active):
+        # Called with _data_lock held
+        self._product_ids.add(pk)
+        self._uncount_brand(pk)
+        if not is_active:
+            self.index.remove(('p', pk))
+            self.trigrams.remove(pk)
+            return
+        self.index.add(*self._product_item(pk, name, slug, sku, brand))
+        self.trigrams.add(pk, fuzzy_terms(name, brand, sku))
+        if self._count_brand(pk, brand):
+            self.index.add(('b', normalize(brand)), self._brand_payload(brand), prefix_keys(brand))
+
+
+_catalog_index = None
+_catalog_index_lock = threading.Lock()
+
+
+def get_catalog_index():
+    """Per-process catalogue index, created on first use"""
+    global _catalog_index
+    if _catalog_index is None:
+        with _catalog_index_lock:
+            if _catalog_index is None:
+                _catalog_index = CatalogIndex()
+    return _catalog_index
+
+
+def _postgres_fuzzy_rows(queryset, query, limit):
+    """``(id, name, slug, sku, brand, score)`` of the best matches, from the pg_trgm GIN indexes"""
+    from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+    from django.db.models.functions import Greatest
+
+    return list(
+        queryset
+        .filter(
+            Q(name__trigram_word_similar=query)
+            | Q(brand__trigram_similar=query)
+            | Q(sku__trigram_similar=query)
+        )
+        .annotate(search_score=Greatest(
+            TrigramWordSimilarity(query, 'name'),
+            TrigramSimilarity('brand', query),
+            TrigramSimilarity('sku', query),
+        ))
+        .order_by('-search_score', 'id')
+        .values_list('id', 'name', 'slug', 'sku', 'brand', 'search_score')[:limit]
+    )
+
+
+def _correct(query, rows):
+    # Spelling correction only needs the vocabulary of the rows that matched
+    vocabulary = TrigramIndex()
+    for pk, name, slug, sku, brand, score in rows:
+        vocabulary.add(pk, fuzzy_terms(name, brand, sku))
+    return vocabulary.correct(query)
+
+
+def _postgres_fuzzy_search(query, limit):
+    """Fuzzy product match answered by the pg_trgm GIN indexes"""
+    rows = _postgres_fuzzy_rows(Product.objects.filter(is_active=True), query, limit)
+    results = [
+        {
+            'type': 'product', 'id': pk, 'label': name, 'slug': slug,
+            'sku': sku, 'brand': brand, 'score': round(score, 3),
+        }
+        for pk, name, slug, sku, brand, score in rows
+    ]
+    return _correct(query, rows), results
+
+
+def fuzzy_search(query, limit=8):
+    """
+    Typo-tolerant product search.
+
+    Returns ``(did_you_mean, results)`` where ``did_you_mean`` is the query
+    with each word replaced by its closest catalogue term.
+    """
+    if connection.vendor == 'postgresql':
+        return _postgres_fuzzy_search(query, limit)
+    return get_catalog_index().fuzzy_search(query, limit=limit)
+
+
+def fuzzy_match_ids(queryset, query, limit, chunk_size=500):
+    """
+    ``(did_you_mean, ids)``: the ``limit`` products of ``queryset`` (filters
+    already applied) closest to ``query``, best first.
+    """
+    if connection.vendor == 'postgresql':
+        rows = _postgres_fuzzy_rows(queryset, query, limit)
+        return _correct(query, rows), [row[0] for row in rows]
+
+    # Every match from the in-process index, best first, kept where the
+    # filters allow; usually the first chunk is enough
+    did_you_mean, ranked = get_catalog_index().ranked_matches(query)
+    ids = []
+    for start in range(0, len(ranked), chunk_size):
+        chunk = ranked[start:start + chunk_size]
+        allowed = set(queryset.filter(pk__in=chunk).order_by().values_list('pk', flat=True))
+        ids += [pk for pk in chunk if pk in allowed]
+        if len(ids) >= limit:
+            break
+    return did_you_mean, ids[:limit]
@@ -1,21 +1,34 @@
 from rest_framework import serializers
-import cloudinary
-from .models import Category, Subcategory, Product, ProductImage
+from django.db.models import Count, Q
+from .fieldsets import SparseFieldsetMixin
+from .models import Category, Subcategory, Product, ProductImage, image_url
 
 
-class SubcategorySerializer(serializers.ModelSerializer):
+def active_product_count(subcategory):
+    """Use the ``active_product_count`` annotation when the queryset provides it"""
+    if hasattr(subcategory, 'active_product_count'):
+        return subcategory.active_product_count
+    return subcategory.products.filter(is_active=True).count()
+
+
+class SubcategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     product_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Subcategory
         fields = ['id', 'name', 'slug', 'icon', 'description', 'category_name', 'product_count']
+        field_requirements = {
+            'product_count': {
+                'annotate': {'active_product_count': Count('products', filter=Q(products__is_active=True))},
+            },
+        }
 
     def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        return active_product_count(obj)
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     subcategories = SubcategorySerializer(many=True, read_only=True)
     product_count = serializers.SerializerMethodField()
 
@@ -26,11 +39,20 @@ class CategorySerializer(serializers.ModelSerializer):
             'subcategories', 'product_count',
             'show_in_navbar', 'navbar_order'
         ]
+        field_requirements = {
+            'product_count': {
+                'annotate': {'active_product_count': Count(
+                    'subcategories__products', filter=Q(subcategories__products__is_active=True)
+                )},
+            },
+        }
 
     def get_product_count(self, obj):
+        if hasattr(obj, 'active_product_count'):
+            return obj.active_product_count
         total = 0
         for subcategory in obj.subcategories.all():
-            total += subcategory.products.filter(is_active=True).count()
+            total += active_product_count(subcategory)
         return total
 
 
@@ -41,14 +63,24 @@ class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
         fields = ['id', 'image', 'alt_text', 'is_primary', 'order']
+        field_requirements = {'image': {'only': ['image']}}
 
     def get_image(self, obj):
-        if obj.image:
-            return cloudinary.CloudinaryImage(str(obj.image)).build_url()
-        return None
+        return image_url(obj.image) or None
+
 
+# Columns behind the Product properties the serializers expose
+PRODUCT_FIELD_REQUIREMENTS = {
+    'product_type_display': {'only': ['product_type']},
+    'final_price': {'only': ['price', 'original_price', 'discount']},
+    'discount_amount': {'only': ['price', 'original_price', 'discount']},
+    'is_on_sale': {'only': ['original_price', 'discount']},
+    'stock_status': {'only': ['stock_count']},
+    'main_image': {'only': ['main_image']},
+}
 
-class ProductListSerializer(serializers.ModelSerializer):
+
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Product List - minimal fields for performance"""
     category_name = serializers.CharField(source='subcategory.category.name', read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
@@ -58,6 +90,7 @@ class ProductListSerializer(serializers.ModelSerializer):
     stock_status = serializers.CharField(read_only=True)
     # ⭐ FIX: Convert CloudinaryField to full URL
     main_image = serializers.SerializerMethodField()
+    images = ProductImageSerializer(many=True, read_only=True)
 
     class Meta:
         model = Product
@@ -65,17 +98,19 @@ class ProductListSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'sku', 'category_name', 'subcategory_name',
             'brand', 'product_type', 'product_type_display',
             'price', 'original_price', 'discount', 'final_price', 'is_on_sale',
-            'main_image', 'stock_count', 'stock_status', 'in_stock',
-            'rating', 'reviews', 'is_featured'
+            'main_image', 'primary_image_url', 'stock_count', 'stock_status', 'in_stock',
+            'rating', 'reviews', 'is_featured',
+            'images', 'description', 'features', 'specifications', 'created_at'
         ]
+        # Only sent when asked for with ?expand= (or named in ?fields=)
+        expandable_fields = ['images', 'description', 'features', 'specifications', 'created_at']
+        field_requirements = PRODUCT_FIELD_REQUIREMENTS
 
     def get_main_image(self, obj):
-        if obj.main_image:
-            return cloudinary.CloudinaryImage(str(obj.main_image)).build_url()
-        return None
+        return image_url(obj.main_image) or None
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Product Detail - all fields"""
     category_name = serializers.CharField(source='subcategory.category.name', read_only=True)
     subcategory_name = serializers.CharField(source='subcategory.name', read_only=True)
@@ -103,7 +138,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             'rental_price_daily', 'rental_price_weekly', 'rental_price_monthly', 'min_rental_period',
 
             # Images
-            'main_image', 'images',
+            'main_image', 'primary_image_url', 'images',
 
             # Inventory
             'stock_count', 'stock_status', 'in_stock',
@@ -123,8 +158,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             # Status
             'is_featured', 'created_at'
         ]
+        field_requirements = PRODUCT_FIELD_REQUIREMENTS
 
     def get_main_image(self, obj):
-        if obj.main_image:
-            return cloudinary.CloudinaryImage(str(obj.main_image)).build_url()
-        return None
\ No newline at end of file
+        return image_url(obj.main_image) or None
\ No newline at end of file
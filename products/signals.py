@@ -0,0 +1,74 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.response_cache import invalidate_responses
+from .changes import bulk_loading, products_changed
+from .featured import needs_reshuffle, reshuffle_featured
+from .listings import refresh_category_listings, refresh_subcategory_listings
+from .models import Category, Product, ProductImage, Subcategory
+from .surrogate_keys import purge_category, purge_deleted_product, purge_subcategory
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def keep_featured_rotation_in_sync(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return  # loaddata
+    deleted = 'created' not in kwargs
+    if (deleted and instance.featured_rank is not None) or (not deleted and needs_reshuffle(instance)):
+        reshuffle_featured()
+        if not deleted:
+            # bulk_update() left this instance's rank stale; a later full save would write it back
+            instance.featured_rank = (
+                Product.objects.filter(pk=instance.pk).values_list('featured_rank', flat=True).first()
+            )
+
+
+@receiver(post_save, sender=Product)
+def keep_listing_in_sync(sender, instance, raw=False, **kwargs):
+    if not raw:
+        products_changed([instance.pk])
+
+
+@receiver(post_save, sender=Subcategory)
+def keep_subcategory_listings_in_sync(sender, instance, raw=False, **kwargs):
+    if not raw and not bulk_loading():
+        refresh_subcategory_listings(instance)
+        invalidate_responses('categories')
+        purge_subcategory(instance)
+
+
+@receiver(post_save, sender=Category)
+def keep_category_listings_in_sync(sender, instance, raw=False, **kwargs):
+    if not raw and not bulk_loading():
+        refresh_category_listings(instance)
+        invalidate_responses('categories')
+        purge_category(instance)
+
+
+@receiver(post_delete, sender=Product)
+def drop_deleted_product(sender, instance, **kwargs):
+    # Its listing row goes with it (cascade)
+    invalidate_responses('products')
+    purge_deleted_product(instance)
+
+
+@receiver(post_delete, sender=Subcategory)
+def drop_deleted_subcategory(sender, instance, **kwargs):
+    invalidate_responses('categories')
+    purge_subcategory(instance)
+
+
+@receiver(post_delete, sender=Category)
+def drop_deleted_category(sender, instance, **kwargs):
+    invalidate_responses('categories')
+    purge_category(instance)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def keep_product_images_in_sync(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or isinstance(origin, Product) or getattr(origin, 'model', None) is Product:
+        return  # loaddata, or the product is being deleted with its images
+    # Its stored primary image and listing row may change
+    products_changed([instance.product_id])
@@ -0,0 +1,75 @@
+"""
+Low-stock reporting and stock level alerts.
+
+``Product.stock_level`` is stored on save (see models.py), and the rows
+that are not in stock - a small part of the catalogue - have a partial
+index of their own. The report reads only those rows. The alert diff reads
+those plus the products with a ``StockLevelAlert`` (last reported as low or
+out of stock), which between them hold every possible transition.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+
+from .models import Product, StockLevelAlert
+
+
+def low_stock_rows():
+    """Active low and out-of-stock products, by category, subcategory and stock left"""
+    return (
+        Product.objects.filter(is_active=True).exclude(stock_level='in_stock')
+        .order_by('subcategory__category__name', 'subcategory__name', 'stock_count', 'sku')
+        .values(
+            'sku', 'name', 'brand', 'stock_count', 'stock_level',
+            category_name=F('subcategory__category__name'), subcategory_name=F('subcategory__name'),
+        )
+    )
+
+
+def low_stock_summary():
+    """``[{'category_name', 'low', 'out'}]`` product counts per category"""
+    return list(
+        Product.objects.filter(is_active=True).exclude(stock_level='in_stock')
+        .values(category_name=F('subcategory__category__name'))
+        .annotate(
+            low=Count('pk', filter=Q(stock_level='low_stock')),
+            out=Count('pk', filter=Q(stock_level='out_of_stock')),
+        )
+        .order_by('category_name')
+    )
+
+
+def stock_transitions():
+    """Active products whose level changed since it was last reported"""
+    return list(
+        Product.objects.filter(is_active=True)
+        .filter(~Q(stock_level='in_stock') | Q(stock_alert__isnull=False))
+        .annotate(alerted_level=Coalesce('stock_alert__stock_level', Value('in_stock')))
+        .exclude(stock_level=F('alerted_level'))
+        .order_by('subcategory__category__name', 'sku')
+        .values(
+            'pk', 'sku', 'name', 'stock_count', 'stock_level', 'alerted_level',
+            category_name=F('subcategory__category__name'),
+        )
+    )
+
+
+def mark_alerted(transitions):
+    """Remember the reported levels, so the next run only reports newer changes"""
+    ids_by_level = defaultdict(list)
+    for row in transitions:
+        ids_by_level[row['stock_level']].append(row['pk'])
+    for level, ids in ids_by_level.items():
+        # A product that moved again since it was read stays due for the next run
+        ids = list(Product.objects.filter(pk__in=ids, stock_level=level).values_list('pk', flat=True))
+        if level == 'in_stock':
+            StockLevelAlert.objects.filter(product_id__in=ids).delete()
+        else:
+            StockLevelAlert.objects.bulk_create(
+                [StockLevelAlert(product_id=product_id, stock_level=level) for product_id in ids],
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['stock_level', 'alerted_at'],
+            )
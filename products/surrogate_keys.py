@@ -0,0 +1,123 @@
+"""
+Surrogate keys for the catalogue endpoints (see config/cdn.py).
+
+* ``products`` - every product list, collection, search and batch response;
+* ``categories`` - category and subcategory lists (the navbar);
+* ``product-<id>``, ``subcategory-<id>``, ``category-<id>`` - detail
+  responses, tagged with everything they embed (a product detail shows its
+  subcategory with its product count, and the category name).
+
+``purge_products(ids)`` and friends decide what a write invalidates.
+"""
+
+from config.cdn import purge, tag_response
+from config.db_routing import is_pinned
+from .models import Category, Product, Subcategory
+
+
+PRODUCTS = 'products'
+CATEGORIES = 'categories'
+
+
+def product_key(product_id):
+    return f'product-{product_id}'
+
+
+def subcategory_key(subcategory_id):
+    return f'subcategory-{subcategory_id}'
+
+
+def category_key(category_id):
+    return f'category-{category_id}'
+
+
+def collection_key(name):
+    return f'collection-{name}'
+
+
+def product_keys(product):
+    """Keys of a product detail: the product, its subcategory and category"""
+    return {
+        product_key(product.pk),
+        subcategory_key(product.subcategory_id),
+        category_key(product.subcategory.category_id),
+    }
+
+
+# ----- Purges ---------------------------------------------------------------
+
+def purge_products(ids):
+    """A change to products ``ids``: their details, all lists and their category pages"""
+    keys = {PRODUCTS, CATEGORIES, *map(product_key, ids)}
+    for subcategory_id, category_id in (
+        Product.objects.filter(pk__in=ids)
+        .values_list('subcategory_id', 'subcategory__category_id').distinct()
+    ):
+        keys |= {subcategory_key(subcategory_id), category_key(category_id)}
+    purge(keys)
+
+
+def purge_subcategory(subcategory):
+    # Its name is embedded in product lists and in the details tagged with it
+    purge({PRODUCTS, CATEGORIES, subcategory_key(subcategory.pk), category_key(subcategory.category_id)})
+
+
+def purge_category(category):
+    purge({PRODUCTS, CATEGORIES, category_key(category.pk)})
+
+
+def purge_catalog():
+    """Every list and every category page, after a bulk load"""
+    purge({
+        PRODUCTS, CATEGORIES,
+        *map(subcategory_key, Subcategory.objects.values_list('pk', flat=True)),
+        *map(category_key, Category.objects.values_list('pk', flat=True)),
+    })
+
+
+def purge_deleted_product(product):
+    """``purge_products`` for a row that is already gone"""
+    subcategory = product.subcategory
+    purge({
+        PRODUCTS, CATEGORIES, product_key(product.pk),
+        subcategory_key(subcategory.pk), category_key(subcategory.category_id),
+    })
+
+
+# ----- Views ----------------------------------------------------------------
+
+class SurrogateKeyViewMixin:
+    """
+    Viewset mixin: successful GET responses are tagged with
+    ``self.surrogate_keys`` and made CDN-cacheable. List actions start from
+    ``default_surrogate_keys``, detail actions from the keys of their object.
+    Clients pinned to the primary after a write get ``private`` responses.
+    """
+    default_surrogate_keys = ()
+
+    def initial(self, request, *args, **kwargs):
+        self.surrogate_keys = set() if self.detail else set(self.default_surrogate_keys)
+        super().initial(request, *args, **kwargs)
+
+    def get_object(self):
+        obj = super().get_object()
+        self.surrogate_keys |= self.get_object_surrogate_keys(obj)
+        return obj
+
+    def get_object_surrogate_keys(self, obj):
+        return set()
+
+    def get_surrogate_max_age(self):
+        """CDN lifetime of this response (None: the configured default)"""
+        return None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        if not 200 <= response.status_code < 300 or not getattr(self, 'surrogate_keys', None):
+            return response
+        if is_pinned():
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return tag_response(response, self.surrogate_keys, s_maxage=self.get_surrogate_max_age())
@@ -0,0 +1,289 @@
+"""
+Deterministic synthetic catalogue for benchmarks and scale testing.
+
+Every batch of products draws from its own ``random.Random`` seeded with
+``(seed, first SKU number)``, so the same arguments always produce the same
+rows no matter how the work is split up.
+
+Loads run inside ``changes.bulk_load()``: batches only insert rows (derived
+fields and primary image URLs included) and point products at their primary
+image, and the listing projection is rebuilt once at the end.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.db.models import OuterRef, Subquery
+from django.utils.text import slugify
+
+from quotes.models import QuoteRequest, QuoteItem
+from .changes import bulk_load
+from .featured import reshuffle_featured
+from .models import Category, Subcategory, Product, ProductImage, image_url
+
+
+CATEGORY_TREE = {
+    'Office Supplies': ['Writing Instruments', 'Desk Accessories', 'Filing & Organization', 'Correction & Adhesives'],
+    'Paper Products': ['Copy & Printer Paper', 'Notebooks & Pads', 'Envelopes & Mailers', 'Specialty Paper'],
+    'Ink & Toner': ['Ink Cartridges', 'Toner Cartridges', 'Printer Ribbons', 'Refill Kits'],
+    'Office Machines': ['Printers', 'Copiers', 'Shredders', 'Laminators'],
+    'Technology': ['Computers & Laptops', 'Monitors & Displays', 'Networking', 'Accessories'],
+    'Furniture': ['Office Chairs', 'Desks', 'Storage Cabinets', 'Meeting Room'],
+    'Breakroom': ['Coffee & Tea', 'Snacks', 'Cleaning Supplies', 'Disposables'],
+}
+
+# (brand, relative weight): a few brands dominate, as in the real catalogue
+BRANDS = [
+    ('HP', 12), ('Canon', 9), ('Epson', 7), ('Brother', 6), ('Lenovo', 6), ('Dell', 6),
+    ('Samsung', 5), ('Xerox', 4), ('Logitech', 4), ('3M', 4), ('Apple', 3), ('Fellowes', 3),
+    ('Pilot', 3), ('BIC', 3), ('Staples', 3), ('Post-it', 2), ('Kyocera', 2), ('Ricoh', 2),
+    ('Asus', 2), ('Acer', 2), ('LG', 2), ('IKEA', 2), ('Herman Miller', 1), ('Steelcase', 1),
+]
+MODEL_WORDS = ['Pro', 'Plus', 'Elite', 'Max', 'Mini', 'Ultra', 'Classic', 'Smart', 'Eco', 'Prime']
+COLORS = ['Black', 'White', 'Silver', 'Blue', 'Grey', 'Red']
+FEATURES = [
+    'Energy efficient', 'Compact design', 'Wireless connectivity', 'High capacity',
+    'Ergonomic', 'Recycled materials', 'Fast output', 'Low noise', 'Easy installation',
+]
+CONDITIONS = ['Excellent', 'Very Good', 'Good', 'Fair']
+
+# Extra category/subcategory names beyond CATEGORY_TREE are built from these
+CATEGORY_WORDS = ['Industrial', 'Medical', 'School', 'Retail', 'Warehouse', 'Hospitality', 'Lab', 'Outdoor']
+SUBCATEGORY_WORDS = ['Essentials', 'Equipment', 'Consumables', 'Spares', 'Kits', 'Tools', 'Storage', 'Safety']
+
+# Fixed reference point so generated timestamps do not depend on the clock
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+QUOTE_STATUSES = [('pending', 50), ('processing', 20), ('sent', 15), ('completed', 10), ('cancelled', 5)]
+
+
+def sku_for(number):
+    return f'SYN-{number:08d}'
+
+
+def build_categories(categories=None, subcategories_per_category=4):
+    """Create (or reuse) the category tree; returns subcategories in a stable order"""
+    tree = {name: list(subs) for name, subs in CATEGORY_TREE.items()}
+    extra = 0
+    while categories is not None and len(tree) < categories:
+        word = CATEGORY_WORDS[extra % len(CATEGORY_WORDS)]
+        tree[f'{word} Supplies {extra // len(CATEGORY_WORDS) + 1}'] = []
+        extra += 1
+    if categories is not None:
+        tree = dict(list(tree.items())[:categories])
+    for category_name, names in tree.items():
+        for i in range(len(names), subcategories_per_category):
+            names.append(f'{category_name.split()[0]} {SUBCATEGORY_WORDS[i % len(SUBCATEGORY_WORDS)]} {i + 1}')
+        del names[subcategories_per_category:]
+
+    subcategories = []
+    for order, (category_name, names) in enumerate(tree.items(), 1):
+        category, _ = Category.objects.get_or_create(
+            name=category_name,
+            defaults={'show_in_navbar': order <= 8, 'navbar_order': order if order <= 8 else 0},
+        )
+        for name in names:
+            subcategory, _ = Subcategory.objects.get_or_create(
+                category=category, name=name, defaults={'slug': slugify(name)}
+            )
+            subcategories.append(subcategory)
+    return subcategories
+
+
+def gallery_paths(seed, sku):
+    """0-3 gallery image paths for ``sku``, the first one primary"""
+    rng = random.Random(f'{seed}:images:{sku}')
+    return [f'products/synthetic/gallery-{rng.randrange(2000)}' for _ in range(rng.choice([0, 1, 1, 2, 3]))]
+
+
+def build_products(seed, subcategories, start, count, urls=None):
+    """
+    Unsaved ``Product`` objects for SKU numbers ``start .. start + count - 1``.
+    ``urls`` memoizes image URLs across batches (the paths repeat).
+    """
+    urls = {} if urls is None else urls
+    rng = random.Random(f'{seed}:{start}')
+    brand_names = [brand for brand, _ in BRANDS]
+    brand_weights = [weight for _, weight in BRANDS]
+    products = []
+    for number in range(start, start + count):
+        subcategory = subcategories[rng.randrange(len(subcategories))]
+        brand = rng.choices(brand_names, brand_weights)[0]
+        name = (
+            f'{brand} {subcategory.name.split()[0]} {rng.choice(MODEL_WORDS)} '
+            f'{rng.choice("ABCDEFGHKLMPRSTX")}{rng.randint(100, 9999)}'
+        )
+        product_type = rng.choices(['new', 'refurbished', 'rental'], [80, 12, 8])[0]
+
+        # Log-normal prices: mostly cheap consumables, a long tail of machines
+        original = Decimal(str(round(min(rng.lognormvariate(4.0, 1.2), 50000), 2))) + Decimal('1.00')
+        discount = rng.choice([10, 15, 20, 25, 30]) if rng.random() < 0.3 else 0
+        price = (original * (100 - discount) / 100).quantize(Decimal('0.01')) if discount else original
+
+        roll = rng.random()
+        stock_count = 0 if roll < 0.08 else rng.randint(1, 4) if roll < 0.18 else rng.randint(5, 500)
+
+        rental = {}
+        if product_type == 'rental':
+            daily = (price / 40).quantize(Decimal('0.01')) + Decimal('5.00')
+            rental = {
+                'rental_price_daily': daily,
+                'rental_price_weekly': (daily * 5).quantize(Decimal('0.01')),
+                'rental_price_monthly': (daily * 18).quantize(Decimal('0.01')),
+                'min_rental_period': rng.choice([1, 3, 7]),
+            }
+
+        products.append(Product(
+            name=name,
+            slug=f'{slugify(name)}-{number}',
+            sku=sku_for(number),
+            subcategory=subcategory,
+            brand=brand,
+            product_type=product_type,
+            price=price,
+            original_price=original if discount else None,
+            discount=discount,
+            stock_count=stock_count,
+            in_stock=stock_count > 0,
+            description=f'{name}. {rng.choice(FEATURES)} and {rng.choice(FEATURES).lower()}.',
+            features=rng.sample(FEATURES, rng.randint(2, 5)),
+            specifications={
+                'Color': rng.choice(COLORS),
+                'Weight': f'{rng.uniform(0.1, 40):.1f}kg',
+                'Warranty': f'{rng.choice([6, 12, 24, 36])} months',
+            },
+            condition=rng.choice(CONDITIONS) if product_type == 'refurbished' else '',
+            warranty_months=rng.choice([None, 6, 12, 24, 36]),
+            rating=Decimal(str(round(rng.uniform(3.0, 5.0), 1))),
+            reviews=int(rng.paretovariate(1.5)) - 1,
+            main_image=f'products/synthetic/{number % 500}',
+            meta_title=name,
+            is_featured=rng.random() < 0.05,
+            is_active=rng.random() >= 0.03,
+            created_at=EPOCH - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+            **rental,
+        ))
+        products[-1].set_derived_fields()  # bulk_create skips save()
+        # The stored URL of the primary image (or main_image); the FK is set after the images are inserted
+        primary = next(iter(gallery_paths(seed, products[-1].sku)), products[-1].main_image)
+        if primary not in urls:
+            urls[primary] = image_url(primary)
+        products[-1].primary_image_url = urls[primary]
+    return products
+
+
+def build_images(seed, products):
+    """0-3 gallery images per product, the first one primary"""
+    return [
+        ProductImage(
+            product_id=product.id,
+            image=path,
+            alt_text=f'{product.name} - Image {order}',
+            is_primary=order == 0,
+            order=order,
+        )
+        for product in products
+        for order, path in enumerate(gallery_paths(seed, product.sku))
+    ]
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Let bulk_create keep generated ``created_at`` values instead of now()"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def generate_products(seed, subcategories, start, count, batch_size=2000):
+    """
+    Insert SKU range ``start .. start + count - 1`` in batches; returns
+    (products, images). Derived fields are set before the insert; callers
+    wrap the load in ``bulk_load()`` for the listings.
+    """
+    created_products = created_images = 0
+    urls = {}
+    with explicit_created_at(Product):
+        for batch_start in range(start, start + count, batch_size):
+            batch_count = min(batch_size, start + count - batch_start)
+            products = Product.objects.bulk_create(
+                build_products(seed, subcategories, batch_start, batch_count, urls)
+            )
+            if any(product.id is None for product in products):
+                # Backends without RETURNING: look the ids up by SKU
+                ids = dict(Product.objects.filter(
+                    sku__in=[product.sku for product in products]
+                ).values_list('sku', 'id'))
+                for product in products:
+                    product.id = ids[product.sku]
+            images = ProductImage.objects.bulk_create(build_images(seed, products), batch_size=batch_size)
+            Product.objects.filter(pk__in=[image.product_id for image in images if image.is_primary]).update(
+                primary_image=Subquery(
+                    ProductImage.objects.filter(product=OuterRef('pk'), is_primary=True).values('pk')[:1]
+                )
+            )
+            created_products += len(products)
+            created_images += len(images)
+    return created_products, created_images
+
+
+def generate_quotes(seed, count, batch_size=2000):
+    """
+    Quote requests over the active catalogue: item counts are geometric
+    (most quotes are small) and popular products are picked more often.
+    """
+    rng = random.Random(f'{seed}:quotes')
+    catalogue = list(
+        Product.objects.filter(is_active=True).order_by('id').values_list('id', 'price')
+    )
+    if not catalogue:
+        return 0, 0
+    statuses = [status for status, _ in QUOTE_STATUSES]
+    status_weights = [weight for _, weight in QUOTE_STATUSES]
+
+    created_quotes = created_items = 0
+    with explicit_created_at(QuoteRequest):
+        for batch_start in range(0, count, batch_size):
+            quotes = QuoteRequest.objects.bulk_create([
+                QuoteRequest(
+                    name=f'Customer {number}',
+                    email=f'customer{number}@example.com',
+                    phone=f'+9715{rng.randrange(10 ** 8):08d}',
+                    company=f'Company {rng.randrange(count // 3 + 1)}' if rng.random() < 0.7 else '',
+                    status=rng.choices(statuses, status_weights)[0],
+                    created_at=EPOCH - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                )
+                for number in range(batch_start, min(count, batch_start + batch_size))
+            ])
+            if any(quote.id is None for quote in quotes):
+                quotes = list(QuoteRequest.objects.order_by('-id')[:len(quotes)])[::-1]
+
+            items = []
+            for quote in quotes:
+                size = min(200, int(rng.expovariate(1 / 4)) + 1)
+                for _ in range(size):
+                    # Squaring skews picks towards the start of the catalogue
+                    product_id, price = catalogue[int(rng.random() ** 2 * len(catalogue))]
+                    items.append(QuoteItem(
+                        quote_id=quote.id, product_id=product_id,
+                        quantity=rng.choice([1, 1, 1, 2, 5, 10]), price=price,
+                    ))
+            QuoteItem.objects.bulk_create(items, batch_size=batch_size)
+            created_quotes += len(quotes)
+            created_items += len(items)
+    return created_quotes, created_items
+
+
+def generate_catalog(products, seed=42, batch_size=2000):
+    """Create a deterministic catalogue of ``products`` products"""
+    with bulk_load():
+        subcategories = build_categories()
+        created = generate_products(seed, subcategories, 1, products, batch_size=batch_size)
+        reshuffle_featured(seed)
+    return created
@@ -1,3 +1,1100 @@
-from django.test import TestCase
+import gzip
+import json
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.handlers.base import BaseHandler
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import OperationalError, connection, connections
+from django.db.models import Value
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from config.cache import get_or_compute, metrics
+from config import compression
+from config.cdn import RecordingPurgeBackend, purge_queue
+from config.db_routing import REPLICA_DB_ALIAS, PrimaryReplicaRouter, lag_monitor
+from config.instrumentation import QueryInstrumentationMiddleware
+from config.renderers import ORJSONRenderer, msgpack
+from quotes.admin import QuoteItemInline
+from quotes.models import QuoteItem, QuoteRequest
+from . import bulk, columns
+from .changes import refresh_derived_fields, refresh_primary_images
+from .counts import EstimatedCountPaginator
+from .featured import featured_window, reshuffle_featured
+from .forms import BulkPriceStockForm
+from .listings import _ready, build_listings, rebuild_listings, refresh_listings
+from .models import Category, Subcategory, Product, ProductImage, ProductListing, image_url
+from .search import CatalogIndex, get_catalog_index
+from .synthetic import generate_catalog
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # Not TestCase: its wrapping transaction would itself pin reads to the primary
+    databases = {'default', REPLICA_DB_ALIAS}
+
+    def setUp(self):
+        lag_monitor.reset()
+        # Different rows on each side show which database answered
+        Category.objects.using('default').create(name='Primary Category', slug='primary')
+        Category.objects.using(REPLICA_DB_ALIAS).create(name='Replica Category', slug='replica')
+
+    def category_names(self, **extra):
+        response = self.client.get('/api/categories/', **extra)
+        self.assertEqual(response.status_code, 200)
+        return [category['name'] for category in response.json()['results']]
+
+    def test_safe_reads_go_to_replica(self):
+        self.assertEqual(self.category_names(), ['Replica Category'])
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['Primary Category'])
+
+    def test_write_pins_client_to_primary(self):
+        subcategory = Subcategory.objects.create(
+            name='Printers', category=Category.objects.get(slug='primary')
+        )
+        product = Product.objects.create(
+            name='Printer', sku='PRN-1', subcategory=subcategory, brand='HP',
+            price=100, stock_count=3, description='A printer',
+        )
+        response = self.client.post('/api/quotes/', {
+            'name': 'Test', 'email': 'test@example.com', 'phone': '123',
+            'items': [{'product': product.id, 'quantity': 1, 'price': '100.00'}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+        # The test client replays the pin cookie on the next request
+        self.assertEqual(self.category_names(), ['Primary Category'])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(lag_monitor, 'measure', return_value=settings.REPLICA_MAX_LAG_SECONDS + 1):
+            self.assertEqual(self.category_names(), ['Primary Category'])
+
+    def test_replica_is_only_migrated_as_a_test_stand_in(self):
+        router = PrimaryReplicaRouter()
+        self.assertIsNone(router.allow_migrate('default', 'products'))
+        self.assertTrue(router.allow_migrate(REPLICA_DB_ALIAS, 'products'))
+        with override_settings(TESTING=False):
+            self.assertFalse(router.allow_migrate(REPLICA_DB_ALIAS, 'products'))
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        from django.db import OperationalError
+        with mock.patch.object(lag_monitor, 'measure', side_effect=OperationalError):
+            self.assertEqual(self.category_names(), ['Primary Category'])
+
+
+@override_settings(CDN_PURGE_BACKEND='config.cdn.RecordingPurgeBackend', CDN_PURGE_DELAY=0)
+class SurrogateKeyTests(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Technology')
+        self.subcategory = Subcategory.objects.create(name='Printers', category=self.category)
+        self.product = Product.objects.create(
+            name='Printer', sku='PRN-1', subcategory=self.subcategory, brand='HP',
+            price=100, stock_count=3, description='A printer',
+        )
+        RecordingPurgeBackend.reset()
+
+    def test_detail_is_tagged_with_what_it_shows(self):
+        response = self.client.get(f'/api/products/{self.product.slug}/')
+        self.assertEqual(set(response['Surrogate-Key'].split()), {
+            f'product-{self.product.pk}', f'subcategory-{self.subcategory.pk}', f'category-{self.category.pk}',
+        })
+        self.assertIn('s-maxage=86400', response['Cache-Control'])
+
+    def test_lists_are_tagged(self):
+        self.assertEqual(self.client.get('/api/products/')['Surrogate-Key'], 'products')
+        self.assertEqual(self.client.get('/api/categories/')['Surrogate-Key'], 'categories')
+
+    def test_save_purges_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 90
+            self.product.save()
+            self.assertEqual(RecordingPurgeBackend.purged, [])
+        self.assertEqual(RecordingPurgeBackend.keys(), {
+            'products', 'categories', f'product-{self.product.pk}',
+            f'subcategory-{self.subcategory.pk}', f'category-{self.category.pk}',
+        })
+
+    @override_settings(CDN_PURGE_DELAY=60)
+    def test_purges_are_debounced_into_one_batch(self):
+        for price in (90, 80, 70):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.price = price
+                self.product.save()
+        self.assertEqual(RecordingPurgeBackend.purged, [])
+        purge_queue.flush()
+        self.assertEqual(len(RecordingPurgeBackend.purged), 1)
+
+
+TIERED_LOCMEM = {
+    'default': {'BACKEND': 'config.cache.TieredCache', 'LOCATION': 'shared', 'OPTIONS': {'LOCAL_MAX_ENTRIES': 2}},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+}
+
+
+@override_settings(CACHES=TIERED_LOCMEM, CACHE_LOCKS=True)
+class TieredCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.clear()
+
+    def test_shared_hits_are_kept_locally(self):
+        cache.shared.set('key', 'value')
+        self.assertEqual([cache.get('key'), cache.get('key')], ['value', 'value'])
+        self.assertEqual((metrics['shared_hits'], metrics['local_hits']), (1, 1))
+
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        self.assertEqual(cache.local_size(), 2)
+
+    def test_hot_key_is_computed_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('hot', compute, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(CACHE_EARLY_RECOMPUTE_BETA=1e9)
+    def test_expiring_key_is_served_stale_while_another_worker_recomputes(self):
+        get_or_compute('hot', lambda: time.sleep(0.001) or 'old', 60)
+        # A draw that always lands past the expiry (delta * beta * -log(0.001) >> 60s)
+        with mock.patch('config.cache.random.random', return_value=0.999):
+            cache.add('hot:lock', 1)  # held by another worker
+            self.assertEqual(get_or_compute('hot', lambda: 'new', 60), 'old')
+            cache.delete('hot:lock')
+            self.assertEqual(get_or_compute('hot', lambda: 'new', 60), 'new')
+
+    def test_writes_invalidate_cached_responses(self):
+        category = Category.objects.create(name='Technology')
+        self.assertEqual(self.client.get(f'/api/categories/{category.slug}/').json()['name'], 'Technology')
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = 'Tech'
+            category.save()
+            # Not before the commit: another worker could cache the old row under the new version
+            self.assertEqual(self.client.get(f'/api/categories/{category.slug}/').json()['name'], 'Technology')
+        self.assertEqual(self.client.get(f'/api/categories/{category.slug}/').json()['name'], 'Tech')
+
+    @override_settings(CACHE_LOCKS=False)
+    def test_without_locks_every_worker_computes(self):
+        cache.add('cold:lock', 1)
+        self.assertEqual(get_or_compute('cold', lambda: 'value', 60), 'value')
+        self.assertEqual(metrics['lock_waits'], 0)
+        self.assertEqual(cache.get('cold:lock'), 1)  # neither taken nor released
+
+
+class HealthViewTests(TestCase):
+    databases = {'default', REPLICA_DB_ALIAS}
+
+    def setUp(self):
+        cache.clear()
+        metrics.clear()
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True))
+
+    def test_staff_only(self):
+        self.client.logout()
+        for path in ('/api/health/db/', '/api/health/cache/'):
+            self.assertEqual(self.client.get(path).status_code, 403)
+
+    def test_every_database_is_checked(self):
+        response = self.client.get('/api/health/db/')
+        self.assertEqual(response.status_code, 200)
+        databases = response.json()['databases']
+        self.assertEqual(set(databases), {'default', REPLICA_DB_ALIAS})
+        self.assertTrue(all(entry['ok'] and entry['pool'] is None for entry in databases.values()))
+
+    def test_failing_database_is_503(self):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.execute.side_effect = OperationalError('connection refused')
+        with mock.patch.object(connections[REPLICA_DB_ALIAS], 'cursor', return_value=cursor):
+            response = self.client.get('/api/health/db/')
+        self.assertEqual(response.status_code, 503)
+        data = response.json()
+        self.assertFalse(data['ok'])
+        self.assertTrue(data['databases']['default']['ok'])
+        self.assertEqual(data['databases'][REPLICA_DB_ALIAS]['error'], 'connection refused')
+
+    def test_pool_statistics(self):
+        # psycopg's ConnectionPool, as the PostgreSQL backend exposes it when OPTIONS['pool'] is set
+        pool = mock.Mock(min_size=2, max_size=10, get_stats=lambda: {'pool_size': 2, 'pool_available': 1})
+        pool.name = 'default'
+        with mock.patch.object(connection, 'pool', pool, create=True):
+            response = self.client.get('/api/health/db/')
+        self.assertEqual(response.json()['databases']['default']['pool'], {
+            'name': 'default', 'min_size': 2, 'max_size': 10, 'pool_size': 2, 'pool_available': 1,
+        })
+
+    def test_cache_hit_ratio(self):
+        data = self.client.get('/api/health/cache/').json()
+        self.assertTrue(data['ok'])
+        self.assertIsNone(data['hit_ratio'])  # no lookups yet
+        self.assertEqual(set(data['namespaces']), set(settings.CACHE_NAMESPACES))
+
+        get_or_compute('key', lambda: 'value', 60)
+        get_or_compute('key', lambda: 'value', 60)
+        self.assertEqual(self.client.get('/api/health/cache/').json()['hit_ratio'], 0.5)
+
+
+@override_settings(API_COUNT_EXACT_LIMIT=2)
+class CountStrategyTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        for number in range(5):
+            Product.objects.create(
+                name=f'Printer {number}', sku=f'PRN-{number}', subcategory=subcategory, brand='HP',
+                price=100, stock_count=3, description='A printer',
+            )
+
+    def test_small_counts_are_exact(self):
+        data = self.client.get('/api/products/', {'brand': 'Canon'}).json()
+        self.assertEqual((data['count'], data['count_is_approximate']), (0, False))
+
+    def test_large_counts_are_estimated_and_cached(self):
+        with mock.patch('products.counts.explained_row_count', return_value=4) as explain:
+            data = self.client.get('/api/products/', {'brand': 'HP', 'page_size': 2}).json()
+            self.assertEqual((data['count'], data['count_is_approximate']), (4, True))
+            self.client.get('/api/products/', {'page': 2, 'page_size': 2, 'brand': 'HP'})
+        self.assertEqual(explain.call_count, 1)
+
+        # The estimate is one short: the last product is still reachable
+        data = self.client.get('/api/products/', {'brand': 'HP', 'page_size': 2, 'page': 3}).json()
+        self.assertEqual((len(data['results']), data['next']), (1, None))
+        self.assertEqual(self.client.get('/api/products/', {'brand': 'HP', 'page_size': 2, 'page': 4}).status_code, 404)
+
+
+class EffectivePriceTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        self.discounted = Product.objects.create(
+            name='Laser Printer', sku='PRN-1', subcategory=subcategory, brand='HP',
+            price=80, original_price=200, discount=50, stock_count=3, description='A printer',
+        )
+        self.plain = Product.objects.create(
+            name='Inkjet Printer', sku='PRN-2', subcategory=subcategory, brand='HP',
+            price=150, stock_count=3, description='A printer',
+        )
+
+    def test_stored_on_save_and_bulk_change(self):
+        self.assertEqual(self.discounted.effective_price, 100)
+        bulk.apply(Product.objects.filter(pk=self.plain.pk), {'price': Value(60)})
+        self.plain.refresh_from_db()
+        self.assertEqual(self.plain.effective_price, 60)
+
+    def test_filter_and_order_by_price_paid(self):
+        data = self.client.get('/api/products/', {'max_price': 120, 'ordering': '-effective_price'}).json()
+        self.assertEqual([product['sku'] for product in data['results']], ['PRN-1'])
+        data = self.client.get('/api/products/', {'ordering': 'effective_price', 'fields': 'sku'}).json()
+        self.assertEqual([product['sku'] for product in data['results']], ['PRN-1', 'PRN-2'])
+
+    def test_price_histogram(self):
+        data = self.client.get('/api/products/price-histogram/', {'buckets': 2}).json()
+        self.assertEqual((data['min'], data['max']), ('100.00', '150.00'))
+        self.assertEqual([bucket['count'] for bucket in data['buckets']], [1, 1])
+
+
+class StockLevelTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        self.products = {
+            stock: Product.objects.create(
+                name=f'Printer {stock}', sku=f'PRN-{stock}', subcategory=subcategory, brand='HP',
+                price=100, stock_count=stock, in_stock=stock > 0, description='A printer',
+            )
+            for stock in (0, 3, 10)
+        }
+
+    def alerts(self):
+        out = StringIO()
+        call_command('stock_alerts', stdout=out)
+        return [line for line in out.getvalue().splitlines() if ' → ' in line]
+
+    def test_filter_by_stock_status(self):
+        data = self.client.get('/api/products/', {'stock_status': 'low_stock'}).json()
+        self.assertEqual([(product['sku'], product['stock_status']) for product in data['results']], [('PRN-3', 'Low Stock')])
+
+    def test_negative_stock_is_out_of_stock(self):
+        product = self.products[3]
+        Product.objects.filter(pk=product.pk).update(stock_count=-2)
+        self.assertEqual(refresh_derived_fields([product.pk]), 1)
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_level, 'out_of_stock')
+        self.assertEqual(refresh_derived_fields([product.pk]), 0)  # the same rule as the migration backfill
+
+    def test_alerts_report_only_transitions(self):
+        self.assertEqual(len(self.alerts()), 2)   # new products that are not in stock
+        self.assertEqual(self.alerts(), [])
+
+        restocked = self.products[0]
+        restocked.stock_count = 20
+        restocked.in_stock = True
+        restocked.save()
+        self.assertEqual(self.alerts(), ['Technology · PRN-0 Printer 0: Out of Stock → In Stock (20 left)'])
+
+    def test_admin_low_stock_report(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get('/admin/products/product/low-stock/')
+        self.assertEqual([row['sku'] for row in response.context['rows']], ['PRN-0', 'PRN-3'])
+        csv_lines = self.client.get('/admin/products/product/low-stock/', {'format': 'csv'}).content.decode().splitlines()
+        self.assertEqual(len(csv_lines), 3)
+
+
+class PrimaryImageTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Desks', category=Category.objects.create(name='Furniture'))
+        self.product = Product.objects.create(
+            name='Desk', sku='DSK-1', subcategory=subcategory, brand='Ikea',
+            price=100, stock_count=10, in_stock=True, description='A desk', main_image='products/desk',
+        )
+
+    def grid_image_url(self):
+        self.product.refresh_from_db()
+        return self.product.primary_image_url
+
+    def test_primary_image_is_stored_and_unique(self):
+        self.assertTrue(self.grid_image_url().endswith('/products/desk'))
+
+        first = ProductImage.objects.create(product=self.product, image='products/desk-front', is_primary=True)
+        second = ProductImage.objects.create(product=self.product, image='products/desk-side', order=1)
+        self.assertTrue(self.grid_image_url().endswith('/products/desk-front'))
+
+        second.is_primary = True
+        second.save()
+        first.refresh_from_db()
+        self.assertFalse(first.is_primary)
+        self.assertTrue(self.grid_image_url().endswith('/products/desk-side'))
+        listed = self.client.get('/api/products/').json()['results'][0]
+        self.assertEqual(listed['primary_image_url'], self.product.primary_image_url)
+
+        second.delete()
+        self.assertTrue(self.grid_image_url().endswith('/products/desk'))
+        self.assertIsNone(self.product.primary_image_id)
+
+
+class BulkChangeTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Paper', category=Category.objects.create(name='Stationery'))
+        for number in range(1, 6):
+            Product.objects.create(
+                name=f'Paper {number}', sku=f'PAP-{number}', subcategory=subcategory, brand='Double A',
+                price=10 * number, stock_count=number, in_stock=True, description='Paper',
+            )
+
+    def values(self, field):
+        return dict(Product.objects.order_by('sku').values_list('sku', field))
+
+    def test_price_and_stock_changes(self):
+        bulk.apply(Product.objects.filter(sku='PAP-2'), bulk.price_change(percent=10))
+        bulk.apply(Product.objects.filter(sku='PAP-3'), bulk.stock_change(delta=-3))
+        self.assertEqual(self.values('price')['PAP-2'], Decimal('22.00'))
+        self.assertEqual(self.values('stock_count')['PAP-3'], 0)
+        self.assertFalse(self.values('in_stock')['PAP-3'])
+
+    def test_discount_campaign(self):
+        bulk.apply(Product.objects.filter(sku='PAP-4'), bulk.discount_campaign(25))
+        product = Product.objects.get(sku='PAP-4')
+        self.assertEqual((product.original_price, product.price, product.discount), (40, 30, 25))
+        with self.assertRaises(ValueError):
+            bulk.discount_campaign(Decimal('12.5'))
+        form = BulkPriceStockForm({'operation': 'discount_start', 'value': '12.5'})
+        self.assertIn('whole number', form.errors['value'][0])
+
+    def test_violations_block_the_whole_change(self):
+        with self.assertRaises(bulk.BulkChangeError) as raised:
+            bulk.apply(Product.objects.all(), bulk.stock_change(delta=-2))
+        self.assertEqual(raised.exception.violations, [('PAP-1', 'Stock cannot be negative')])
+        self.assertEqual(self.values('stock_count')['PAP-5'], 5)
+
+    def test_csv_preview_and_apply_in_batches(self):
+        skus, changes, errors = bulk.parse_csv(
+            'SKU,price,stock_delta\nPAP-1,11,\nPAP-2,,5\nPAP-4,44.50,-1\n,1,\nPAP-5,abc,\n'
+        )
+        self.assertEqual(skus, ['PAP-1', 'PAP-2', 'PAP-4', 'PAP-5'])
+        self.assertEqual(errors, ['Line 5: missing sku', 'Line 6: invalid price "abc"'])
+        queryset = Product.objects.filter(sku__in=skus)
+
+        result = bulk.preview(queryset, changes)
+        self.assertEqual((result['rows'], result['changed'], result['violations']), (4, 3, []))
+        self.assertEqual([row[0] for row in result['sample']], ['PAP-1', 'PAP-2', 'PAP-4'])
+
+        # Each batch's CASE only lists the SKUs in that batch
+        batch_changes = changes.for_skus(['PAP-1'])
+        self.assertEqual(list(batch_changes), ['price'])
+        self.assertEqual(len(batch_changes['price'].cases), 1)
+
+        self.assertEqual(bulk.apply(queryset, changes, batch_size=2), 3)
+        self.assertEqual(self.values('price'), {
+            'PAP-1': 11, 'PAP-2': 20, 'PAP-3': 30, 'PAP-4': Decimal('44.50'), 'PAP-5': 50,
+        })
+        self.assertEqual(self.values('stock_count'), {'PAP-1': 1, 'PAP-2': 7, 'PAP-3': 3, 'PAP-4': 3, 'PAP-5': 5})
+
+
+@override_settings(ADMIN_LARGE_CATALOG_ROWS=0, ADMIN_COUNT_LIMIT=2)
+class LargeCatalogAdminTests(TestCase):
+
+    def setUp(self):
+        printers = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        chairs = Subcategory.objects.create(name='Chairs', category=Category.objects.create(name='Furniture'))
+        for sku, name, brand, subcategory in [
+            ('PRN-1', 'Laser Printer', 'HP', printers),
+            ('PRN-2', 'Inkjet 100% Colour', 'Canon', printers),
+            ('CHR-1', 'Office Chair', 'Herman Miller', chairs),
+        ]:
+            Product.objects.create(
+                name=name, sku=sku, subcategory=subcategory, brand=brand,
+                price=100, stock_count=3, in_stock=True, description=name,
+            )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def changelist_skus(self, **params):
+        response = self.client.get('/admin/products/product/', params)
+        return sorted(product.sku for product in response.context['cl'].result_list)
+
+    def test_search_and_input_filters(self):
+        self.assertEqual(self.changelist_skus(q='laser'), ['PRN-1'])
+        self.assertEqual(self.changelist_skus(q='furniture'), ['CHR-1'])
+        self.assertEqual(self.changelist_skus(q='100%'), ['PRN-2'])
+        self.assertEqual(self.changelist_skus(brand='herman miller'), ['CHR-1'])
+        self.assertEqual(self.changelist_skus(subcategory_name='printers'), ['PRN-1', 'PRN-2'])
+
+    def test_product_picker_searches_sku_and_name(self):
+        def picked(term):
+            response = self.client.get('/admin/autocomplete/', {
+                'app_label': 'products', 'model_name': 'productimage', 'field_name': 'product', 'term': term,
+            })
+            return [result['text'] for result in response.json()['results']]
+
+        self.assertEqual(picked('chr-'), ['Office Chair'])
+        self.assertEqual(picked('furniture'), [])  # category matches are changelist-only
+
+    def test_quote_item_price_summary_reads_the_joined_product(self):
+        quote = QuoteRequest.objects.create(name='Buyer', email='buyer@example.com', phone='1')
+        for product in Product.objects.order_by('sku'):
+            QuoteItem.objects.create(quote=quote, product=product, quantity=1, price=100)
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(username='admin')
+        inline = QuoteItemInline(QuoteRequest, admin.site)
+        items = list(inline.get_queryset(request).filter(quote=quote).order_by('product__sku'))
+        with self.assertNumQueries(0):
+            summaries = [inline.product_summary(item) for item in items]
+        self.assertEqual(summaries[1], 'PRN-1 · AED 100.00 · Low Stock')
+
+    def test_filtered_counts_stop_at_the_limit(self):
+        paginator = EstimatedCountPaginator(Product.objects.filter(is_active=True), 25)
+        self.assertEqual(paginator.count, 2)
+
+    def test_estimate_past_the_end_is_corrected(self):
+        with mock.patch('products.counts.estimated_row_count', return_value=100):
+            paginator = EstimatedCountPaginator(Product.objects.order_by('sku'), 2)
+            self.assertEqual(paginator.num_pages, 50)
+            page = paginator.page(2)
+            self.assertEqual([product.sku for product in page], ['PRN-2'])
+            self.assertEqual((paginator.count, paginator.num_pages, page.has_next()), (3, 2, False))
+
+            paginator = EstimatedCountPaginator(Product.objects.order_by('sku'), 2)
+            with self.assertRaises(EmptyPage):
+                paginator.page(3)
+
+
+class CatalogIndexTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        self.products = [
+            Product.objects.create(
+                name=name, sku=sku, subcategory=subcategory, brand=brand,
+                price=100, stock_count=3, in_stock=True, description=name,
+            )
+            for name, sku, brand in [
+                ('Laser Printer', 'PRN-1', 'HP'),
+                ('Laser Jet Pro', 'PRN-2', 'HP'),
+                ('Label Maker', 'LBL-1', 'Brother'),
+            ]
+        ]
+        self.index = CatalogIndex()
+        self.index.refresh(force=True)
+
+    def labels(self, query):
+        self.index.refresh(force=True)
+        return [(result['type'], result['label']) for result in self.index.search(query)]
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.labels('la'), [
+            ('product', 'Label Maker'), ('product', 'Laser Jet Pro'), ('product', 'Laser Printer'),
+        ])
+        self.assertEqual(self.labels('laser p'), [('product', 'Laser Printer')])
+        self.assertEqual(self.labels('prn-2'), [('product', 'Laser Jet Pro')])
+        self.assertEqual(self.labels('prin'), [('subcategory', 'Printers'), ('product', 'Laser Printer')])
+        self.assertEqual(self.index.fuzzy_search('lasr')[0], 'laser')
+
+    def test_incremental_refresh_and_deletes(self):
+        product = self.products[2]
+        product.name, product.brand = 'Lamination Machine', 'Fellowes'
+        product.save()
+        self.assertEqual(self.labels('lab'), [])
+        self.assertEqual(self.labels('lam'), [('product', 'Lamination Machine')])
+        self.assertEqual(self.index.brand_labels(), ['HP', 'Fellowes'])
+
+        self.products[0].delete()
+        self.assertEqual(self.labels('laser'), [('product', 'Laser Jet Pro')])
+        self.assertEqual(self.index.canonical_brand('hp'), 'HP')
+
+    def test_lookups_during_refreshes(self):
+        errors, done = [], threading.Event()
+
+        def lookups():
+            while not done.is_set():
+                try:
+                    self.index.search('la')
+                    self.index.fuzzy_search('lasr')
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(exc)
+
+        readers = [threading.Thread(target=lookups) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        product = self.products[1]
+        for number in range(30):
+            product.name = f'Laser Jet {number}'
+            product.save()
+            self.index.refresh(force=True)
+        done.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(errors, [])
+
+
+class BatchDetailTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        self.products = [
+            Product.objects.create(
+                name=f'Printer {number}', sku=f'PRN-{number}', subcategory=subcategory, brand='HP',
+                price=100, stock_count=3, in_stock=True, description='A printer',
+            )
+            for number in (1, 2)
+        ]
+
+    def test_get_by_slug_and_sku(self):
+        data = self.client.get('/api/products/batch/', {'slugs': 'printer-1,missing,printer-1'}).json()
+        self.assertEqual(list(data['results']), ['printer-1', 'missing'])
+        self.assertEqual(data['results']['printer-1']['sku'], 'PRN-1')
+        self.assertEqual(data['results']['printer-1']['subcategory']['product_count'], 2)
+        self.assertIsNone(data['results']['missing'])
+        self.assertEqual(data['not_found'], ['missing'])
+
+        data = self.client.get('/api/products/batch/', {'skus': 'PRN-2', 'fields': 'name'}).json()
+        self.assertEqual(data['results'], {'PRN-2': {'name': 'Printer 2'}})
+
+    def test_post_ids_are_normalized(self):
+        first, second = (str(product.pk) for product in self.products)
+        data = self.client.post(
+            '/api/products/batch/', {'ids': [f'00{first}', int(second), 99999]}, content_type='application/json',
+        ).json()
+        self.assertEqual(list(data['results']), [first, second, '99999'])
+        self.assertEqual(data['results'][first]['sku'], 'PRN-1')
+        self.assertEqual(data['not_found'], ['99999'])
+
+    def test_invalid_requests(self):
+        too_many = ','.join(f'sku-{number}' for number in range(51))
+        for params in [{}, {'skus': too_many}, {'ids': '1,x'}, {'skus': 'A', 'ids': '1'}, {'skus': ' , '}]:
+            self.assertEqual(self.client.get('/api/products/batch/', params).status_code, 400, params)
+        fifty = ','.join(f'sku-{number}' for number in range(50))
+        self.assertEqual(len(self.client.get('/api/products/batch/', {'skus': fifty}).json()['not_found']), 50)
+
+
+class FeaturedRotationTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        self.products = [
+            Product.objects.create(
+                name=f'Printer {number}', sku=f'PRN-{number}', subcategory=subcategory, brand='HP',
+                price=100, stock_count=3, in_stock=True, description='A printer', is_featured=True,
+            )
+            for number in range(5)
+        ]
+
+    def ranks(self):
+        return sorted(Product.objects.exclude(featured_rank=None).values_list('featured_rank', flat=True))
+
+    def windows(self, size, buckets):
+        return [[product.sku for product in featured_window(Product.objects.all(), size, bucket)] for bucket in buckets]
+
+    def test_saved_instance_keeps_its_new_rank(self):
+        product = self.products[0]
+        product.is_featured = False
+        product.save()
+        self.assertIsNone(product.featured_rank)
+        product.is_featured = True
+        product.save()
+        self.assertEqual(product.featured_rank, Product.objects.get(pk=product.pk).featured_rank)
+        product.name = 'Renamed'
+        product.save()  # a full save must not write back a stale rank
+        self.assertEqual(self.ranks(), [0, 1, 2, 3, 4])
+
+    def test_windows_cover_the_set_despite_gaps_and_duplicates(self):
+        reshuffle_featured(seed=1)
+        windows = self.windows(2, range(3))
+        self.assertEqual([len(window) for window in windows], [2, 2, 2])
+        self.assertEqual(len({sku for window in windows[:2] for sku in window} | set(windows[2][:1])), 5)
+
+        # A gap (deleted rank) and a duplicate (stale write)
+        Product.objects.filter(featured_rank=2).update(featured_rank=None, is_featured=False)
+        Product.objects.filter(featured_rank=4).update(featured_rank=3)
+        windows = self.windows(2, range(2))
+        self.assertEqual(len({sku for window in windows for sku in window}), 4)
+        self.assertEqual(len(self.windows(6, [0])[0]), 4)
+
+
+class QueryInstrumentationTests(TestCase):
+
+    def test_not_sampled_in_tests(self):
+        self.assertEqual(settings.SQL_INSTRUMENTATION_SAMPLE_RATE, 0)
+        self.assertNotIn('Server-Timing', self.client.get('/api/categories/'))
+
+    @override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=1, SQL_SLOW_QUERY_MS=0, SQL_EXPLAIN_MAX_PER_REQUEST=1)
+    def test_slow_selects_are_explained(self):
+        def view(request):
+            Category.objects.update(is_active=True)  # slow too, but not explainable
+            list(Category.objects.all())
+            return HttpResponse()
+
+        with self.assertLogs('config.instrumentation', 'INFO') as logs:
+            response = QueryInstrumentationMiddleware(view)(RequestFactory().get('/api/categories/'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        events = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([event['event'] for event in events], ['request_sql', 'slow_query'])
+        self.assertTrue(events[1]['sql'].startswith('SELECT'))
+
+    @override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=1)
+    async def test_async_requests_are_recorded(self):
+        await Category.objects.acreate(name='Technology')
+        with self.assertLogs('config.instrumentation', 'INFO') as logs:
+            response = await self.async_client.get('/api/async/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertGreater(json.loads(logs.records[0].getMessage())['queries'], 0)
+
+    @override_settings(DEBUG=True)
+    def test_middleware_chain_is_async_native(self):
+        # Django logs every middleware it has to wrap in a thread
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            BaseHandler().load_middleware(is_async=True)
+
+
+class FuzzySearchTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Technology')
+        laptops = Subcategory.objects.create(name='Laptops', category=category)
+        self.tablets = Subcategory.objects.create(name='Tablets', category=category)
+        for name, sku, subcategory, price in [
+            ('Lenovo ThinkPad', 'LAP-1', laptops, 300),
+            ('Lenovo ThinkPad Carbon Edition', 'LAP-2', laptops, 200),
+            ('Lenovo Tab', 'TAB-1', self.tablets, 100),
+            ('Canon Pixma', 'PRN-1', laptops, 50),
+        ]:
+            Product.objects.create(
+                name=name, sku=sku, subcategory=subcategory, brand=name.split()[0],
+                price=price, stock_count=3, in_stock=True, description='A device',
+            )
+        cache.clear()
+        get_catalog_index().refresh(force=True)  # not left over from other tests
+
+    def search(self, **params):
+        response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_typo_falls_back_to_trigram_matches(self):
+        data = self.search(search='lenvo')
+        self.assertEqual(data['did_you_mean'], 'lenovo')
+        self.assertEqual(data['count'], 3)
+        self.assertNotIn('did_you_mean', self.search(search='lenovo'))
+
+    def test_matches_in_similarity_order_unless_ordering_given(self):
+        ranked = [product['name'] for product in self.search(search='thinkpd')['results']]
+        self.assertEqual(ranked, ['Lenovo ThinkPad', 'Lenovo ThinkPad Carbon Edition'])
+        by_price = [product['name'] for product in self.search(search='thinkpd', ordering='price')['results']]
+        self.assertEqual(by_price, ['Lenovo ThinkPad Carbon Edition', 'Lenovo ThinkPad'])
+
+    def test_fallback_ranks_within_filters(self):
+        # Only one global match fits, and it is not the tablet
+        with mock.patch('products.filters.FUZZY_MAX_MATCHES', 1):
+            data = self.search(search='lenvo', subcategory=self.tablets.pk)
+        self.assertEqual([product['name'] for product in data['results']], ['Lenovo Tab'])
+        self.assertEqual(self.search(search='lenvo', max_price=10)['count'], 0)
+
+
+@override_settings(RESPONSE_CACHE_SECONDS=0, API_COUNT_CACHE_SECONDS=0)
+class ListingProjectionTests(TestCase):
+
+    def setUp(self):
+        _ready.clear()
+        self.subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        self.products = [
+            Product.objects.create(
+                name=f'Printer {number}', sku=f'PRN-{number}', subcategory=self.subcategory, brand='HP',
+                price=100 * number, stock_count=number, in_stock=True, description='A printer',
+            )
+            for number in (1, 2, 3)
+        ]
+
+    def listed(self, **params):
+        response = self.client.get('/api/products/', {'ordering': 'price', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_rows_follow_saves(self):
+        self.assertEqual(ProductListing.objects.count(), 3)
+        product = self.products[0]
+        product.name = 'Printer One'
+        product.save()
+        self.assertEqual(json.loads(ProductListing.objects.get(pk=product.pk).data)['name'], 'Printer One')
+
+        self.subcategory.name = 'Office Printers'
+        self.subcategory.save()
+        self.assertEqual(set(ProductListing.objects.values_list('subcategory_name', flat=True)), {'Office Printers'})
+
+        product.is_active = False
+        product.save()
+        self.assertFalse(ProductListing.objects.filter(pk=product.pk).exists())
+
+    def test_refresh_and_rebuild(self):
+        # update() bypasses the signals, so the rows fall behind until refreshed
+        Product.objects.filter(pk=self.products[1].pk).update(name='Renamed')
+        Product.objects.filter(pk=self.products[2].pk).update(is_active=False)
+        self.assertEqual(refresh_listings([self.products[1].pk]), 1)
+        self.assertEqual(json.loads(ProductListing.objects.get(pk=self.products[1].pk).data)['name'], 'Renamed')
+        self.assertTrue(ProductListing.objects.filter(pk=self.products[2].pk).exists())
+
+        ProductListing.objects.filter(pk=self.products[0].pk).delete()
+        self.assertEqual(rebuild_listings(batch_size=1), 2)
+        self.assertEqual(
+            sorted(ProductListing.objects.values_list('pk', flat=True)), [self.products[0].pk, self.products[1].pk]
+        )
+        [listing] = build_listings(Product.objects.select_related('subcategory__category').filter(pk=self.products[0].pk))
+        self.assertEqual(listing.category_name, 'Technology')
+        self.assertEqual(listing.data, ProductListing.objects.get(pk=self.products[0].pk).data)
+
+    def test_list_served_from_projection_matches_serializers(self):
+        with self.assertNumQueries(3):  # readiness check, then the page and its count from one table
+            projected = self.listed(in_stock='true', page_size=2)
+        with override_settings(PRODUCT_LISTING_PROJECTION=False):
+            serialized = self.listed(in_stock='true', page_size=2)
+        self.assertEqual(projected, serialized)
+        self.assertEqual([product['name'] for product in projected['results']], ['Printer 1', 'Printer 2'])
+        self.assertEqual(projected['count'], 3)
+
+    def test_unsupported_requests_take_the_serializer_path(self):
+        self.assertEqual(self.listed(search='printer 2')['count'], 1)
+        self.assertEqual(list(self.listed(fields='name')['results'][0]), ['name'])
+        ProductListing.objects.all().delete()
+        _ready.clear()
+        self.assertEqual(self.listed()['count'], 3)
+
+
+@override_settings(RESPONSE_CACHE_SECONDS=0)
+class AsyncProductListTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Technology')
+        self.laptops = Subcategory.objects.create(name='Laptops', category=category)
+        tablets = Subcategory.objects.create(name='Tablets', category=category)
+        for name, subcategory, price, stock in [
+            ('Lenovo ThinkPad', self.laptops, 300, 10),
+            ('Lenovo Tab', tablets, 100, 2),
+            ('Dell Latitude', self.laptops, 200, 0),
+        ]:
+            Product.objects.create(
+                name=name, sku=name.upper().replace(' ', '-'), subcategory=subcategory, brand=name.split()[0],
+                price=price, stock_count=stock, in_stock=stock > 0, description='A device',
+            )
+        get_catalog_index().refresh(force=True)  # not left over from other tests
+
+    def assertSameAsViewSet(self, params, names):
+        expected = self.client.get('/api/products/', params).json()
+        data = self.client.get('/api/async/products/', params).json()
+        self.assertEqual([product['name'] for product in data['results']], names)
+        self.assertEqual(data['results'], expected['results'])
+        self.assertEqual(data['count'], expected['count'])
+        self.assertEqual(data.get('did_you_mean'), expected.get('did_you_mean'))
+
+    def test_filters_search_and_ordering_match_the_viewset(self):
+        self.assertSameAsViewSet({'subcategory': self.laptops.pk, 'ordering': 'price'}, ['Dell Latitude', 'Lenovo ThinkPad'])
+        self.assertSameAsViewSet({'min_price': 150, 'stock_status': 'in_stock'}, ['Lenovo ThinkPad'])
+        self.assertSameAsViewSet({'search': 'lenovo', 'ordering': '-price'}, ['Lenovo ThinkPad', 'Lenovo Tab'])
+        self.assertSameAsViewSet({'search': 'latitud', 'subcategory': self.laptops.pk}, ['Dell Latitude'])
+        self.assertSameAsViewSet({'search': 'lattitude'}, ['Dell Latitude'])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in [{'subcategory': 999}, {'min_price': 'cheap'}, {'page_size': 'x'}]:
+            self.assertEqual(self.client.get('/api/async/products/', params).status_code, 400, params)
+
+
+@override_settings(RESPONSE_CACHE_SECONDS=0, API_COUNT_CACHE_SECONDS=0)
+class SparseFieldsetTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        for number in (1, 2):
+            product = Product.objects.create(
+                name=f'Printer {number}', sku=f'PRN-{number}', subcategory=subcategory, brand='HP',
+                price=100, stock_count=3, in_stock=True, description='A printer',
+            )
+            ProductImage.objects.create(product=product, image=f'printers/{number}', is_primary=True)
+
+    def page_query(self, path, params):
+        """The response and the SQL of the query that loaded the page"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        page = [query['sql'] for query in queries if 'COUNT(' not in query['sql']][0]
+        return response.json()['results'], page
+
+    def test_fields_trim_columns_and_joins(self):
+        results, sql = self.page_query('/api/products/', {'fields': 'id,name'})
+        self.assertEqual(results[0], {'id': results[0]['id'], 'name': 'Printer 2'})
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"description"', sql)
+
+        results, sql = self.page_query('/api/products/', {'fields': 'name,category_name'})
+        self.assertEqual(results[0]['category_name'], 'Technology')
+        self.assertIn('JOIN "products_category"', sql)
+
+    def test_expand_adds_fields_and_prefetches(self):
+        with self.assertNumQueries(3):  # count, page, images
+            data = self.client.get('/api/products/', {'expand': 'images,description'}).json()
+        self.assertEqual(data['results'][0]['description'], 'A printer')
+        self.assertEqual(len(data['results'][0]['images']), 1)
+        self.assertNotIn('images', self.client.get('/api/products/', {'fields': 'name,brand'}).json()['results'][0])
+
+    def test_category_counts_without_prefetching_subcategories(self):
+        with self.assertNumQueries(2):  # count, page with the annotated count
+            data = self.client.get('/api/categories/', {'fields': 'name,product_count'}).json()
+        self.assertEqual(data['results'], [{'name': 'Technology', 'product_count': 2}])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/products/', {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['fields'], ['Unknown field "password".'])
+        self.assertEqual(self.client.get('/api/categories/', {'expand': 'secret'}).status_code, 400)
+
+
+@override_settings(RESPONSE_CACHE_SECONDS=0)
+class RendererTests(TestCase):
+
+    def setUp(self):
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        Product.objects.create(
+            name='Printer \u2028 Pro', sku='PRN-1', subcategory=subcategory, brand='HP',
+            price=Decimal('99.90'), stock_count=3, in_stock=True, description='A printer',
+        )
+
+    def test_orjson_renders_the_same_bytes_as_drf(self):
+        data = {
+            'price': Decimal('99.90'), 'at': timezone.now(), 'label': gettext_lazy('Printers'),
+            'text': 'caf\u00e9 \u2029', 'nested': [{'n': 1, 'ok': True, 'none': None}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        response = self.client.get('/api/products/printer-pro/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn(b'\\u2028', response.content)
+        self.assertEqual(response.content, JSONRenderer().render(response.json()))
+
+    def test_indent_requests_fall_back_to_drf(self):
+        response = self.client.get('/api/categories/', HTTP_ACCEPT='application/json; indent=2')
+        self.assertTrue(response.content.startswith(b'{\n  "count"'))
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_negotiation(self):
+        expected = self.client.get('/api/products/').json()
+        for response in [
+            self.client.get('/api/products/', HTTP_ACCEPT='application/msgpack'),
+            self.client.get('/api/products/', {'format': 'msgpack'}),
+        ]:
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            self.assertEqual(msgpack.unpackb(response.content), expected)
+        self.assertEqual(self.client.get('/api/products/', HTTP_ACCEPT='text/csv').status_code, 406)
+
+
+def decode_columns(results):
+    """The rows of a ``?format=columns`` page, as the JSON list has them"""
+    columns, dictionaries = results['columns'], results['dictionaries']
+    decoded = {
+        name: [dictionaries[name][code] for code in column] if name in dictionaries else column
+        for name, column in columns.items()
+    }
+    rows = len(next(iter(columns.values()), []))
+    return [{name: decoded[name][position] for name in results['fields']} for position in range(rows)]
+
+
+@override_settings(RESPONSE_CACHE_SECONDS=0)
+class ColumnarFormatTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Technology')
+        for subcategory_name, names in [('Printers', ['Laser', 'Inkjet']), ('Laptops', ['ThinkPad'])]:
+            subcategory = Subcategory.objects.create(name=subcategory_name, category=category)
+            for number, name in enumerate(names, start=1):
+                Product.objects.create(
+                    name=name, sku=name.upper(), subcategory=subcategory, brand='HP', price=100 * number,
+                    original_price=150 * number, discount=10 * number, stock_count=number * 4,
+                    in_stock=True, description='A device', main_image='devices/1' if number == 1 else None,
+                )
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=Product.objects.get(sku='LASER'), image='devices/2', is_primary=True)
+
+    def test_round_trips_to_the_json_list(self):
+        for params in [{'ordering': 'name'}, {'ordering': '-price', 'fields': 'name,final_price,stock_status'}]:
+            expected = self.client.get('/api/products/', params).json()
+            data = self.client.get('/api/products/', {**params, 'format': 'columns'}).json()
+            self.assertEqual(data['count'], expected['count'])
+            self.assertEqual(decode_columns(data['results']), expected['results'])
+
+    def test_computed_fields_are_read_from_stored_columns(self):
+        expected = self.client.get('/api/products/', {'ordering': 'name'}).json()['results']
+        unused = mock.PropertyMock(side_effect=AssertionError('evaluated per row'))
+        columns._image_url.cache_clear()
+        with mock.patch.object(Product, 'final_price', unused), mock.patch.object(Product, 'stock_status', unused), \
+                mock.patch('products.columns.image_url', wraps=image_url) as build_url:
+            data = self.client.get('/api/products/', {'format': 'columns', 'ordering': 'name'}).json()
+        self.assertEqual(decode_columns(data['results']), expected)
+        build_url.assert_called_once_with('devices/1')  # only the product whose gallery image is primary
+
+    def test_repeated_strings_are_dictionary_encoded(self):
+        results = self.client.get('/api/products/', {'format': 'columns', 'ordering': 'name'}).json()['results']
+        self.assertEqual(results['dictionaries']['brand'], ['HP'])
+        self.assertEqual(results['columns']['brand'], [0, 0, 0])
+        self.assertEqual(results['dictionaries']['subcategory_name'], ['Printers', 'Laptops'])
+
+    def test_nested_fields_are_rejected(self):
+        response = self.client.get('/api/products/', {'format': 'columns', 'expand': 'images'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('format', response.json())
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200, RESPONSE_CACHE_SECONDS=60)
+class CompressionAndResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        subcategory = Subcategory.objects.create(name='Printers', category=Category.objects.create(name='Technology'))
+        self.product = Product.objects.create(
+            name='Laser Printer', sku='PRN-1', subcategory=subcategory, brand='HP',
+            price=100, stock_count=3, in_stock=True, description='A printer',
+        )
+
+    def get(self, path, encoding='gzip, br'):
+        response = self.client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def decoded(self, response):
+        encoding = response.get('Content-Encoding')
+        if encoding == 'br':
+            return compression.brotli.decompress(response.content)
+        return gzip.decompress(response.content) if encoding == 'gzip' else response.content
+
+    def test_negotiated_encodings(self):
+        identity = self.get('/api/products/', encoding='identity')
+        self.assertFalse(identity.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', identity['Vary'])
+
+        preferred = self.get('/api/products/')
+        self.assertEqual(preferred['Content-Encoding'], compression.available_encodings()[0])
+        self.assertEqual(self.decoded(preferred), identity.content)
+        gzipped = self.get('/api/products/', encoding='br;q=0, gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(self.decoded(gzipped), identity.content)
+
+    def test_small_and_non_api_bodies_are_not_compressed(self):
+        with override_settings(COMPRESSION_MIN_SIZE=100_000):
+            self.assertFalse(self.get('/api/products/').has_header('Content-Encoding'))
+        self.assertFalse(self.get('/admin/login/').has_header('Content-Encoding'))
+
+    def test_hits_are_served_precompressed(self):
+        first = self.get('/api/products/laser-printer/')
+        with mock.patch('config.compression.compress', wraps=compression.compress) as compress:
+            hit = self.get('/api/products/laser-printer/')
+            identity = self.get('/api/products/laser-printer/', encoding='identity')
+        compress.assert_not_called()
+        self.assertEqual(hit['Content-Encoding'], first['Content-Encoding'])
+        self.assertEqual(hit.content, first.content)
+        self.assertEqual(json.loads(identity.content)['name'], 'Laser Printer')
+
+    def test_writes_invalidate_cached_responses(self):
+        self.assertEqual(json.loads(self.decoded(self.get('/api/products/laser-printer/')))['name'], 'Laser Printer')
+        # update() skips the signals, so the cached page is still served
+        Product.objects.filter(pk=self.product.pk).update(name='Renamed')
+        self.assertEqual(json.loads(self.decoded(self.get('/api/products/laser-printer/')))['name'], 'Laser Printer')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Inkjet Printer'
+            self.product.save()
+        detail = json.loads(self.decoded(self.get('/api/products/laser-printer/')))
+        self.assertEqual(detail['name'], 'Inkjet Printer')
+
+
+class SyntheticCatalogTests(TestCase):
+
+    def generated(self, seed):
+        generate_catalog(60, seed=seed, batch_size=25)
+        rows = list(
+            Product.objects.order_by('sku')
+            .values_list('sku', 'name', 'price', 'original_price', 'stock_count', 'specifications', 'featured_rank')
+        )
+        Product.objects.all().delete()
+        return rows
+
+    def test_same_seed_same_catalogue(self):
+        first = self.generated(seed=7)
+        self.assertEqual(len(first), 60)
+        self.assertEqual(self.generated(seed=7), first)
+        self.assertNotEqual(self.generated(seed=8), first)
+
+    def test_listings_are_built_once_at_the_end(self):
+        with mock.patch('products.changes.refresh_listings') as refresh, \
+                mock.patch('products.changes.rebuild_listings', wraps=rebuild_listings) as rebuild:
+            generate_catalog(60, seed=7, batch_size=25)
+        refresh.assert_not_called()
+        rebuild.assert_called_once_with()
+        self.assertEqual(ProductListing.objects.count(), Product.objects.filter(is_active=True).count())
+        # Stored as products_changed() would have stored them
+        ids = list(Product.objects.values_list('pk', flat=True))
+        self.assertEqual(refresh_derived_fields(ids), 0)
+        self.assertEqual(refresh_primary_images(ids), 0)
+        self.assertTrue(Product.objects.exclude(primary_image=None).exists())
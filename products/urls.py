@@ -2,6 +2,7 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     CategoryViewSet,
     SubcategoryViewSet,
@@ -13,4 +14,11 @@ router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'subcategories', SubcategoryViewSet, basename='subcategory')
 router.register(r'products', ProductViewSet, basename='product')
 
-urlpatterns = router.urls
\ No newline at end of file
+# Async read path (served natively under ASGI, see config/asgi.py)
+async_urlpatterns = [
+    path('async/products/', async_views.product_list, name='async-product-list'),
+    path('async/products/<slug:slug>/', async_views.product_detail, name='async-product-detail'),
+    path('async/categories/', async_views.category_list, name='async-category-list'),
+]
+
+urlpatterns = router.urls + async_urlpatterns
\ No newline at end of file
@@ -1,8 +1,13 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from django.db.models import Count, OuterRef, Subquery
 from django_filters.rest_framework import DjangoFilterBackend
+from config.db_routing import mark_read_only
+from config.renderers import ColumnarJSONRenderer
+from config.response_cache import cached_response
 from .models import Category, Subcategory, Product
 from .serializers import (
     CategorySerializer,
@@ -10,106 +15,256 @@ from .serializers import (
     ProductListSerializer,
     ProductDetailSerializer
 )
+from .columns import columnar_response
+from .counts import CountStrategyPaginator
+from .featured import current_bucket, featured_window, seconds_left_in_bucket
+from .fieldsets import SparseFieldsetViewMixin
+from .filters import FuzzySearchFilter, ProductFilter, SearchRankOrderingFilter
+from .listings import listing_response
+from .prices import HISTOGRAM_BUCKETS, HISTOGRAM_MAX_BUCKETS, price_histogram
+from .search import get_catalog_index, fuzzy_search
+from .surrogate_keys import (
+    CATEGORIES,
+    PRODUCTS,
+    SurrogateKeyViewMixin,
+    category_key,
+    collection_key,
+    product_key,
+    product_keys,
+    subcategory_key,
+)
+
+
+BATCH_LOOKUPS = {'slugs': 'slug', 'skus': 'sku', 'ids': 'id'}
+BATCH_MAX_ITEMS = 50             # ⭐ Bounded like max_page_size
 
 
 class StandardPagination(PageNumberPagination):
     page_size = 20               # Default page size
     page_size_query_param = 'page_size'
     max_page_size = 100          # ⭐ Hard cap — prevents 1000-item requests killing Render
+    django_paginator_class = CountStrategyPaginator   # ⭐ Estimated/cached counts, see counts.py
 
+    def get_paginated_response(self, data):
+        response = Response({
+            'count': self.page.paginator.count,
+            'count_is_approximate': self.page.paginator.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        did_you_mean = getattr(self.request, 'did_you_mean', None)
+        if did_you_mean:
+            response.data['did_you_mean'] = did_you_mean
+        return response
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Category.objects.filter(is_active=True).prefetch_related('subcategories')
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count_is_approximate'] = {'type': 'boolean', 'example': False}
+        return schema
+
+
+class CategoryViewSet(SurrogateKeyViewMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    # ⭐ Subcategory prefetch and product counts come from the requested ?fields=
+    queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     lookup_field = 'slug'
+    default_surrogate_keys = [CATEGORIES]   # ⭐ CDN purge keys, see surrogate_keys.py
+
+    def get_object_surrogate_keys(self, obj):
+        return {category_key(obj.pk)}
 
+    @cached_response()  # ⭐ the navbar: stored precompressed, see config/response_cache.py
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class SubcategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Subcategory.objects.filter(is_active=True).select_related('category')
+    @cached_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class SubcategoryViewSet(SurrogateKeyViewMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Subcategory.objects.filter(is_active=True)
     serializer_class = SubcategorySerializer
     lookup_field = 'slug'
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['category']
+    default_surrogate_keys = [CATEGORIES]
+
+    def get_object_surrogate_keys(self, obj):
+        return {subcategory_key(obj.pk), category_key(obj.category_id)}
 
+    @cached_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = (
-        Product.objects
-        .filter(is_active=True)
-        .select_related('subcategory', 'subcategory__category')  # ⭐ Prevents N+1
-        .prefetch_related('images')                               # ⭐ Prevents N+1 on images
-        .only(                                                    # ⭐ Only fetch needed fields for list
-            'id', 'name', 'slug', 'sku', 'brand',
-            'product_type', 'price', 'original_price', 'discount',
-            'main_image', 'stock_count', 'in_stock',
-            'rating', 'reviews', 'is_featured',
-            'subcategory', 'created_at'
-        )
-    )
+
+class ProductViewSet(SurrogateKeyViewMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    # ⭐ select_related / prefetch_related / only() are derived from the serializer
+    # fields actually rendered (?fields= / ?expand=), see fieldsets.py
+    queryset = Product.objects.filter(is_active=True)
     lookup_field = 'slug'
     pagination_class = StandardPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['subcategory', 'subcategory__category', 'brand', 'in_stock', 'is_featured', 'product_type']
+    filter_backends = [DjangoFilterBackend, FuzzySearchFilter, SearchRankOrderingFilter]
+    filterset_class = ProductFilter   # ⭐ filterset fields plus min_price / max_price / stock_status
     search_fields = ['name', 'description', 'sku', 'brand']
-    ordering_fields = ['price', 'created_at', 'name']
+    ordering_fields = ['price', 'effective_price', 'created_at', 'name']
     ordering = ['-created_at']
+    default_surrogate_keys = [PRODUCTS]
 
     def get_serializer_class(self):
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'batch'):
             return ProductDetailSerializer
         return ProductListSerializer
 
-    def get_queryset(self):
-        # For detail view, fetch ALL fields
-        if self.action == 'retrieve':
-            return (
+    def get_object_surrogate_keys(self, obj):
+        return product_keys(obj)
+
+    def get_surrogate_max_age(self):
+        if self.action == 'featured':
+            return seconds_left_in_bucket()  # the window rotates then
+        return None
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            renderers.append(ColumnarJSONRenderer())  # opt-in ?format=columns
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format == 'columns':
+            return columnar_response(self, request)
+        # ⭐ Plain list pages are concatenated prerendered JSON from the
+        # ProductListing projection; anything else takes the serializer path
+        response = listing_response(self, request)
+        if response is not None:
+            return response
+        return super().list(request, *args, **kwargs)
+
+    @cached_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Typeahead suggestions from the in-process prefix index (no list pipeline)"""
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 8)), 20))
+        except ValueError:
+            limit = 8
+        results = get_catalog_index().search(query, limit=limit) if query else []
+        return Response({'query': query, 'results': results})
+
+    @action(detail=False, methods=['get'], url_path='did-you-mean')
+    def did_you_mean(self, request):
+        """Typo-tolerant matches ranked by trigram similarity"""
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 8)), 20))
+        except ValueError:
+            limit = 8
+        did_you_mean, results = fuzzy_search(query, limit=limit) if query else ('', [])
+        return Response({'query': query, 'did_you_mean': did_you_mean, 'results': results})
+
+    @action(detail=False, methods=['get', 'post'])
+    def batch(self, request):
+        """
+        Several product details in one round trip, keyed by identifier:
+        ?slugs=a,b / ?skus= / ?ids= or the same key in a POST body.
+        Unknown identifiers map to null and are listed in ``not_found``.
+        """
+        if request.method == 'POST':
+            mark_read_only()  # POST only carries the list; nothing is written
+        params = request.data if request.method == 'POST' else request.query_params
+        given = [key for key in BATCH_LOOKUPS if key in params]
+        if len(given) != 1:
+            raise ValidationError({'detail': f"Pass exactly one of: {', '.join(BATCH_LOOKUPS)}."})
+        key = given[0]
+        field = BATCH_LOOKUPS[key]
+
+        values = params[key]
+        if isinstance(values, str):
+            values = values.split(',')
+        if not isinstance(values, list):
+            raise ValidationError({key: 'Expected a list or a comma-separated string.'})
+        identifiers = [str(value).strip() for value in values if str(value).strip()]
+        if field == 'id':
+            if not all(identifier.isascii() and identifier.isdigit() for identifier in identifiers):
+                raise ValidationError({key: 'Ids must be integers.'})
+            # Results are keyed the way they are looked up: "007" is product 7
+            identifiers = [str(int(identifier)) for identifier in identifiers]
+        identifiers = list(dict.fromkeys(identifiers))
+        if not identifiers:
+            raise ValidationError({key: 'At least one identifier is required.'})
+        if len(identifiers) > BATCH_MAX_ITEMS:
+            raise ValidationError({key: f'At most {BATCH_MAX_ITEMS} identifiers per request.'})
+        lookup = [int(identifier) for identifier in identifiers] if field == 'id' else identifiers
+
+        products = self.get_queryset().filter(**{f'{field}__in': lookup})
+        fields = self.get_serializer_context().get('fields')
+        with_subcategory = not fields or 'subcategory' in fields
+        if with_subcategory:
+            # Nested subcategory product counts in the same query, not one per product
+            products = products.annotate(subcategory_product_count=Subquery(
                 Product.objects
-                .filter(is_active=True)
-                .select_related('subcategory', 'subcategory__category')
-                .prefetch_related('images')
-            )
-        return super().get_queryset()
+                .filter(subcategory=OuterRef('subcategory'), is_active=True)
+                .order_by().values('subcategory')
+                .annotate(count=Count('id')).values('count')
+            ))
+        found = {}
+        for product in products:
+            if with_subcategory:
+                product.subcategory.active_product_count = product.subcategory_product_count
+            found[str(getattr(product, field))] = product
+            self.surrogate_keys.add(product_key(product.pk))
+
+        data = dict(zip(found, self.get_serializer(list(found.values()), many=True).data))
+        return Response({
+            'results': {identifier: data.get(identifier) for identifier in identifiers},
+            'not_found': [identifier for identifier in identifiers if identifier not in found],
+        })
+
+    @action(detail=False, methods=['get'], url_path='price-histogram')
+    @cached_response()
+    def price_histogram(self, request):
+        """Product counts per effective-price bucket for the current filters and search"""
+        try:
+            buckets = int(request.query_params.get('buckets', HISTOGRAM_BUCKETS))
+        except ValueError:
+            buckets = HISTOGRAM_BUCKETS
+        buckets = max(1, min(buckets, HISTOGRAM_MAX_BUCKETS))
+        return Response(price_histogram(self.filter_queryset(self.get_queryset()), buckets))
 
     @action(detail=False, methods=['get'])
+    @cached_response(vary_on=lambda request: current_bucket())
     def featured(self, request):
-        featured_products = (
-            Product.objects
-            .filter(is_active=True, is_featured=True)
-            .select_related('subcategory', 'subcategory__category')
-            [:6]
-        )
-        serializer = ProductListSerializer(featured_products, many=True)
+        # ⭐ Rotating window over the pre-shuffled featured set, stable per time bucket
+        featured_products = featured_window(self.get_queryset(), 6)
+        self.surrogate_keys.add(collection_key('featured'))
+        serializer = self.get_serializer(featured_products, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cached_response()
     def new(self, request):
-        products = (
-            Product.objects
-            .filter(is_active=True, product_type='new')
-            .select_related('subcategory', 'subcategory__category')
-            [:8]
-        )
-        serializer = ProductListSerializer(products, many=True)
+        products = self.get_queryset().filter(product_type='new')[:8]
+        self.surrogate_keys.add(collection_key('new'))
+        serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cached_response()
     def refurbished(self, request):
-        products = (
-            Product.objects
-            .filter(is_active=True, product_type='refurbished')
-            .select_related('subcategory', 'subcategory__category')
-            [:8]
-        )
-        serializer = ProductListSerializer(products, many=True)
+        products = self.get_queryset().filter(product_type='refurbished')[:8]
+        self.surrogate_keys.add(collection_key('refurbished'))
+        serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cached_response()
     def rental(self, request):
-        products = (
-            Product.objects
-            .filter(is_active=True, product_type='rental')
-            .select_related('subcategory', 'subcategory__category')
-            [:8]
-        )
-        serializer = ProductListSerializer(products, many=True)
+        products = self.get_queryset().filter(product_type='rental')[:8]
+        self.surrogate_keys.add(collection_key('rental'))
+        serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
\ No newline at end of file
@@ -7,8 +7,21 @@ class QuoteItemInline(admin.TabularInline):
     """Inline admin for quote items"""
     model = QuoteItem
     extra = 0
-    readonly_fields = ['subtotal_display']
-    fields = ['product', 'quantity', 'price', 'subtotal_display']
+    autocomplete_fields = ['product']  # ⭐ Searches SKU/name instead of rendering every product
+    readonly_fields = ['product_summary', 'subtotal_display']
+    fields = ['product', 'product_summary', 'quantity', 'price', 'subtotal_display']
+    
+    def get_queryset(self, request):
+        # Product summary (and the picker's label) read the joined product row
+        return super().get_queryset(request).select_related('product')
+    
+    def product_summary(self, obj):
+        # Not cached: it formats fields of the product row joined above, no query,
+        # while a namespaced cache read costs a shared-cache round trip per item
+        if obj.product_id:
+            return obj.product.price_summary()
+        return '-'
+    product_summary.short_description = 'Current price'
     
     def subtotal_display(self, obj):
         if obj.id:
@@ -42,7 +55,7 @@ class QuoteRequestAdmin(admin.ModelAdmin):
             'fields': ('name', 'email', 'phone', 'company')
         }),
         ('Request Details', {
-            'fields': ('message', 'status', 'admin_notes')
+            'fields': ('message', 'status')
         }),
         ('Summary', {
             'fields': ('items_count', 'quantity_total', 'total_display'),